@@ -1,3 +1,49 @@
+import uuid
+
 from django.db import models
 
-# Create your models here.
+
+class Conversation(models.Model):
+    """
+    One chat session. Turns older than the recent window are folded into
+    ``summary`` by the huey worker; ``summarized_through`` is the last turn
+    folded in.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    scope = models.CharField(max_length=255, blank=True)
+    summary = models.TextField(blank=True)
+    summarized_through = models.PositiveIntegerField(default=0)  # turn seq
+    # KG nodes cited in the session, most recent last: [{"scope", "id", "name"}]
+    concepts = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.id} ({self.scope or 'no scope'})"
+
+
+class ConversationTurn(models.Model):
+    class Role(models.TextChoices):
+        USER = "user", "User"
+        ASSISTANT = "assistant", "Assistant"
+
+    conversation = models.ForeignKey(
+        Conversation, on_delete=models.CASCADE, related_name="turns"
+    )
+    seq = models.PositiveIntegerField()  # 1-based position in the session
+    role = models.CharField(max_length=10, choices=Role.choices)
+    content = models.TextField()
+    tokens = models.PositiveIntegerField(default=0)  # estimated
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["conversation", "seq"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["conversation", "seq"], name="unique_turn_seq"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.conversation_id} #{self.seq} {self.role}"
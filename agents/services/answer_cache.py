@@ -0,0 +1,169 @@
+"""
+Semantic cache of tutor answers, in front of the chat model.
+
+Answers are stored per scope (course) together with the question's
+embedding and the grounding they were generated from: the concepts that
+were retrieved and a digest of the rendered KG context. A new question is
+served from the cache when it is grounded the same way and its normalized
+text is identical or its embedding is close enough
+(AGENT_ANSWER_CACHE_THRESHOLD). A change to the graph version retires
+only the answers whose grounding actually changed: their digest no longer
+matches what retrieval renders now.
+
+Each scope keeps at most AGENT_ANSWER_CACHE_SIZE answers (LRU), each for
+at most AGENT_ANSWER_CACHE_TTL seconds. Hits and the generation time they
+saved are counted per scope.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from knowledge.services.embeddings import embed_query
+
+PUNCTUATION = re.compile(r"[^\w\s]+")
+SPACES = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    return SPACES.sub(" ", PUNCTUATION.sub(" ", text.lower())).strip()
+
+
+def grounding_key(grounding: Dict[str, Any]) -> Tuple[Tuple[str, ...], str]:
+    """(concept ids, context digest) an answer was generated from."""
+    concepts = tuple(c["id"] for c in grounding["concepts"])
+    digest = hashlib.md5(
+        grounding["context"].encode(), usedforsecurity=False
+    ).hexdigest()
+    return concepts, digest
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    vector: np.ndarray
+    grounding: Tuple[Tuple[str, ...], str]
+    version: int
+    answer: str
+    generation_seconds: float
+    stored_at: float
+
+
+class ScopeCache:
+    """One course's answers, most recently used last."""
+
+    def __init__(self):
+        self.entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self.lookups = self.hits = 0
+        self.saved_seconds = 0.0
+
+    def expire(self, now: float) -> None:
+        ttl = settings.AGENT_ANSWER_CACHE_TTL
+        for question in [q for q, e in self.entries.items() if now - e.stored_at > ttl]:
+            del self.entries[question]
+
+    def find(
+        self, question: str, vector: np.ndarray, grounding: Tuple
+    ) -> Optional[CachedAnswer]:
+        entry = self.entries.get(question)
+        if entry and entry.grounding == grounding:
+            return entry
+        candidates = [e for e in self.entries.values() if e.grounding == grounding]
+        if not candidates:
+            return None
+        scores = np.stack([e.vector for e in candidates]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] >= settings.AGENT_ANSWER_CACHE_THRESHOLD:
+            return candidates[best]
+        return None
+
+
+_lock = threading.Lock()
+_scopes: Dict[str, ScopeCache] = {}
+
+
+def lookup(
+    scope: Optional[str], message: str, grounding: Dict[str, Any], version: int
+) -> Optional[CachedAnswer]:
+    """A stored answer to an equivalent question with the same grounding."""
+    question = normalize_question(message)
+    vector = embed_query(question)
+    key = grounding_key(grounding)
+    now = time.time()
+    with _lock:
+        cache = _scopes.setdefault(scope or "", ScopeCache())
+        cache.lookups += 1
+        cache.expire(now)
+        entry = cache.find(question, vector, key)
+        if entry is None:
+            return None
+        cache.hits += 1
+        cache.saved_seconds += entry.generation_seconds
+        entry.version = version  # still grounded the same in this version
+        cache.entries.move_to_end(entry.question)
+        return entry
+
+
+def store(
+    scope: Optional[str],
+    message: str,
+    grounding: Dict[str, Any],
+    version: int,
+    answer: str,
+    generation_seconds: float,
+) -> None:
+    question = normalize_question(message)
+    entry = CachedAnswer(
+        question=question,
+        vector=embed_query(question),
+        grounding=grounding_key(grounding),
+        version=version,
+        answer=answer,
+        generation_seconds=generation_seconds,
+        stored_at=time.time(),
+    )
+    with _lock:
+        cache = _scopes.setdefault(scope or "", ScopeCache())
+        cache.entries[question] = entry
+        cache.entries.move_to_end(question)
+        # Answers grounded in an older version of the same concepts are stale
+        stale = [
+            q
+            for q, e in cache.entries.items()
+            if e.grounding[0] == entry.grounding[0]
+            and e.grounding[1] != entry.grounding[1]
+            and e.version < version
+        ]
+        for q in stale:
+            del cache.entries[q]
+        while len(cache.entries) > settings.AGENT_ANSWER_CACHE_SIZE:
+            cache.entries.popitem(last=False)
+
+
+alookup = sync_to_async(lookup, thread_sensitive=False)
+astore = sync_to_async(store, thread_sensitive=False)
+
+
+def answer_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Per scope ("" for unscoped chats): hit rate and generation time saved."""
+    with _lock:
+        return {
+            scope: {
+                "entries": len(cache.entries),
+                "lookups": cache.lookups,
+                "hits": cache.hits,
+                "hit_rate": (
+                    round(cache.hits / cache.lookups, 3) if cache.lookups else None
+                ),
+                "saved_seconds": round(cache.saved_seconds, 2),
+            }
+            for scope, cache in _scopes.items()
+        }
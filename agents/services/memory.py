@@ -0,0 +1,160 @@
+"""
+Conversation memory with a fixed token budget per turn.
+
+Every turn of a session is stored, but a prompt only carries the rolling
+summary, the KG concepts cited so far and as many of the most recent turns
+as fit in AGENT_MEMORY_TOKENS, so prompts stop growing with the session.
+When older turns no longer fit, the huey worker folds them into the
+summary (compact), off the request path; until it has, they are simply
+left out.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+
+from agents.models import Conversation, ConversationTurn
+
+from .providers import Message, get_provider
+from .retrieval import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Most recent turns read per prompt; the token budget usually stops earlier
+RECENT_TURNS = 64
+# Cited concepts listed in the prompt
+CITED_CONCEPTS = 20
+
+SUMMARY_INSTRUCTION = (
+    "You maintain the memory of a tutoring session. Merge the previous "
+    "summary and the new turns into one updated summary of what the student "
+    "is working on, what they understood, what they struggled with and what "
+    "the tutor suggested. Keep concept names and ids exactly as written. "
+    "Write at most {words} words."
+)
+
+
+async def aget_conversation(conversation_id: str, scope: Optional[str]) -> Conversation:
+    """The session with this id (generated by the chat page), created on first use."""
+    conversation, _ = await Conversation.objects.aget_or_create(
+        id=conversation_id, defaults={"scope": scope or ""}
+    )
+    return conversation
+
+
+async def ahistory(conversation: Conversation) -> Tuple[List[Message], bool]:
+    """
+    The most recent turns that fit the budget, oldest first, and whether
+    older unsummarized turns were left out (the session needs compacting).
+    """
+    budget = settings.AGENT_MEMORY_TOKENS
+    turns = (
+        conversation.turns.filter(seq__gt=conversation.summarized_through)
+        .order_by("-seq")
+        .values_list("role", "content", "tokens")[:RECENT_TURNS]
+    )
+    messages: List[Message] = []
+    used = 0
+    async for role, content, tokens in turns:
+        if used + tokens > budget:
+            return messages[::-1], True
+        messages.append({"role": role, "content": content})
+        used += tokens
+    return messages[::-1], False
+
+
+def memory_prompt(conversation: Conversation) -> str:
+    """Summary and cited concepts, for the system prompt."""
+    parts = []
+    if conversation.summary:
+        parts.append(f"Summary of the session so far:\n{conversation.summary}")
+    cited = conversation.concepts[-CITED_CONCEPTS:]
+    if cited:
+        names = "; ".join(f"{c['name']} ({c['id']})" for c in cited)
+        parts.append(f"Concepts discussed in this session: {names}")
+    return "\n\n".join(parts)
+
+
+def record(
+    conversation_id: str,
+    role: str,
+    content: str,
+    concepts: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Appends a turn and merges the cited concepts, with the session row
+    locked so concurrent turns take consecutive seqs and keep each other's
+    concepts. Returns the session's concepts.
+    """
+    with transaction.atomic():
+        conversation = Conversation.objects.select_for_update().get(id=conversation_id)
+        last = conversation.turns.aggregate(last=Max("seq"))["last"]
+        ConversationTurn.objects.create(
+            conversation=conversation,
+            seq=(last or 0) + 1,
+            role=role,
+            content=content,
+            tokens=estimate_tokens(content) + 4,  # role and separators
+        )
+        if concepts:
+            # Most recently cited last, each concept once
+            seen = {(c["scope"], c["id"]) for c in concepts}
+            conversation.concepts = [
+                c for c in conversation.concepts if (c["scope"], c["id"]) not in seen
+            ] + concepts
+            conversation.save(update_fields=["concepts", "updated_at"])
+    return conversation.concepts
+
+
+async def arecord(
+    conversation: Conversation,
+    role: str,
+    content: str,
+    concepts: Optional[List[Dict[str, Any]]] = None,
+) -> None:
+    """Appends a turn; ``concepts`` are the KG nodes it was grounded on."""
+    args = (conversation.id, role, content, concepts)
+    try:
+        conversation.concepts = await sync_to_async(record)(*args)
+    except IntegrityError:
+        # Backends without row locks (SQLite) can still race on the seq
+        conversation.concepts = await sync_to_async(record)(*args)
+
+
+def compact(conversation_id: str) -> bool:
+    """
+    Folds the turns that no longer fit the recent window into the summary,
+    keeping the newest turns worth half the budget verbatim. Returns
+    whether anything was folded.
+    """
+    conversation = Conversation.objects.get(id=conversation_id)
+    turns = list(conversation.turns.filter(seq__gt=conversation.summarized_through))
+    keep, used = len(turns), 0
+    while keep and used + turns[keep - 1].tokens <= settings.AGENT_MEMORY_TOKENS // 2:
+        keep -= 1
+        used += turns[keep].tokens
+    fold = turns[:keep]
+    if not fold:
+        return False
+
+    transcript = "\n".join(f"{t.role}: {t.content}" for t in fold)
+    prompt = f"Previous summary:\n{conversation.summary or '(none)'}\n\nNew turns:\n{transcript}"
+    words = settings.AGENT_SUMMARY_TOKENS * 3 // 4
+    summary = async_to_sync(get_provider().complete)(
+        [{"role": "user", "content": prompt}],
+        system=SUMMARY_INSTRUCTION.format(words=words),
+    ).strip()
+    # Bound the summary even if the model ignored the length
+    summary = summary[: settings.AGENT_SUMMARY_TOKENS * 4]
+
+    # Only applies if no other compaction moved the session on meanwhile
+    updated = Conversation.objects.filter(
+        id=conversation.id, summarized_through=conversation.summarized_through
+    ).update(summary=summary, summarized_through=fold[-1].seq)
+    if updated:
+        logger.info(f"Compacted {len(fold)} turns of conversation {conversation.id}")
+    return bool(updated)
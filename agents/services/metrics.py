@@ -0,0 +1,81 @@
+"""
+Latency of streamed chat replies in this process.
+
+Time-to-first-token (request received -> first chunk sent) is what a
+student waits on, so it is the tracked metric; total stream time is kept
+alongside for reference, as are the KG retrieval and the sub-agent
+consultations that precede each reply.
+"""
+
+import statistics
+import threading
+from collections import deque
+from typing import Any, Deque, Dict
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_ttft: Deque[float] = deque(maxlen=settings.AGENT_METRICS_WINDOW)
+_total: Deque[float] = deque(maxlen=settings.AGENT_METRICS_WINDOW)
+_retrieval: Deque[float] = deque(maxlen=settings.AGENT_METRICS_WINDOW)
+# sub-agent -> recent durations and outcome counts
+_agents: Dict[str, Dict[str, Any]] = {}
+_counts = {"streams": 0, "completed": 0, "cancelled": 0, "failed": 0}
+
+# Stream outcomes
+COMPLETED, CANCELLED, FAILED = "completed", "cancelled", "failed"
+
+
+def record_ttft(seconds: float) -> None:
+    with _lock:
+        _ttft.append(seconds)
+
+
+def record_stream(outcome: str, seconds: float) -> None:
+    with _lock:
+        _counts["streams"] += 1
+        _counts[outcome] += 1
+        if outcome == COMPLETED:
+            _total.append(seconds)
+
+
+def record_retrieval(seconds: float) -> None:
+    with _lock:
+        _retrieval.append(seconds)
+
+
+def record_agent(name: str, status: str, seconds: float) -> None:
+    with _lock:
+        agent = _agents.setdefault(
+            name, {"seconds": deque(maxlen=settings.AGENT_METRICS_WINDOW)}
+        )
+        agent["seconds"].append(seconds)
+        agent[status] = agent.get(status, 0) + 1
+
+
+def percentiles(samples: Deque[float]) -> Dict[str, Any]:
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None}
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "p50_ms": round(statistics.median(ms), 2),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 2),
+    }
+
+
+def chat_metrics() -> Dict[str, Any]:
+    with _lock:
+        return {
+            **_counts,
+            "ttft": percentiles(_ttft),
+            "total": percentiles(_total),
+            "retrieval": percentiles(_retrieval),
+            "agents": {
+                name: {
+                    **{k: v for k, v in agent.items() if k != "seconds"},
+                    **percentiles(agent["seconds"]),
+                }
+                for name, agent in _agents.items()
+            },
+            "window": _ttft.maxlen,
+        }
@@ -0,0 +1,106 @@
+"""
+Chat model providers behind one streaming interface.
+
+A provider turns a conversation into an async stream of text chunks as the
+model generates them. ``stub`` is a local, deterministic model for tests and
+offline development; ``gemini`` streams from the Google GenAI API. Pick one
+with AGENT_PROVIDER.
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# {"role": "user" | "assistant", "content": str}
+Message = Dict[str, str]
+
+
+class ChatProvider(ABC):
+    name = "base"
+
+    @abstractmethod
+    def stream(
+        self, messages: List[Message], system: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Yields the reply to ``messages`` chunk by chunk. Closing the iterator
+        early (the client went away) must stop the generation.
+        """
+
+    async def complete(
+        self, messages: List[Message], system: Optional[str] = None
+    ) -> str:
+        """The whole reply; cancelling the call stops the generation."""
+        chunks = self.stream(messages, system)
+        try:
+            return "".join([text async for text in chunks])
+        finally:
+            await chunks.aclose()
+
+
+class StubProvider(ChatProvider):
+    """Echoes the last message back one word at a time, with a fixed delay."""
+
+    name = "stub"
+
+    def __init__(self, token_delay: float = 0.0):
+        self.token_delay = token_delay
+
+    async def stream(
+        self, messages: List[Message], system: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        message = messages[-1]["content"] if messages else ""
+        reply = (
+            f"I received your message: '{message}'. "
+            "This is a mock response from the Django Agent."
+        )
+        for i, word in enumerate(reply.split(" ")):
+            await asyncio.sleep(self.token_delay)
+            yield word if i == 0 else f" {word}"
+
+
+class GeminiProvider(ChatProvider):
+    name = "gemini"
+
+    def __init__(self, model: str, api_key: Optional[str]):
+        from google import genai
+
+        self.model = model
+        self.client = genai.Client(api_key=api_key)
+
+    async def stream(
+        self, messages: List[Message], system: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        contents = [
+            {
+                "role": "model" if m["role"] == "assistant" else "user",
+                "parts": [{"text": m["content"]}],
+            }
+            for m in messages
+        ]
+        config = {"system_instruction": system} if system else None
+        chunks = await self.client.aio.models.generate_content_stream(
+            model=self.model, contents=contents, config=config
+        )
+        try:
+            async for chunk in chunks:
+                if chunk.text:
+                    yield chunk.text
+        finally:
+            await chunks.aclose()  # drops the HTTP stream when cancelled
+
+
+@lru_cache(maxsize=None)
+def get_provider(name: Optional[str] = None) -> ChatProvider:
+    name = name or settings.AGENT_PROVIDER
+    if name == StubProvider.name:
+        return StubProvider(settings.AGENT_STUB_TOKEN_DELAY)
+    if name == GeminiProvider.name:
+        return GeminiProvider(settings.AGENT_MODEL, settings.GOOGLE_API_KEY)
+    raise ValueError(f"Unknown AGENT_PROVIDER: {name}")
@@ -0,0 +1,441 @@
+"""
+KG-grounded context for the tutoring agent.
+
+A student message is matched against a per-scope catalog of concepts
+(names, definitions, objectives, misconceptions and the text of their
+procedures and assessments), plus the scope's embedding index when it has
+one. The best concepts' k-hop neighborhoods (procedures with their step
+chains, assessments with their questions, prerequisite links) are rendered
+into a context that fits a token budget.
+
+Catalogs and neighborhoods are cached in-process with LRU eviction, keyed
+by the scope's GraphVersion, so a warm turn costs no Neo4j round-trip and
+any write to the scope retires its entries (within the version TTL).
+"""
+
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from knowledge.models import GraphVersion
+from knowledge.services.driver import get_async_driver, get_driver
+from knowledge.services.graph import EXPAND_RELATIONS
+from knowledge.services.prerequisites import (
+    BACKWARD_RELATIONS,
+    CONCEPT_LABEL,
+    FORWARD_RELATIONS,
+)
+from knowledge.services.schema import BASE_LABEL
+from knowledge.services.vectors import search_similar
+
+from .metrics import record_retrieval
+
+logger = logging.getLogger(__name__)
+
+BELOW_RELATIONS = f"{EXPAND_RELATIONS}|HAS_QUESTION"
+RELATED_RELATIONS = f"{FORWARD_RELATIONS}|{BACKWARD_RELATIONS}"
+
+# Field weights when matching a message to a concept
+NAME_WEIGHT, TEXT_WEIGHT, BELOW_WEIGHT = 3.0, 1.0, 0.5
+# Weight of the embedding similarity next to the (0..1) term overlap
+SEMANTIC_WEIGHT = 1.0
+
+STOPWORDS = set(
+    "a an and are as at be by can do does for from how i in is it me my of on "
+    "or should so that the this to use using was what when where which why "
+    "with you your".split()
+)
+TERM_PATTERN = re.compile(r"\w+")
+
+# Concept key: (scope, id)
+Key = Tuple[str, str]
+
+# scope -> (monotonic time read, GraphVersion); see current_version
+_versions: Dict[Optional[str], Tuple[float, int]] = {}
+
+
+def terms(text: str) -> List[str]:
+    """Lowercase terms; snake_case names also count by their parts."""
+    found = []
+    for word in TERM_PATTERN.findall(text.lower()):
+        parts = [p for p in word.split("_") if p]
+        for term in [word, *parts] if len(parts) > 1 else [word]:
+            if term not in STOPWORDS and len(term) > 1:
+                found.append(term)
+    return found
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English and code
+    return math.ceil(len(text) / 4)
+
+
+def as_text(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return "; ".join(str(v) for v in value if v)
+    return str(value) if value else ""
+
+
+class HotCache:
+    """Thread-safe LRU used for catalogs and neighborhoods alike."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else None,
+            }
+
+
+cache = HotCache(settings.AGENT_RETRIEVAL_CACHE_SIZE)
+
+
+# === Neo4j reads (one query each, sync and async like knowledge.services.graph) ===
+
+
+def catalog_query(scope: Optional[str], depth: int) -> str:
+    scope_filter = " {scope: $scope}" if scope else ""
+    return f"""
+    MATCH (c:{CONCEPT_LABEL}{scope_filter})
+    OPTIONAL MATCH (c)-[:{BELOW_RELATIONS}*1..{int(depth)}]->(n)
+    WHERE NOT n:{CONCEPT_LABEL}
+    WITH c, collect(DISTINCT coalesce(n.name, '') + ' ' + coalesce(n.hint, '') + ' '
+                    + coalesce(n.code_snippet, '') + ' ' + coalesce(n.text, '')) AS below
+    RETURN c.scope AS scope, c.id AS id, c.name AS name,
+           [c.definition, c.learning_objective, c.misconceptions] AS text, below
+    """
+
+
+def neighborhood_query(depth: int) -> str:
+    # Step chains nest one HAS_CHILD per step, so the hop limit bounds them
+    return f"""
+    UNWIND $keys AS key
+    MATCH (c:{CONCEPT_LABEL} {{scope: key.scope, id: key.id}})
+    OPTIONAL MATCH (c)-[s:{RELATED_RELATIONS}]-(m:{CONCEPT_LABEL} {{scope: key.scope}})
+    WITH c, [x IN collect(DISTINCT {{
+        relation: type(s), outgoing: startNode(s) = c, id: m.id, name: m.name
+    }}) WHERE x.id IS NOT NULL] AS related
+    OPTIONAL MATCH p = (c)-[:{BELOW_RELATIONS}*1..{int(depth)}]->(n)
+    WHERE none(x IN nodes(p)[1..] WHERE x:{CONCEPT_LABEL})
+    WITH c, related, n, last(relationships(p)) AS r, min(length(p)) AS level
+    RETURN c.scope AS scope, c.id AS id, properties(c) AS concept, related,
+           collect(CASE WHEN n IS NULL THEN null ELSE {{
+               parent: startNode(r).id, node: properties(n), level: level,
+               label: [l IN labels(n) WHERE l <> '{BASE_LABEL}'][0]
+           }} END) AS below
+    """
+
+
+def fetch_catalog(scope: Optional[str]) -> List[Dict[str, Any]]:
+    with get_driver().session() as session:
+        result = session.run(
+            catalog_query(scope, settings.AGENT_RETRIEVAL_DEPTH), scope=scope
+        )
+        return [dict(r) for r in result]
+
+
+async def afetch_catalog(scope: Optional[str]) -> List[Dict[str, Any]]:
+    async with get_async_driver().session() as session:
+        result = await session.run(
+            catalog_query(scope, settings.AGENT_RETRIEVAL_DEPTH), scope=scope
+        )
+        return [dict(r) async for r in result]
+
+
+def fetch_neighborhoods(keys: List[Key]) -> List[Dict[str, Any]]:
+    with get_driver().session() as session:
+        result = session.run(
+            neighborhood_query(settings.AGENT_RETRIEVAL_DEPTH),
+            keys=[{"scope": s, "id": i} for s, i in keys],
+        )
+        return [dict(r) for r in result]
+
+
+async def afetch_neighborhoods(keys: List[Key]) -> List[Dict[str, Any]]:
+    async with get_async_driver().session() as session:
+        result = await session.run(
+            neighborhood_query(settings.AGENT_RETRIEVAL_DEPTH),
+            keys=[{"scope": s, "id": i} for s, i in keys],
+        )
+        return [dict(r) async for r in result]
+
+
+# === Matching ===
+
+
+class Catalog:
+    """Weighted inverted index from terms to the concepts of one scope version."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.names: Dict[Key, str] = {}
+        self.postings: Dict[str, Dict[Key, float]] = {}
+        for row in rows:
+            key = (row["scope"], row["id"])
+            self.names[key] = row["name"] or row["id"]
+            weights: Counter = Counter()
+            for field, weight in (
+                ([row["name"] or ""], NAME_WEIGHT),
+                (row["text"], TEXT_WEIGHT),
+                (row["below"], BELOW_WEIGHT),
+            ):
+                for term in set(terms(" ".join(as_text(v) for v in field))):
+                    weights[term] += weight
+            for term, weight in weights.items():
+                self.postings.setdefault(term, {})[key] = weight
+
+    def match(
+        self, message: str, limit: int, similar: Optional[Dict[Key, float]] = None
+    ) -> List[Key]:
+        """
+        Best concepts for ``message`` by idf-weighted term overlap, scaled
+        to 0..1 and added to the ``similar`` embedding scores if given.
+        """
+        total = len(self.names)
+        scores: Counter = Counter()
+        for term in set(terms(message)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + total / len(postings))
+            for key, weight in postings.items():
+                scores[key] += weight * idf
+        if similar:
+            top = max(scores.values(), default=0) or 1.0
+            scores = Counter({key: score / top for key, score in scores.items()})
+            for key, score in similar.items():
+                if key in self.names and score > 0:
+                    scores[key] += SEMANTIC_WEIGHT * score
+        return [key for key, _ in scores.most_common(limit)]
+
+
+# === Rendering ===
+
+
+def render_steps(parent: str, children: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+    """Numbered step chain below ``parent`` (each step nests the next)."""
+    lines = []
+    stack = list(reversed(children.get(parent, [])))
+    number = 0
+    while stack:
+        step = stack.pop()
+        node = step["node"]
+        number += 1
+        lines.append(f"{number}. {node.get('name') or node.get('id')}")
+        if node.get("code_snippet"):
+            lines.append(f"   Code: {node['code_snippet']}")
+        if node.get("hint"):
+            lines.append(f"   Hint: {node['hint']}")
+        stack.extend(reversed(children.get(node.get("id"), [])))
+    return lines
+
+
+def render_neighborhood(row: Dict[str, Any]) -> List[Tuple[int, str]]:
+    """
+    Context blocks of one concept as (priority, text): 0 the concept itself,
+    1 its procedures, 2 its assessments. Lower priorities are kept first
+    when the budget is tight.
+    """
+    concept = row["concept"]
+    lines = [f"## {concept.get('name') or row['id']} ({row['id']})"]
+    for label, field in (
+        ("Definition", "definition"),
+        ("Learning objective", "learning_objective"),
+        ("Common misconceptions", "misconceptions"),
+        ("Difficulty", "difficulty"),
+    ):
+        if concept.get(field):
+            lines.append(f"{label}: {as_text(concept[field])}")
+    for title, outgoing_relations in (
+        ("Builds on", {"DEPENDS_ON": True, "PREREQUISITE_FOR": False}),
+        ("Leads to", {"PREREQUISITE_FOR": True, "EXTENDS_TO": True}),
+    ):
+        names = [
+            r["name"] or r["id"]
+            for r in row["related"]
+            if outgoing_relations.get(r["relation"]) == r["outgoing"]
+        ]
+        if names:
+            lines.append(f"{title}: {'; '.join(sorted(set(names)))}")
+    blocks = [(0, "\n".join(lines))]
+
+    children: Dict[str, List[Dict[str, Any]]] = {}
+    for item in sorted(row["below"], key=lambda item: item["node"].get("id", "")):
+        children.setdefault(item["parent"], []).append(item)
+    for item in children.get(row["id"], []):
+        node = item["node"]
+        name = node.get("name") or node.get("id")
+        if item["label"] == "Procedure":
+            steps = render_steps(node.get("id"), children)
+            blocks.append((1, "\n".join([f"### Procedure: {name}", *steps])))
+        elif item["label"] == "Assessment":
+            lines = [f"### Assessment: {name}"]
+            if node.get("objectives"):
+                lines.append(f"Objectives: {as_text(node['objectives'])}")
+            questions = children.get(node.get("id"), [])
+            lines += [f"- {q['node'].get('text')}" for q in questions]
+            blocks.append((2, "\n".join(lines)))
+    return blocks
+
+
+def assemble(
+    neighborhoods: List[List[Tuple[int, str]]], budget: int
+) -> Tuple[str, int]:
+    """
+    Fills ``budget`` tokens tier by tier (every concept's core before any
+    procedure) and returns the context in concept order with its size. A
+    concept's procedures and assessments are only kept along with its core.
+    """
+    chosen: List[Tuple[int, int, str]] = []
+    kept = set()
+    used = 0
+    candidates = sorted(
+        (priority, rank, text)
+        for rank, blocks in enumerate(neighborhoods)
+        for priority, text in blocks
+    )
+    for priority, rank, text in candidates:
+        cost = estimate_tokens(text) + 1
+        if used + cost <= budget and (priority == 0 or rank in kept):
+            chosen.append((rank, priority, text))
+            kept.add(rank)
+            used += cost
+    return "\n\n".join(text for _, _, text in sorted(chosen)), used
+
+
+# === Entry point ===
+
+
+async def current_version(scope: Optional[str]) -> int:
+    """
+    The scope's GraphVersion, re-read at most every
+    AGENT_RETRIEVAL_VERSION_TTL seconds: a busy classroom shares one
+    database read instead of queueing one per turn on the ORM's thread.
+    """
+    now = time.monotonic()
+    checked = _versions.get(scope)
+    if checked and now - checked[0] < settings.AGENT_RETRIEVAL_VERSION_TTL:
+        return checked[1]
+    version = await GraphVersion.acurrent(scope)
+    _versions[scope] = (now, version)
+    return version
+
+
+async def call_graph(asgi: bool, sync_fn: Callable, async_fn: Callable, *args: Any):
+    # Same split as knowledge.views.run_graph_call: the async driver only
+    # lives on ASGI's long-running loop
+    if asgi:
+        return await async_fn(*args)
+    return await sync_to_async(sync_fn, thread_sensitive=False)(*args)
+
+
+async def similar_concepts(message: str, scope: str) -> Dict[Key, float]:
+    """
+    Concepts whose own text, steps or questions are closest in meaning to
+    ``message``, from the scope's embedding index (empty if it has none).
+    """
+    try:
+        hits = await sync_to_async(search_similar, thread_sensitive=False)(
+            scope, message, settings.AGENT_RETRIEVAL_CONCEPTS * 4
+        )
+    except Exception as e:
+        logger.warning(f"Embedding search failed for scope {scope}: {e}")
+        return {}
+    similar: Dict[Key, float] = {}
+    for hit in hits:
+        key = (scope, hit["concept"])
+        similar[key] = max(similar.get(key, 0.0), hit["score"])
+    return similar
+
+
+async def aretrieve(
+    message: str, scope: Optional[str], asgi: bool = True
+) -> Dict[str, Any]:
+    """
+    Context for answering ``message``: {"context", "concepts", "tokens",
+    "version"}, the version being the scope's GraphVersion it was read at.
+    Only cache misses go to Neo4j, in at most two queries.
+    """
+    started = time.perf_counter()
+    version = await current_version(scope)
+
+    catalog = cache.get(("catalog", scope, version))
+    if catalog is None:
+        rows = await call_graph(asgi, fetch_catalog, afetch_catalog, scope)
+        catalog = Catalog(rows)
+        cache.put(("catalog", scope, version), catalog)
+    similar = await similar_concepts(message, scope) if scope else None
+    keys = catalog.match(message, settings.AGENT_RETRIEVAL_CONCEPTS, similar)
+
+    blocks: Dict[Key, List[Tuple[int, str]]] = {}
+    missing = []
+    for key in keys:
+        cached = cache.get(("concept", scope, version, key))
+        if cached is None:
+            missing.append(key)
+        else:
+            blocks[key] = cached
+    if missing:
+        rows = await call_graph(
+            asgi, fetch_neighborhoods, afetch_neighborhoods, missing
+        )
+        for row in rows:
+            key = (row["scope"], row["id"])
+            blocks[key] = render_neighborhood(row)
+            cache.put(("concept", scope, version, key), blocks[key])
+
+    context, tokens = assemble(
+        [blocks[key] for key in keys if key in blocks],
+        settings.AGENT_CONTEXT_TOKENS,
+    )
+    record_retrieval(time.perf_counter() - started)
+    return {
+        "context": context,
+        "concepts": [
+            {"scope": s, "id": i, "name": catalog.names[(s, i)]} for s, i in keys
+        ],
+        "tokens": tokens,
+        "version": version,
+    }
+
+
+def system_prompt(context: str) -> str:
+    prompt = (
+        "You are a patient tutor for the course material below. Guide the "
+        "student towards the answer with hints and questions before giving "
+        "it away, and address the misconceptions listed when they show up."
+    )
+    if not context:
+        return prompt + " No course material matched this message."
+    return f"{prompt}\n\nCourse material:\n\n{context}"
@@ -0,0 +1,157 @@
+"""
+Supervisor agent and the specialist sub-agents it consults on each turn.
+
+Before the supervisor answers, the hint, misconception and assessment
+agents each read the turn's KG context and write a short note. They run
+concurrently, each under its own deadline (AGENT_SUBAGENT_DEADLINES): an
+agent that has not finished by then is cancelled, which also stops its
+model generation, and the supervisor answers with whatever notes arrived.
+A turn therefore waits at most for the longest deadline, not for the sum
+of the agents. Every consultation leaves a timing trace.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from .metrics import record_agent
+from .providers import ChatProvider, StubProvider, get_provider
+
+logger = logging.getLogger(__name__)
+
+# Consultation outcomes
+OK, EMPTY, TIMEOUT, FAILED, CANCELLED = "ok", "empty", "timeout", "failed", "cancelled"
+
+# Sub-agents answer this when they have nothing to add
+NOTHING = "NONE"
+
+
+@dataclass
+class Turn:
+    message: str
+    context: str
+
+
+class SubAgent:
+    name = "base"
+    instruction = ""
+
+    def __init__(self, provider: ChatProvider, deadline: float):
+        self.provider = provider
+        self.deadline = deadline
+
+    async def run(self, turn: Turn) -> Optional[str]:
+        """A note for the supervisor, or None when there is nothing to add."""
+        note = await self.provider.complete(
+            [{"role": "user", "content": turn.message}],
+            system=(
+                f"{self.instruction} Reply in at most three sentences, or with "
+                f"{NOTHING} if nothing applies.\n\nCourse material:\n\n{turn.context}"
+            ),
+        )
+        note = note.strip()
+        if not note or note.upper().startswith(NOTHING):
+            return None
+        return note
+
+
+class HintAgent(SubAgent):
+    name = "hint"
+    instruction = (
+        "You help a tutor scaffold a student. From the procedure steps and "
+        "hints in the course material, give the next hint for where the "
+        "student is, general before specific. Never give the full solution "
+        "or complete code."
+    )
+
+
+class MisconceptionAgent(SubAgent):
+    name = "misconception"
+    instruction = (
+        "You help a tutor spot misconceptions. If the student's message shows "
+        "one of the common misconceptions in the course material, name it and "
+        "what the tutor should correct."
+    )
+
+
+class AssessmentAgent(SubAgent):
+    name = "assessment"
+    instruction = (
+        "You help a tutor check understanding. Pick the one question from "
+        "the course material's assessments that best checks what the student "
+        "is working on."
+    )
+
+
+SUBAGENTS = {cls.name: cls for cls in (HintAgent, MisconceptionAgent, AssessmentAgent)}
+
+
+async def consult(agent: SubAgent, turn: Turn) -> Dict[str, Any]:
+    """Runs one agent under its deadline; never raises except when cancelled."""
+    started = time.perf_counter()
+    note = None
+    try:
+        note = await asyncio.wait_for(agent.run(turn), agent.deadline)
+        status = OK if note else EMPTY
+    except TimeoutError:
+        status = TIMEOUT
+    except asyncio.CancelledError:
+        record_agent(agent.name, CANCELLED, time.perf_counter() - started)
+        raise
+    except Exception as e:
+        status = FAILED
+        logger.error(f"Sub-agent {agent.name} failed: {e}")
+    seconds = time.perf_counter() - started
+    record_agent(agent.name, status, seconds)
+    return {
+        "agent": agent.name,
+        "status": status,
+        "ms": round(seconds * 1000, 1),
+        "note": note,
+    }
+
+
+class Supervisor:
+    def __init__(self, agents: List[SubAgent]):
+        self.agents = agents
+
+    async def consult(self, turn: Turn) -> List[Dict[str, Any]]:
+        """
+        Traces of all sub-agents, run concurrently. Cancelling the turn (the
+        client left) cancels every agent still running.
+        """
+        if not turn.context or not self.agents:
+            return []  # nothing for the specialists to work from
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(consult(a, turn)) for a in self.agents]
+        return [task.result() for task in tasks]
+
+    def system_prompt(self, base: str, traces: List[Dict[str, Any]]) -> str:
+        """The supervisor's instructions with the notes that arrived in time."""
+        notes = [f"- {t['agent']}: {t['note']}" for t in traces if t["note"]]
+        if not notes:
+            return base
+        return (
+            f"{base}\n\nNotes from your specialist agents (use them, do not "
+            "quote them):\n" + "\n".join(notes)
+        )
+
+
+@lru_cache(maxsize=None)
+def get_supervisor() -> Supervisor:
+    provider = get_provider()
+    if isinstance(provider, StubProvider):
+        # The stub's token delay imitates streaming the reply; sub-agent notes
+        # are never streamed, so pacing them only delays the first token
+        provider = StubProvider()
+    agents = []
+    for name, deadline in settings.AGENT_SUBAGENT_DEADLINES.items():
+        if name not in SUBAGENTS:
+            raise ValueError(f"Unknown sub-agent in AGENT_SUBAGENT_DEADLINES: {name}")
+        agents.append(SUBAGENTS[name](provider, deadline))
+    return Supervisor(agents)
@@ -0,0 +1,14 @@
+from django_huey import lock_task, task
+from huey.exceptions import TaskLockedException
+
+from agents.services.memory import compact
+
+
+@task()
+def compact_conversation(conversation_id: str):
+    """Folds a chat session's older turns into its rolling summary."""
+    try:
+        with lock_task(f"compact-conversation-{conversation_id}"):
+            compact(conversation_id)
+    except TaskLockedException:
+        pass  # already being compacted; that run folds these turns too
@@ -5,4 +5,5 @@ from . import views
 urlpatterns = [
     path("chat/", views.chat_view, name="chat_view"),
     path("api/message/", views.chat_api, name="chat_api"),
+    path("api/metrics/", views.chat_metrics_view, name="chat_metrics"),
 ]
@@ -1,26 +1,205 @@
+import asyncio
 import json
+import logging
+import time
+import uuid
+from typing import Any, AsyncGenerator, Dict
 
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 
+from agents.services import answer_cache, memory
+from agents.services.metrics import (
+    CANCELLED,
+    COMPLETED,
+    FAILED,
+    chat_metrics,
+    record_stream,
+    record_ttft,
+)
+from agents.services.providers import get_provider
+from agents.services.retrieval import aretrieve, cache, system_prompt
+from agents.services.supervisor import Turn, get_supervisor
+from agents.tasks import compact_conversation
+from analytics.models import LearningEvent
+from analytics.services import events
+
+logger = logging.getLogger(__name__)
+
 
 def chat_view(request):
     """Renders the chat interface."""
     return render(request, "agents/chat.html")
 
 
-def chat_api(request):
-    """Simple echo/mock API for the agent."""
-    if request.method == "POST":
+def sse(event: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+
+async def chat_api(request: HttpRequest) -> HttpResponse:
+    """
+    Streams the agent's reply to {"message": ..., "scope"?, "conversation"?}
+    as Server-Sent Events: {"type": "sources", "concepts"} for the KG concepts the reply is
+    grounded on, {"type": "trace", "agents"} once the supervisor's
+    sub-agents were consulted, one {"type": "token", "text"} per chunk, then
+    {"type": "done", "cached"} (or "error"). Answers to questions already
+    asked with the same grounding come from the semantic answer cache.
+    With a conversation id (a UUID chosen by the page) the session's memory
+    is part of the prompt.
+    When the client disconnects the generation is cancelled. Needs ASGI to
+    stream; under WSGI the reply arrives in one piece.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=405)
+    try:
+        data = json.loads(request.body)
+        message = str(data.get("message", "")).strip()
+        scope = str(data.get("scope") or "").strip() or None
+        conversation_id = data.get("conversation")
+        if conversation_id is not None:
+            conversation_id = str(uuid.UUID(str(conversation_id)))
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if not message:
+        return JsonResponse({"error": "message required"}, status=400)
+
+    received = time.perf_counter()
+    provider = get_provider()
+
+    async def ground() -> Dict[str, Any]:
+        try:
+            return await aretrieve(
+                message, scope, asgi=isinstance(request, ASGIRequest)
+            )
+        except Exception as e:
+            # The tutor still answers, just without course material
+            logger.warning(f"KG retrieval failed for scope {scope}: {e}")
+            return {"context": "", "concepts": [], "version": None}
+
+    async def recall():
+        if conversation_id is None:
+            return None, [], False
+        conversation = await memory.aget_conversation(conversation_id, scope)
+        return conversation, *await memory.ahistory(conversation)
+
+    def track_turn(grounding: Dict[str, Any], cached: bool) -> None:
+        concepts = [c["id"] for c in grounding["concepts"]]
+        events.record(
+            LearningEvent.Kind.CHAT_TURN,
+            scope=scope,
+            node=concepts[0] if concepts else "",
+            value=round((time.perf_counter() - received) * 1000, 1),  # ms
+            session=conversation_id,
+            data={"cached": cached, "concepts": concepts},
+        )
+
+    async def event_stream() -> AsyncGenerator[str, None]:
+        outcome = CANCELLED  # unless the turn gets to the end
+        tokens = None
         try:
-            data = json.loads(request.body)
-            message = data.get("message", "")
+            grounding, (conversation, history, needs_compacting) = await asyncio.gather(
+                ground(), recall()
+            )
+            if conversation:
+                await memory.arecord(conversation, "user", message)
+            if needs_compacting:
+                # Older turns already fall outside the prompt; fold them later
+                await sync_to_async(compact_conversation)(conversation_id)
+            yield sse({"type": "sources", "concepts": grounding["concepts"]})
 
-            # TODO: Integrate real LLM here
-            response_text = f"I received your message: '{message}'. This is a mock response from the Django Agent."
+            cacheable = grounding["version"] is not None
+            cached = None
+            if cacheable:
+                cached = await answer_cache.alookup(
+                    scope, message, grounding, grounding["version"]
+                )
+            if cached:
+                record_ttft(time.perf_counter() - received)
+                yield sse({"type": "token", "text": cached.answer})
+                if conversation:
+                    await memory.arecord(
+                        conversation, "assistant", cached.answer, grounding["concepts"]
+                    )
+                yield sse({"type": "done", "cached": True})
+                outcome = COMPLETED
+                track_turn(grounding, cached=True)
+                return
 
-            return JsonResponse({"response": response_text})
+            generation_started = time.perf_counter()
+            supervisor = get_supervisor()
+            traces = await supervisor.consult(Turn(message, grounding["context"]))
+            # Notes are for the supervisor only; the page gets the timings
+            yield sse(
+                {
+                    "type": "trace",
+                    "agents": [
+                        {k: t[k] for k in ("agent", "status", "ms")} for t in traces
+                    ],
+                }
+            )
+
+            prompt = system_prompt(grounding["context"])
+            if conversation and (remembered := memory.memory_prompt(conversation)):
+                prompt = f"{prompt}\n\n{remembered}"
+            answer = []
+            tokens = provider.stream(
+                [*history, {"role": "user", "content": message}],
+                system=supervisor.system_prompt(prompt, traces),
+            )
+            first = True
+            async for text in tokens:
+                if first:
+                    record_ttft(time.perf_counter() - received)
+                    first = False
+                answer.append(text)
+                yield sse({"type": "token", "text": text})
+            outcome = COMPLETED
+            if conversation:
+                await memory.arecord(
+                    conversation, "assistant", "".join(answer), grounding["concepts"]
+                )
+            # Answers that built on earlier turns may not stand on their own
+            if cacheable and not history:
+                await answer_cache.astore(
+                    scope,
+                    message,
+                    grounding,
+                    grounding["version"],
+                    "".join(answer),
+                    time.perf_counter() - generation_started,
+                )
+            yield sse({"type": "done", "cached": False})
+            track_turn(grounding, cached=False)
+        except asyncio.CancelledError:
+            logger.info(f"Chat stream cancelled by the client ({provider.name})")
+            raise
         except Exception as e:
-            return JsonResponse({"error": str(e)}, status=400)
+            outcome = FAILED
+            logger.error(f"Chat stream failed ({provider.name}): {e}")
+            yield sse({"type": "error", "error": "The agent could not answer."})
+        finally:
+            if tokens is not None:
+                await tokens.aclose()  # stops the model generating for nobody
+            record_stream(outcome, time.perf_counter() - received)
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # proxies must not hold tokens back
+    return response
+
 
-    return JsonResponse({"error": "POST required"}, status=405)
+def chat_metrics_view(request: HttpRequest) -> JsonResponse:
+    """
+    Time-to-first-token and retrieval percentiles, stream outcomes, the
+    retrieval cache's hit ratio and the answer cache per course in this
+    process.
+    """
+    return JsonResponse(
+        {
+            **chat_metrics(),
+            "retrieval_cache": cache.stats(),
+            "answer_cache": answer_cache.answer_cache_stats(),
+        }
+    )
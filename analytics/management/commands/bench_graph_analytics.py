@@ -0,0 +1,57 @@
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from analytics.services.metrics import compute_metrics
+
+
+def synthetic_graph(nodes: int, degree: int, window: int, seed: int):
+    """
+    Random prerequisite DAG: each concept depends on up to ``degree``
+    concepts among the ``window`` before it, as courses tend to build on
+    recent material. About 2% of the concepts are left unconnected.
+    """
+    rng = np.random.default_rng(seed)
+    dst = np.repeat(np.arange(1, nodes), degree)
+    src = dst - rng.integers(1, window + 1, len(dst))
+    keep = src >= 0
+    isolated = rng.random(nodes) < 0.02
+    keep &= ~isolated[src] & ~isolated[dst]
+    return src[keep], dst[keep]
+
+
+class Command(BaseCommand):
+    help = "Times the graph analytics metrics on a synthetic prerequisite graph."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--nodes", type=int, default=100_000)
+        parser.add_argument("--degree", type=int, default=3)
+        parser.add_argument("--window", type=int, default=200)
+        parser.add_argument("--samples", type=int, default=64)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        src, dst = synthetic_graph(
+            options["nodes"], options["degree"], options["window"], options["seed"]
+        )
+        self.stdout.write(
+            f"{options['nodes']} nodes, {len(src)} edges, "
+            f"{options['samples']} betweenness samples"
+        )
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        metrics = compute_metrics(options["nodes"], src, dst, options["samples"])
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        for name, seconds in metrics["timings"].items():
+            self.stdout.write(f"{name:<12} {seconds:>8.2f} s")
+        self.stdout.write(f"{'total':<12} {elapsed:>8.2f} s   peak {peak >> 20} MiB")
+        self.stdout.write(
+            f"max chain depth {metrics['chain_depth'].max()}, "
+            f"{metrics['orphan'].sum()} orphans, {metrics['cycles']} cycles"
+        )
@@ -0,0 +1,119 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from analytics.models import EventRollup, LearningEvent
+from analytics.services.events import EventBuffer
+from knowledge.management.bench import summarize
+
+# Rows written by the benchmark, deleted afterwards
+BENCH_SCOPE = "__bench_learning_events__"
+
+
+def synthetic_event(i: int, session: uuid.UUID) -> LearningEvent:
+    return LearningEvent(
+        kind=LearningEvent.Kind.NODE_EXPAND + i % 4,
+        occurred_at=timezone.now(),
+        session=session,
+        scope=BENCH_SCOPE,
+        node=f"C{i % 200:03d}",  # a course of 200 concepts
+        value=float(i % 100),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures sustained learning event ingestion: producer threads record "
+        "events through the batched buffer while it writes them, against "
+        "saving each event on its own. Run it once per database alias (for "
+        "instance SQLite and a PostgreSQL alias in DATABASES)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=200_000)
+        parser.add_argument("--producers", type=int, default=8)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--interval", type=float, default=1.0)
+        parser.add_argument("--max-pending", type=int, default=50_000)
+        parser.add_argument(
+            "--direct",
+            type=int,
+            default=2000,
+            help="Events saved one by one for the baseline (0 to skip)",
+        )
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        vendor = connections[using].vendor
+        self.stdout.write(
+            f"{vendor} ({using}): {options['events']} events from "
+            f"{options['producers']} producers, batches of {options['batch_size']}"
+        )
+        try:
+            if options["direct"]:
+                self.direct(options["direct"], using)
+            self.buffered(options, using)
+        finally:
+            LearningEvent.objects.using(using).filter(scope=BENCH_SCOPE).delete()
+            EventRollup.objects.using(using).filter(scope=BENCH_SCOPE).delete()
+
+    def direct(self, count: int, using: str) -> None:
+        session = uuid.uuid4()
+        latencies = []
+        started = time.perf_counter()
+        for i in range(count):
+            call = time.perf_counter()
+            synthetic_event(i, session).save(using=using)
+            latencies.append(time.perf_counter() - call)
+        rate = count / (time.perf_counter() - started)
+        self.stdout.write(summarize("save()", latencies) + f"   {rate:>9.0f} ev/s")
+
+    def buffered(self, options, using: str) -> None:
+        buffer = EventBuffer(
+            batch_size=options["batch_size"],
+            interval=options["interval"],
+            max_pending=options["max_pending"],
+            using=using,
+        )
+        per_producer = options["events"] // options["producers"]
+        latencies = [[] for _ in range(options["producers"])]
+        refused = [0] * options["producers"]
+
+        def produce(n: int) -> None:
+            session = uuid.uuid4()
+            for i in range(per_producer):
+                event = synthetic_event(i, session)
+                call = time.perf_counter()
+                while not buffer.record([event]):
+                    refused[n] += 1
+                    time.sleep(0.01)  # as a client honouring Retry-After would
+                latencies[n].append(time.perf_counter() - call)
+
+        started = time.perf_counter()
+        producers = [
+            threading.Thread(target=produce, args=(n,))
+            for n in range(options["producers"])
+        ]
+        for producer in producers:
+            producer.start()
+        for producer in producers:
+            producer.join()
+        produced = time.perf_counter() - started
+        buffer.flush()
+        elapsed = time.perf_counter() - started
+
+        stats = buffer.stats()
+        self.stdout.write(
+            summarize("record()", [s for n in latencies for s in n])
+            + f"   {stats['written'] / elapsed:>9.0f} ev/s"
+        )
+        self.stdout.write(
+            f"{stats['written']} written in {stats['batches']} batches "
+            f"(mean {stats['mean_batch_ms']} ms), {sum(refused)} refusals, "
+            f"producers done after {produced:.2f} s, drained after {elapsed:.2f} s"
+        )
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.services.metrics import analyze_scope
+from knowledge.services.graph import fetch_scopes
+
+
+class Command(BaseCommand):
+    help = (
+        "Computes betweenness, chain depth and orphan metrics of every scope "
+        "(or --scope) and writes them to the Concept nodes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scope", action="append", default=None)
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=None,
+            help="Betweenness BFS sources (default: ANALYTICS_BETWEENNESS_SAMPLES)",
+        )
+
+    def handle(self, *args, **options):
+        for scope in options["scope"] or fetch_scopes():
+            started = time.perf_counter()
+            summary = analyze_scope(scope, options["samples"])
+            self.stdout.write(
+                f"{scope}: {summary.concept_count} concepts, max depth "
+                f"{summary.max_chain_depth}, {summary.orphan_count} orphans, "
+                f"{summary.cycle_count} cycles in {time.perf_counter() - started:.2f}s"
+            )
@@ -0,0 +1,36 @@
+# Generated by Django 6.1.2 on 2026-10-19 05:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ScopeAnalytics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=255, unique=True)),
+                ("concept_count", models.PositiveIntegerField(default=0)),
+                ("relation_count", models.PositiveIntegerField(default=0)),
+                ("max_chain_depth", models.PositiveIntegerField(default=0)),
+                ("orphan_count", models.PositiveIntegerField(default=0)),
+                ("cycle_count", models.PositiveIntegerField(default=0)),
+                ("bottlenecks", models.JSONField(default=list)),
+                ("samples", models.PositiveIntegerField(default=0)),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
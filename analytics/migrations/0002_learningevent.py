@@ -0,0 +1,69 @@
+# Generated by Django 6.1.2 on 2026-10-19 05:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LearningEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (1, "node_expand"),
+                            (2, "hint_reveal"),
+                            (3, "chat_turn"),
+                            (4, "assessment_attempt"),
+                        ]
+                    ),
+                ),
+                ("occurred_at", models.DateTimeField()),
+                ("session", models.UUIDField(blank=True, null=True)),
+                ("scope", models.CharField(blank=True, max_length=255)),
+                ("node", models.CharField(blank=True, max_length=64)),
+                ("value", models.FloatField(blank=True, null=True)),
+                ("data", models.JSONField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["scope", "kind", "occurred_at"],
+                        name="event_scope_kind_time",
+                    ),
+                    models.Index(
+                        fields=["user", "occurred_at"], name="event_user_time"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.1.2 on 2026-10-19 05:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0002_learningevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=255)),
+                ("concept", models.CharField(max_length=64)),
+                ("bloom_level", models.CharField(blank=True, max_length=32)),
+                ("metric", models.CharField(max_length=32)),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("hour", "Hour"), ("day", "Day")], max_length=4
+                    ),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("count", models.PositiveBigIntegerField(default=0)),
+                ("total", models.FloatField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "scope",
+                            "metric",
+                            "granularity",
+                            "bucket",
+                            "concept",
+                            "bloom_level",
+                        ),
+                        name="unique_event_rollup",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,3 +1,100 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class ScopeAnalytics(models.Model):
+    """Latest graph analytics of a scope; per-concept values live on the nodes."""
+
+    scope = models.CharField(max_length=255, unique=True)
+    concept_count = models.PositiveIntegerField(default=0)
+    relation_count = models.PositiveIntegerField(default=0)  # prerequisite edges
+    max_chain_depth = models.PositiveIntegerField(default=0)
+    orphan_count = models.PositiveIntegerField(default=0)
+    cycle_count = models.PositiveIntegerField(default=0)
+    bottlenecks = models.JSONField(default=list)  # [{"id", "betweenness"}], top first
+    samples = models.PositiveIntegerField(default=0)  # betweenness BFS sources
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.scope} ({self.concept_count} concepts)"
+
+
+class LearningEvent(models.Model):
+    """
+    One student interaction. Rows are written in batches by the event buffer
+    (analytics/services/events.py), so the schema is kept narrow: the kind is
+    a small integer, the node is the KG id and anything else goes in ``data``.
+    """
+
+    class Kind(models.IntegerChoices):
+        NODE_EXPAND = 1, "node_expand"
+        HINT_REVEAL = 2, "hint_reveal"
+        CHAT_TURN = 3, "chat_turn"
+        ASSESSMENT_ATTEMPT = 4, "assessment_attempt"
+
+    kind = models.PositiveSmallIntegerField(choices=Kind.choices)
+    occurred_at = models.DateTimeField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        db_index=False,  # covered by the (user, occurred_at) index
+        related_name="+",
+    )
+    session = models.UUIDField(null=True, blank=True)  # browser tab or chat session
+    scope = models.CharField(max_length=255, blank=True)
+    node = models.CharField(max_length=64, blank=True)  # KG node id
+    value = models.FloatField(null=True, blank=True)  # e.g. score, duration in ms
+    data = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["scope", "kind", "occurred_at"], name="event_scope_kind_time"
+            ),
+            models.Index(fields=["user", "occurred_at"], name="event_user_time"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.node} ({self.occurred_at})"
+
+
+class EventRollup(models.Model):
+    """
+    Learning event counts per concept, metric and hour or day, kept up to
+    date as event batches are written (analytics/services/rollups.py).
+    Dashboards read these instead of the raw events.
+    """
+
+    class Granularity(models.TextChoices):
+        HOUR = "hour", "Hour"
+        DAY = "day", "Day"
+
+    scope = models.CharField(max_length=255)
+    concept = models.CharField(max_length=64)  # the event node's concept
+    bloom_level = models.CharField(max_length=32, blank=True)  # of the event node
+    metric = models.CharField(max_length=32)  # see rollups.METRICS
+    granularity = models.CharField(max_length=4, choices=Granularity.choices)
+    bucket = models.DateTimeField()  # start of the hour or day, UTC
+    count = models.PositiveBigIntegerField(default=0)
+    total = models.FloatField(default=0)  # sum of the events' values
+
+    class Meta:
+        # Also the index dashboard queries use: scope, metric, granularity, time
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "scope",
+                    "metric",
+                    "granularity",
+                    "bucket",
+                    "concept",
+                    "bloom_level",
+                ],
+                name="unique_event_rollup",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.scope}/{self.concept} {self.metric} {self.bucket} ({self.count})"
@@ -0,0 +1,282 @@
+"""
+Buffered ingestion of learning events.
+
+Requests only append events to an in-process buffer; a daemon thread
+writes them with ``bulk_create`` in batches of ANALYTICS_EVENT_BATCH_SIZE,
+as soon as a full batch is pending or every ANALYTICS_EVENT_FLUSH_INTERVAL
+seconds, whichever comes first, and adds each batch to the dashboard
+rollups in the same transaction (see rollups.py). Recording an event
+therefore never waits for the database.
+
+When the database falls behind and ANALYTICS_EVENT_MAX_PENDING events are
+waiting, new events are refused (``record`` returns False, the API answers
+503 with Retry-After) instead of growing the process without bound. A
+failed write is put back and retried on the next flush; after
+ANALYTICS_EVENT_MAX_RETRIES failures in a row the batch is written event by
+event, and the events that still fail go to the dead-letter log
+(analytics.services.events.dead_letter) as API payloads, so one bad event
+cannot hold up the queue behind it. What is still pending when the process
+exits is flushed by an atexit hook; a killed process loses at most its
+pending events.
+"""
+
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from analytics.models import LearningEvent
+
+from . import rollups
+
+logger = logging.getLogger(__name__)
+dead_letter_logger = logging.getLogger(f"{__name__}.dead_letter")
+
+KINDS = {label: value for value, label in LearningEvent.Kind.choices}
+
+
+def parse_event(data: Dict[str, Any], user_id: Optional[int] = None) -> LearningEvent:
+    """
+    An unsaved event from an API payload: {"kind", "scope"?, "node"?,
+    "value"?, "session"?, "at"? (epoch ms, default now), "data"?}.
+    Raises ValueError for anything malformed.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("event must be an object")
+    kind = KINDS.get(data.get("kind"))
+    if kind is None:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    at = data.get("at")
+    occurred_at = (
+        datetime.fromtimestamp(float(at) / 1000, tz=dt_timezone.utc)
+        if at is not None
+        else timezone.now()
+    )
+    session = data.get("session")
+    value = data.get("value")
+    if value is not None:
+        value = float(value)
+        if not math.isfinite(value):
+            raise ValueError("value must be a finite number")
+    extra = data.get("data")
+    if extra is not None:
+        if not isinstance(extra, dict):
+            raise ValueError("data must be an object")
+        json.dumps(extra, allow_nan=False)  # ValueError on NaN or Infinity
+    return LearningEvent(
+        kind=kind,
+        occurred_at=occurred_at,
+        user_id=user_id,
+        session=uuid.UUID(str(session)) if session else None,
+        scope=str(data.get("scope") or "")[:255],
+        node=str(data.get("node") or "")[:64],
+        value=value,
+        data=extra,
+    )
+
+
+def as_payload(event: LearningEvent) -> Dict[str, Any]:
+    """The event as the API accepts it (and the user id), for the dead-letter log."""
+    return {
+        "kind": LearningEvent.Kind(event.kind).label,
+        "at": event.occurred_at.timestamp() * 1000,
+        "user": event.user_id,
+        "session": str(event.session) if event.session else None,
+        "scope": event.scope,
+        "node": event.node,
+        "value": event.value,
+        "data": event.data,
+    }
+
+
+class EventBuffer:
+    def __init__(
+        self,
+        batch_size: int,
+        interval: float,
+        max_pending: int,
+        max_retries: int = 3,
+        using: str = "default",
+    ):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retries = 0  # failed flushes in a row of the batch at the head
+        self.using = using
+        self.pending: Deque[LearningEvent] = deque()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()  # one writer at a time
+        self.wake = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.pid: Optional[int] = None
+        self.accepted = self.rejected = self.written = self.failures = 0
+        self.dead_lettered = 0
+        self.flushes = 0
+        self.flush_seconds = 0.0
+
+    def record(self, events: Iterable[LearningEvent]) -> bool:
+        """
+        Queues the events for writing; all or none. False when the buffer
+        is full, in which case the caller should ask the client to retry.
+        """
+        events = list(events)
+        self.ensure_running()
+        with self.lock:
+            if len(self.pending) + len(events) > self.max_pending:
+                self.rejected += len(events)
+                return False
+            self.pending.extend(events)
+            self.accepted += len(events)
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.wake.set()
+        return True
+
+    def ensure_running(self) -> None:
+        # A forked worker inherits the buffer but not the thread
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pending.clear()
+            self.thread = threading.Thread(
+                target=self.run, name="learning-events", daemon=True
+            )
+            self.thread.start()
+            if self.pid is None:
+                atexit.register(self.flush)
+            self.pid = os.getpid()
+
+    def run(self) -> None:
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Learning event flush failed: {e}")
+
+    def take(self) -> List[LearningEvent]:
+        with self.lock:
+            count = min(self.batch_size, len(self.pending))
+            return [self.pending.popleft() for _ in range(count)]
+
+    def write(self, batch: List[LearningEvent]) -> None:
+        totals = rollups.aggregate(batch)
+        with transaction.atomic(using=self.using):
+            LearningEvent.objects.using(self.using).bulk_create(
+                batch, batch_size=self.batch_size
+            )
+            rollups.apply(totals, self.using)
+
+    def salvage(self, batch: List[LearningEvent]) -> int:
+        """Writes a batch that keeps failing one event at a time; returns the rows written."""
+        written = 0
+        for event in batch:
+            try:
+                self.write([event])
+                written += 1
+            except Exception as e:
+                dead_letter_logger.error(
+                    json.dumps(
+                        {"error": str(e), "event": as_payload(event)}, default=str
+                    )
+                )
+                with self.lock:
+                    self.dead_lettered += 1
+        return written
+
+    def flush(self) -> int:
+        """Writes everything pending, batch by batch; returns the rows written."""
+        written = 0
+        with self.flush_lock:
+            try:
+                while batch := self.take():
+                    started = time.perf_counter()
+                    try:
+                        self.write(batch)
+                        count = len(batch)
+                    except Exception as e:
+                        self.failures += 1
+                        self.retries += 1
+                        if self.retries < self.max_retries:
+                            with self.lock:
+                                self.pending.extendleft(reversed(batch))
+                            raise
+                        logger.error(
+                            f"Learning event batch failed {self.retries} times, "
+                            f"writing it event by event: {e}"
+                        )
+                        count = self.salvage(batch)
+                    self.retries = 0
+                    written += count
+                    with self.lock:
+                        self.written += count
+                        self.flushes += 1
+                        self.flush_seconds += time.perf_counter() - started
+            finally:
+                close_old_connections()  # this thread is not a request
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "pending": len(self.pending),
+                "max_pending": self.max_pending,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "written": self.written,
+                "failed_flushes": self.failures,
+                "dead_lettered": self.dead_lettered,
+                "batches": self.flushes,
+                "mean_batch_ms": (
+                    round(self.flush_seconds / self.flushes * 1000, 2)
+                    if self.flushes
+                    else None
+                ),
+            }
+
+
+buffer = EventBuffer(
+    batch_size=settings.ANALYTICS_EVENT_BATCH_SIZE,
+    interval=settings.ANALYTICS_EVENT_FLUSH_INTERVAL,
+    max_pending=settings.ANALYTICS_EVENT_MAX_PENDING,
+    max_retries=settings.ANALYTICS_EVENT_MAX_RETRIES,
+)
+
+
+def record(
+    kind: int,
+    scope: Optional[str] = None,
+    node: str = "",
+    value: Optional[float] = None,
+    session: Optional[str] = None,
+    user_id: Optional[int] = None,
+    data: Optional[Dict[str, Any]] = None,
+) -> bool:
+    """Queues one server-side event; never blocks on the database."""
+    event = LearningEvent(
+        kind=kind,
+        occurred_at=timezone.now(),
+        user_id=user_id,
+        session=uuid.UUID(session) if session else None,
+        scope=scope or "",
+        node=node,
+        value=value,
+        data=data,
+    )
+    return buffer.record([event])
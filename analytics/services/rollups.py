@@ -0,0 +1,270 @@
+"""
+Incremental rollups of learning events for the instructor dashboards.
+
+Every batch the event buffer writes is also added to EventRollup rows keyed
+by scope, concept, Bloom level, metric and hour or day, in the same
+transaction as the raw rows, so the two never disagree. An event counts
+towards the concept its node belongs to (the node itself for a Concept,
+the nearest Concept above it otherwise) and the Bloom level of the node or
+of its nearest rated ancestor. Both are looked up in the KG once per node
+and graph version. While Neo4j is unreachable, events count towards their
+own node; rebuild_range (the rebuild_event_rollups command) fixes that up
+from the raw events afterwards.
+
+Dashboards only read rollups, so their cost depends on the concepts and
+buckets asked for, not on how many events were recorded.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncHour
+
+from analytics.models import EventRollup, LearningEvent
+from knowledge.models import GraphVersion
+from knowledge.services.driver import get_driver
+from knowledge.services.schema import BASE_LABEL
+from knowledge.services.search import PATH_RELATIONS
+
+logger = logging.getLogger(__name__)
+
+# Assessment attempts scoring at least ANALYTICS_PASS_SCORE also count here
+PASS = "assessment_pass"
+METRICS = [label for _, label in LearningEvent.Kind.choices] + [PASS]
+
+# Fields of a rollup's key, in the order of its unique index
+KEY_FIELDS = ("scope", "metric", "granularity", "bucket", "concept", "bloom_level")
+# Rollup key -> [count, total]
+Key = Tuple[str, str, str, datetime, str, str]
+Totals = Dict[Key, List[float]]
+
+# Nodes remembered per scope before the map starts over
+NODE_CACHE_SIZE = 100_000
+# Seconds to attribute events to their own node after a failed KG lookup
+KG_RETRY_SECONDS = 30
+
+NODE_CONCEPTS_QUERY = f"""
+UNWIND $ids AS id
+MATCH (n:{BASE_LABEL} {{scope: $scope, id: id}})
+OPTIONAL MATCH p = (n)<-[:{PATH_RELATIONS}*1..32]-(a)
+WITH n, a ORDER BY length(p)
+WITH n, collect(a) AS above
+WITH n, [a IN above WHERE a:Concept][0] AS concept,
+     [a IN above WHERE a.bloom_level IS NOT NULL][0] AS rated
+RETURN n.id AS id,
+       CASE WHEN n:Concept THEN n.id ELSE coalesce(concept.id, n.id) END AS concept,
+       coalesce(n.bloom_level, rated.bloom_level, '') AS bloom_level
+"""
+
+
+def fetch_node_concepts(scope: str, ids: List[str]) -> List[Dict[str, Any]]:
+    with get_driver().session() as session:
+        result = session.run(NODE_CONCEPTS_QUERY, scope=scope, ids=ids)
+        return [dict(r) for r in result]
+
+
+_lock = threading.Lock()
+# scope -> (graph version, {node id: (concept, bloom level)})
+_nodes: Dict[str, Tuple[int, Dict[str, Tuple[str, str]]]] = {}
+_kg_down_until = 0.0
+
+
+def resolve(scope: str, ids: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+    """(concept, Bloom level) of each node id of the scope."""
+    global _kg_down_until
+    ids = set(ids)
+    if not scope:
+        return {i: (i, "") for i in ids}
+    version = GraphVersion.current(scope)
+    with _lock:
+        cached = _nodes.get(scope)
+        if cached is None or cached[0] != version or len(cached[1]) > NODE_CACHE_SIZE:
+            cached = _nodes[scope] = (version, {})
+        known = cached[1]
+        missing = [i for i in ids if i and i not in known]
+    if missing and time.monotonic() >= _kg_down_until:
+        try:
+            rows = fetch_node_concepts(scope, missing)
+        except Exception as e:
+            logger.warning(f"Could not map learning events of {scope} to concepts: {e}")
+            _kg_down_until = time.monotonic() + KG_RETRY_SECONDS
+        else:
+            found = {r["id"]: (r["concept"], r["bloom_level"]) for r in rows}
+            with _lock:
+                for i in missing:
+                    known[i] = found.get(i, (i, ""))  # not in the graph
+    return {i: known.get(i, (i, "")) for i in ids}
+
+
+def bucket_starts(at: datetime) -> List[Tuple[str, datetime]]:
+    hour = at.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return [
+        (EventRollup.Granularity.HOUR, hour),
+        (EventRollup.Granularity.DAY, hour.replace(hour=0)),
+    ]
+
+
+def add(
+    totals: Totals,
+    scope: str,
+    node: Tuple[str, str],
+    metric: str,
+    at: datetime,
+    count: int,
+    total: float,
+) -> None:
+    concept, bloom_level = node
+    for granularity, bucket in bucket_starts(at):
+        entry = totals.setdefault(
+            (scope, metric, granularity, bucket, concept, bloom_level), [0, 0.0]
+        )
+        entry[0] += count
+        entry[1] += total
+
+
+def aggregate(events: List[LearningEvent]) -> Totals:
+    """Rollup increments for a batch of events."""
+    by_scope: Dict[str, set] = {}
+    for event in events:
+        by_scope.setdefault(event.scope, set()).add(event.node)
+    nodes = {scope: resolve(scope, ids) for scope, ids in by_scope.items()}
+
+    totals: Totals = {}
+    for event in events:
+        node = nodes[event.scope][event.node]
+        value = event.value or 0.0
+        kind = LearningEvent.Kind(event.kind)
+        add(totals, event.scope, node, kind.label, event.occurred_at, 1, value)
+        if (
+            kind == LearningEvent.Kind.ASSESSMENT_ATTEMPT
+            and event.value is not None
+            and event.value >= settings.ANALYTICS_PASS_SCORE
+        ):
+            add(totals, event.scope, node, PASS, event.occurred_at, 1, value)
+    return totals
+
+
+def key_filter(totals: Totals) -> Dict[str, Any]:
+    """A filter covering all the keys (and possibly a few more rows)."""
+    return {
+        f"{field}__in": {key[i] for key in totals} for i, field in enumerate(KEY_FIELDS)
+    }
+
+
+def apply(totals: Totals, using: str = "default") -> None:
+    """
+    Adds the increments to the stored rollups. Call it in the transaction
+    that writes the events: the rows it reads stay locked until then, and a
+    row created meanwhile by another process fails the insert, so the
+    batch is retried instead of overwriting that row's counts.
+    """
+    pending = dict(totals)
+    if not pending:
+        return
+    changed = []
+    rows = EventRollup.objects.using(using).select_for_update()
+    for row in rows.filter(**key_filter(pending)).values_list(
+        *KEY_FIELDS, "count", "total"
+    ):
+        key = row[: len(KEY_FIELDS)]
+        if key in pending:
+            count, total = pending.pop(key)
+            changed.append((key, row[-2] + count, row[-1] + total))
+
+    def rollup(key: Key, count: int, total: float) -> EventRollup:
+        return EventRollup(**dict(zip(KEY_FIELDS, key)), count=count, total=total)
+
+    batch_size = settings.ANALYTICS_EVENT_BATCH_SIZE
+    # Upserting rows known to exist is a much cheaper bulk update than
+    # bulk_update, which sends a CASE branch per row
+    EventRollup.objects.using(using).bulk_create(
+        [rollup(*row) for row in changed],
+        update_conflicts=True,
+        unique_fields=KEY_FIELDS,
+        update_fields=["count", "total"],
+        batch_size=batch_size,
+    )
+    EventRollup.objects.using(using).bulk_create(
+        [rollup(key, count, total) for key, (count, total) in pending.items()],
+        batch_size=batch_size,
+    )
+
+
+def rebuild_range(
+    start: datetime, end: datetime, scope: Optional[str] = None, using="default"
+) -> int:
+    """
+    Recomputes the rollups of [start, end) (whole UTC days) from the raw
+    events, aggregated per node and hour in the database. Returns the
+    number of rollup rows written.
+    """
+    events = LearningEvent.objects.using(using).filter(
+        occurred_at__gte=start, occurred_at__lt=end
+    )
+    if scope is not None:
+        events = events.filter(scope=scope)
+    passed = Q(
+        kind=LearningEvent.Kind.ASSESSMENT_ATTEMPT,
+        value__gte=settings.ANALYTICS_PASS_SCORE,
+    )
+    groups = list(
+        events.values(
+            "scope",
+            "node",
+            "kind",
+            hour=TruncHour("occurred_at", tzinfo=dt_timezone.utc),
+        )
+        .annotate(
+            count=Count("id"),
+            total=Sum("value"),
+            passes=Count("id", filter=passed),
+            pass_total=Sum("value", filter=passed),
+        )
+        .order_by()
+    )
+
+    by_scope: Dict[str, set] = {}
+    for group in groups:
+        by_scope.setdefault(group["scope"], set()).add(group["node"])
+    nodes = {s: resolve(s, ids) for s, ids in by_scope.items()}
+
+    totals: Totals = {}
+    for group in groups:
+        node = nodes[group["scope"]][group["node"]]
+        metric = LearningEvent.Kind(group["kind"]).label
+        add(
+            totals,
+            group["scope"],
+            node,
+            metric,
+            group["hour"],
+            group["count"],
+            group["total"] or 0.0,
+        )
+        if group["passes"]:
+            add(
+                totals,
+                group["scope"],
+                node,
+                PASS,
+                group["hour"],
+                group["passes"],
+                group["pass_total"] or 0.0,
+            )
+
+    with transaction.atomic(using=using):
+        stale = EventRollup.objects.using(using).filter(
+            bucket__gte=start, bucket__lt=end
+        )
+        if scope is not None:
+            stale = stale.filter(scope=scope)
+        stale.delete()
+        apply(totals, using)
+    return len(totals)
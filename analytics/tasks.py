@@ -0,0 +1,13 @@
+from django.conf import settings
+from django_huey import periodic_task
+from huey import crontab
+
+from analytics.services.metrics import analyze_scope
+from knowledge.services.graph import fetch_scopes
+
+
+@periodic_task(crontab(minute="0", hour=settings.ANALYTICS_HOUR))
+def nightly_graph_analytics():
+    """Recomputes bottleneck, chain depth and orphan metrics of every scope."""
+    for scope in fetch_scopes():
+        analyze_scope(scope)
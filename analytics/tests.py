@@ -1,3 +1,155 @@
-from django.test import TestCase
+import json
+import os
+import random
+from itertools import combinations
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from analytics.models import LearningEvent
+from analytics.services import events
+from analytics.services.metrics import compute_metrics
+
+
+def simple_paths(successors, path):
+    """Every simple path that extends ``path``, itself included."""
+    yield path
+    for target in successors[path[-1]]:
+        if target not in path:
+            yield from simple_paths(successors, path + [target])
+
+
+def brute_force(n, pairs):
+    successors = [sorted({b for a, b in pairs if a == v and b != v}) for v in range(n)]
+    paths = [p for v in range(n) for p in simple_paths(successors, [v])]
+    reach = [{p[-1] for p in paths if p[0] == v} for v in range(n)]
+    component = [frozenset(u for u in reach[v] if v in reach[u]) for v in range(n)]
+
+    scores = np.zeros(n)
+    for s in range(n):
+        for t in range(n):
+            between = [p for p in paths if p[0] == s and p[-1] == t and s != t]
+            if not between:
+                continue
+            shortest = [p for p in between if len(p) == min(map(len, between))]
+            for p in shortest:
+                for v in p[1:-1]:
+                    scores[v] += 1 / len(shortest)
+    if n >= 3:
+        scores /= (n - 1) * (n - 2)
+
+    # A chain counts each component it passes through once
+    depths = [
+        max(len({component[v] for v in p}) - 1 for p in paths if p[-1] == x)
+        for x in range(n)
+    ]
+    linked = {v for a, b in pairs if a != b for v in (a, b)}
+    return {
+        "edges": len({(a, b) for a, b in pairs if a != b}),
+        "betweenness": scores,
+        "chain_depth": depths,
+        "orphan": [v not in linked for v in range(n)],
+        "cycles": len({c for c in component if len(c) > 1}),
+    }
+
+
+class MetricsTests(SimpleTestCase):
+    def check(self, n, pairs):
+        edges = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        # With every node sampled, betweenness is exact
+        metrics = compute_metrics(n, edges[:, 0], edges[:, 1], samples=n)
+        expected = brute_force(n, pairs)
+        self.assertEqual(metrics["edges"], expected["edges"])
+        np.testing.assert_allclose(metrics["betweenness"], expected["betweenness"])
+        self.assertEqual(list(metrics["chain_depth"]), expected["chain_depth"])
+        self.assertEqual(list(metrics["orphan"]), expected["orphan"])
+        self.assertEqual(metrics["cycles"], expected["cycles"])
+
+    def test_matches_brute_force_on_random_graphs(self):
+        rng = random.Random(0)
+        for _ in range(150):
+            n = rng.randint(1, 7)
+            pairs = [
+                (rng.randrange(n), rng.randrange(n))
+                for _ in range(rng.randint(0, 2 * n))
+            ]
+            with self.subTest(n=n, pairs=pairs):
+                self.check(n, pairs)
+
+    def test_diamond_splits_the_shortest_paths(self):
+        pairs = [(0, 1), (0, 2), (1, 3), (2, 3), (3, 4)]
+        self.check(5, pairs)
+        edges = np.array(pairs)
+        metrics = compute_metrics(5, edges[:, 0], edges[:, 1], samples=5)
+        # 3 lies on every path to 4; 1 and 2 share the paths from 0 to 3 and 4
+        np.testing.assert_allclose(metrics["betweenness"] * 12, [0, 1, 1, 3, 0])
+        self.assertEqual(list(metrics["chain_depth"]), [0, 1, 1, 2, 3])
+
+    def test_cycle_counts_as_one_step(self):
+        pairs = [(0, 1), (1, 2), (2, 1), (2, 3)]
+        self.check(5, pairs)
+        edges = np.array(pairs)
+        metrics = compute_metrics(5, edges[:, 0], edges[:, 1], samples=5)
+        self.assertEqual(list(metrics["chain_depth"]), [0, 1, 1, 2, 0])
+        self.assertEqual(metrics["cycles"], 1)
+        self.assertEqual(list(metrics["orphan"]), [False] * 4 + [True])
+
+    def test_complete_dag_pairs(self):
+        pairs = list(combinations(range(5), 2))
+        self.check(5, pairs)
+
+
+def idle_buffer(**options):
+    """An EventBuffer without its writer thread; tests flush it themselves."""
+    buffer = events.EventBuffer(batch_size=10, interval=3600, **options)
+    buffer.pid = os.getpid()
+    return buffer
+
+
+class EventBufferTests(TestCase):
+    def post(self, items):
+        return self.client.post(
+            reverse("collect_events"),
+            json.dumps({"events": items}),
+            content_type="application/json",
+        )
+
+    def test_full_buffer_answers_503_and_keeps_nothing(self):
+        buffer = idle_buffer(max_pending=3)
+        with mock.patch.object(events, "buffer", buffer):
+            self.assertEqual(self.post([{"kind": "node_expand"}] * 2).status_code, 202)
+            response = self.post([{"kind": "node_expand"}] * 2)
+            self.assertEqual(response.status_code, 503)
+            self.assertIn("Retry-After", response)
+            self.assertEqual(self.post([{"kind": "node_expand"}]).status_code, 202)
+        self.assertEqual(buffer.stats()["rejected"], 2)
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(LearningEvent.objects.count(), 3)
+
+    def test_poison_batch_goes_to_the_dead_letter_log(self):
+        buffer = idle_buffer(max_pending=10, max_retries=2)
+        good = [events.parse_event({"kind": "node_expand", "node": n}) for n in "ab"]
+        poison = LearningEvent(
+            kind=LearningEvent.Kind.NODE_EXPAND,
+            occurred_at=timezone.now(),
+            data={"unserializable": object()},
+        )
+        self.assertTrue(buffer.record([good[0], poison, good[1]]))
+
+        # The first failure puts the batch back for the next flush
+        with self.assertRaises(TypeError):
+            buffer.flush()
+        self.assertEqual(buffer.stats()["pending"], 3)
+
+        with self.assertLogs(events.dead_letter_logger, "ERROR") as logs:
+            self.assertEqual(buffer.flush(), 2)
+        (line,) = logs.records
+        self.assertEqual(json.loads(line.getMessage())["event"]["kind"], "node_expand")
+        self.assertEqual(
+            sorted(LearningEvent.objects.values_list("node", flat=True)), ["a", "b"]
+        )
+        stats = buffer.stats()
+        self.assertEqual((stats["pending"], stats["dead_lettered"]), (0, 1))
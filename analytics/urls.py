@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path("events/", views.collect_events, name="collect_events"),
+    path("events/metrics/", views.event_metrics, name="event_metrics"),
+    path("rollups/", views.rollup_series, name="rollup_series"),
+    path("pass-rates/", views.pass_rates, name="pass_rates"),
+]
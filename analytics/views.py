@@ -1,3 +1,179 @@
-from django.shortcuts import render
+import json
+import logging
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from typing import Any, Dict, List, Tuple
 
-# Create your views here.
+from django.conf import settings
+from django.db.models import Sum
+from django.http import HttpRequest, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.csrf import csrf_exempt
+
+from analytics.models import EventRollup, LearningEvent
+from analytics.services import events, rollups
+
+logger = logging.getLogger(__name__)
+
+
+@csrf_exempt
+def collect_events(request: HttpRequest) -> JsonResponse:
+    """
+    Accepts one event or {"events": [...]} (see events.parse_event) and
+    queues them for the batched writer; 202 once queued. When the writer
+    has fallen too far behind, answers 503 with Retry-After and nothing of
+    the request is kept.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=405)
+    user_id = request.user.pk if request.user.is_authenticated else None
+    try:
+        data = json.loads(request.body)
+        items: List[Dict[str, Any]] = (
+            data["events"] if isinstance(data, dict) and "events" in data else [data]
+        )
+        if not isinstance(items, list):
+            raise ValueError("events must be a list")
+        if len(items) > settings.ANALYTICS_EVENTS_PER_REQUEST:
+            raise ValueError(
+                f"at most {settings.ANALYTICS_EVENTS_PER_REQUEST} events per request"
+            )
+        batch: List[LearningEvent] = [events.parse_event(i, user_id) for i in items]
+    except (ValueError, TypeError, OverflowError, OSError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    if not events.buffer.record(batch):
+        logger.warning(f"Learning event buffer full, refused {len(batch)} events")
+        response = JsonResponse({"error": "event buffer full, retry later"}, status=503)
+        response["Retry-After"] = str(
+            max(1, round(settings.ANALYTICS_EVENT_FLUSH_INTERVAL))
+        )
+        return response
+    return JsonResponse({"queued": len(batch)}, status=202)
+
+
+def event_metrics(request: HttpRequest) -> JsonResponse:
+    """The event buffer's backlog and write counters in this process."""
+    return JsonResponse(events.buffer.stats())
+
+
+# Dimensions rollups can be grouped by
+GROUP_BY = ("concept", "bloom_level")
+
+
+def parse_moment(text: str) -> datetime:
+    """An ISO datetime, or a date meaning its midnight (UTC)."""
+    moment = parse_datetime(text)
+    if moment is None:
+        day = parse_date(text)
+        if day is None:
+            raise ValueError(f"not a date: {text}")
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = moment.replace(tzinfo=dt_timezone.utc)
+    return moment
+
+
+def rollup_query(request: HttpRequest) -> Tuple[Dict[str, Any], str]:
+    """Rollup filters from ?scope=&since=&until= (default: the last 30 days) and ?by=."""
+    scope = request.GET.get("scope")
+    if not scope:
+        raise ValueError("scope required")
+    until = request.GET.get("until")
+    until = parse_moment(until) if until else timezone.now()
+    since = request.GET.get("since")
+    since = parse_moment(since) if since else until - timedelta(days=30)
+    if since >= until:
+        raise ValueError("since must be before until")
+    if until - since > timedelta(days=settings.ANALYTICS_DASHBOARD_MAX_DAYS):
+        raise ValueError(
+            f"at most {settings.ANALYTICS_DASHBOARD_MAX_DAYS} days per query"
+        )
+    by = request.GET.get("by", "concept")
+    if by not in GROUP_BY:
+        raise ValueError(f"by must be one of {', '.join(GROUP_BY)}")
+    filters = {"scope": scope, "bucket__gte": since, "bucket__lt": until}
+    return filters, by
+
+
+def rollup_series(request: HttpRequest) -> JsonResponse:
+    """
+    Counts of one metric per concept (or ?by=bloom_level) and hour or day,
+    read from the rollups only: ?scope=&metric=hint_reveal&granularity=day
+    &since=&until=. Returns {"series": {key: [{"bucket", "count", "total"}]}}.
+    """
+    try:
+        filters, by = rollup_query(request)
+        metric = request.GET.get("metric", "")
+        if metric not in rollups.METRICS:
+            raise ValueError(f"metric must be one of {', '.join(rollups.METRICS)}")
+        granularity = request.GET.get("granularity", EventRollup.Granularity.DAY)
+        if granularity not in EventRollup.Granularity.values:
+            raise ValueError("granularity must be hour or day")
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    rows = (
+        EventRollup.objects.filter(**filters, metric=metric, granularity=granularity)
+        .values(by, "bucket")
+        .annotate(count=Sum("count"), total=Sum("total"))
+        .order_by(by, "bucket")
+    )
+    series: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        series.setdefault(row[by], []).append(
+            {"bucket": row["bucket"], "count": row["count"], "total": row["total"]}
+        )
+    return JsonResponse(
+        {"metric": metric, "granularity": granularity, "by": by, "series": series}
+    )
+
+
+def pass_rates(request: HttpRequest) -> JsonResponse:
+    """
+    Assessment attempts, passes, pass rate and mean score per concept (or
+    ?by=bloom_level) over ?since=&until=, read from the daily rollups.
+    """
+    try:
+        filters, by = rollup_query(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    attempt = LearningEvent.Kind.ASSESSMENT_ATTEMPT.label
+    rows = (
+        EventRollup.objects.filter(
+            **filters,
+            granularity=EventRollup.Granularity.DAY,
+            metric__in=[attempt, rollups.PASS],
+        )
+        .values(by, "metric")
+        .annotate(count=Sum("count"), total=Sum("total"))
+    )
+    groups: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        group = groups.setdefault(row[by], {"attempts": 0, "passes": 0, "total": 0.0})
+        if row["metric"] == attempt:
+            group["attempts"] = row["count"]
+            group["total"] = row["total"]
+        else:
+            group["passes"] = row["count"]
+    return JsonResponse(
+        {
+            "by": by,
+            "groups": [
+                {
+                    "key": key,
+                    "attempts": g["attempts"],
+                    "passes": g["passes"],
+                    "pass_rate": (
+                        round(g["passes"] / g["attempts"], 3) if g["attempts"] else None
+                    ),
+                    "mean_score": (
+                        round(g["total"] / g["attempts"], 3) if g["attempts"] else None
+                    ),
+                }
+                for key, g in sorted(groups.items())
+            ],
+        }
+    )
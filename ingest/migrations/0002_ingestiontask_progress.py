@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingest", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingestiontask",
+            name="progress",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingest", "0003_ingestiontask_scope"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingestiontask",
+            name="artifact",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -1,4 +1,7 @@
+from pathlib import Path
+
 from django.db import models
+from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
 
@@ -17,6 +20,9 @@ class IngestionTask(models.Model):
         DONE = "done", _("Done")
 
     file_name = models.CharField(max_length=255)
+    # Graph scope of the uploaded document: the course or document key given
+    # on upload (re-uploads naming it replace its graph), else default_scope()
+    scope = models.CharField(max_length=255, blank=True)
     status = models.CharField(
         max_length=20,
         choices=Status.choices,
@@ -27,6 +33,10 @@ class IngestionTask(models.Model):
         choices=Step.choices,
         default=Step.QUEUED,
     )
+    progress = models.PositiveSmallIntegerField(default=0)  # upload percent
+    artifact = models.CharField(
+        max_length=255, blank=True
+    )  # Parsed KG file name inside KG_ARTIFACT_DIR
     task_id = models.CharField(
         max_length=255, blank=True, null=True
     )  # Huey task ID (uuid)
@@ -35,3 +45,7 @@ class IngestionTask(models.Model):
 
     def __str__(self):
         return f"{self.file_name} ({self.status})"
+
+    def default_scope(self) -> str:
+        """A scope of this upload's own, for uploads that name none."""
+        return f"{slugify(Path(self.file_name).stem)}-{self.pk}"
@@ -458,7 +458,7 @@ def parse_dualpath(file_path: str) -> str:
         parsed = fix_procedural_nesting(parsed)
         content = json.dumps(parsed, ensure_ascii=False, indent=2)
         hash = hashlib.md5(content.encode(), usedforsecurity=False).hexdigest()
-        output_path = Path(f"data/{hash}.json")
+        output_path = Path(settings.KG_ARTIFACT_DIR) / f"{hash}.json"
         output_path.parent.mkdir(parents=True, exist_ok=True)
         output_path.write_text(content, encoding="utf-8")
 
@@ -1,11 +1,13 @@
 import json
 import logging
+from pathlib import Path
 
 from django_huey import task
 
 from ingest.models import IngestionTask
 from ingest.services.parsers.dual_parser import parse_dualpath
 from knowledge.services.loader import upload_graph
+from knowledge.tasks import refresh_scope
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +42,7 @@ def process_upload(file_path: str, ingestion_task_id: int):
             return
 
         # Update to Uploading
+        task_instance.artifact = Path(json_path).name
         task_instance.step = IngestionTask.Step.UPLOADING
         task_instance.save()
 
@@ -47,12 +50,20 @@ def process_upload(file_path: str, ingestion_task_id: int):
         with open(json_path, "r", encoding="utf-8") as f:
             data = json.load(f)
 
-        # 3. Upload to Knowledge Graph
-        upload_graph(data)
+        # 3. Upload to Knowledge Graph, reporting progress per batch
+        def report_progress(done: int, total: int) -> None:
+            task_instance.progress = done * 100 // total if total else 100
+            task_instance.save(update_fields=["progress", "updated_at"])
+
+        scope = task_instance.scope or task_instance.default_scope()
+        stats = upload_graph(data, scope=scope, progress=report_progress)
+        if stats["added"] or stats["changed"] or stats["removed"]:
+            refresh_scope(scope)
 
         # Update to Completed/Done
         task_instance.status = IngestionTask.Status.COMPLETED
         task_instance.step = IngestionTask.Step.DONE
+        task_instance.progress = 100
         task_instance.save()
 
         logger.info(f"Successfully processed and uploaded {file_path}")
@@ -7,6 +7,7 @@ from django.contrib import messages
 from django.core.files.storage import FileSystemStorage
 from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
+from django.utils.text import slugify
 
 from ingest.models import IngestionTask
 from ingest.tasks import process_upload
@@ -35,8 +36,14 @@ def upload_file(request: HttpRequest) -> HttpResponse:
         filename = fs.save(myfile.name, myfile)
         uploaded_file_path = fs.path(filename)
 
-        # Create IngestionTask
-        task = IngestionTask.objects.create(file_name=filename)
+        # Create IngestionTask. Re-uploads only replace a graph when they
+        # name its scope; other uploads get one of their own, so two courses
+        # uploading a file of the same name never share (and diff) a graph.
+        scope = slugify(request.POST.get("scope", ""))
+        task = IngestionTask.objects.create(file_name=filename, scope=scope)
+        if not scope:
+            task.scope = task.default_scope()
+            task.save(update_fields=["scope"])
 
         # Enqueue the processing task
         try:
@@ -52,7 +59,13 @@ def upload_file(request: HttpRequest) -> HttpResponse:
 
         return redirect("task_detail", task_id=task.id)
 
-    return render(request, "ingest/upload.html")
+    scopes = (
+        IngestionTask.objects.exclude(scope="")
+        .order_by("scope")
+        .values_list("scope", flat=True)
+        .distinct()
+    )
+    return render(request, "ingest/upload.html", {"scopes": scopes})
 
 
 def task_list(request: HttpRequest) -> HttpResponse:
@@ -122,6 +135,7 @@ async def task_progress(request: HttpRequest, task_id: int) -> StreamingHttpResp
                 current_data = {
                     "status": task.status,
                     "step": task.step,
+                    "progress": task.progress,
                 }
 
                 # Yield data
@@ -1,5 +1,22 @@
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 
 class KnowledgeConfig(AppConfig):
     name = "knowledge"
+
+    def ready(self):
+        from . import checks  # noqa: F401 (registers system checks)
+
+        if getattr(settings, "NEO4J_AUTO_SCHEMA", False):
+            from knowledge.services.driver import get_driver
+            from knowledge.services.schema import ensure_schema
+
+            try:
+                ensure_schema(get_driver())
+            except Exception as e:
+                logger.error(f"Neo4j schema bootstrap failed: {e}")
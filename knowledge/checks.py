@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.database)
+def neo4j_schema_check(app_configs, **kwargs):
+    """Warns when the KG uniqueness constraints have not been created yet."""
+    from knowledge.services.driver import get_driver
+    from knowledge.services.schema import missing_constraints
+
+    try:
+        missing = missing_constraints(get_driver())
+    except Exception as e:
+        return [
+            Warning(
+                f"Could not inspect the Neo4j schema: {e}",
+                hint=f"Check NEO4J_URI ({settings.NEO4J_URI}) and credentials.",
+                id="knowledge.W001",
+            )
+        ]
+
+    if not missing:
+        return []
+    return [
+        Warning(
+            f"Missing Neo4j constraints: {', '.join(missing)}",
+            hint="Run `python manage.py bootstrap_graph_schema`.",
+            id="knowledge.W002",
+        )
+    ]
@@ -0,0 +1,39 @@
+"""
+Helpers shared by the bench_* management commands.
+"""
+
+import statistics
+from typing import List
+
+from knowledge.models import GraphVersion
+from knowledge.services.driver import get_driver
+from knowledge.services.schema import BASE_LABEL
+
+
+def summarize(name: str, latencies: List[float]) -> str:
+    ms = sorted(latency * 1000 for latency in latencies)
+    p50 = statistics.median(ms)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    return f"{name:<8} p50 {p50:>9.2f} ms   p99 {p99:>9.2f} ms"
+
+
+def count_scope(scope: str) -> int:
+    with get_driver().session() as session:
+        return session.run(
+            f"MATCH (n:{BASE_LABEL} {{scope: $scope}}) RETURN count(n) AS n",
+            scope=scope,
+        ).single()["n"]
+
+
+def delete_scope(scope: str) -> None:
+    """Deletes every node (and edge) of a synthetic scope, and its version."""
+    with get_driver().session() as session:
+        # CALL ... IN TRANSACTIONS must run in an implicit transaction
+        session.run(
+            f"""
+            MATCH (n:{BASE_LABEL} {{scope: $scope}})
+            CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF 10000 ROWS
+            """,
+            scope=scope,
+        ).consume()
+    GraphVersion.objects.filter(scope=scope).delete()
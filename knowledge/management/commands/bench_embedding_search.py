@@ -0,0 +1,125 @@
+import shutil
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from knowledge.management.bench import summarize
+from knowledge.services.embeddings import EmbeddingBackend, normalize
+from knowledge.services.vectors import (
+    load_index,
+    refresh_embeddings,
+    scope_dir,
+    search_similar,
+)
+
+
+class SyntheticBackend(EmbeddingBackend):
+    """
+    Looks texts of the form "<row> <edit>" up in a clustered random matrix,
+    so indexes of any size build without running a model. Query texts
+    "q<n>" look up row n of ``queries``.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, base: np.ndarray):
+        self.base = base
+        self.queries = base[:0]
+        self.dim = base.shape[1]
+        self.model = f"synthetic-{self.dim}"
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += len(texts)
+        if texts and texts[0].startswith("q"):
+            return self.queries[[int(text[1:]) for text in texts]]
+        rows = [int(text.split()[0]) for text in texts]
+        return self.base[rows]
+
+
+def clustered_vectors(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = normalize(rng.standard_normal((clusters, dim)))
+    members = rng.integers(0, clusters, rows)
+    return normalize(
+        centers[members] + 0.6 * rng.standard_normal((rows, dim)) / dim**0.5
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds a synthetic embedding index, times an incremental refresh "
+        "and compares exact and approximate top-k search (latency, recall)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scope", default="bench-embeddings")
+        parser.add_argument("--rows", type=int, default=200_000)
+        parser.add_argument("--dim", type=int, default=384)
+        parser.add_argument("--clusters", type=int, default=2000)
+        parser.add_argument("--k", type=int, default=10)
+        parser.add_argument("--rounds", type=int, default=200)
+        parser.add_argument("--changed", type=float, default=0.01)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        scope, n, k = options["scope"], options["rows"], options["k"]
+        base = clustered_vectors(
+            n, options["dim"], options["clusters"], options["seed"]
+        )
+        backend = SyntheticBackend(base)
+        rows = [
+            {"id": f"B{i}", "label": "Concept", "concept": f"B{i}", "name": f"{i} v0"}
+            for i in range(n)
+        ]
+        try:
+            started = time.perf_counter()
+            refresh_embeddings(scope, rows, backend)
+            self.stdout.write(f"Built {n} rows in {time.perf_counter() - started:.1f}s")
+
+            # Re-ingest with a share of the nodes edited
+            rng = np.random.default_rng(options["seed"] + 1)
+            edited = rng.choice(n, int(n * options["changed"]), replace=False)
+            for i in edited:
+                rows[i]["name"] = f"{i} v1"
+            backend.calls = 0
+            started = time.perf_counter()
+            stats = refresh_embeddings(scope, rows, backend)
+            self.stdout.write(
+                f"Refreshed in {time.perf_counter() - started:.1f}s: "
+                f"{stats['embedded']} embedded, {stats['reused']} reused"
+            )
+
+            started = time.perf_counter()
+            index = load_index(scope)
+            self.stdout.write(
+                f"Loaded in {(time.perf_counter() - started) * 1000:.1f} ms "
+                f"({'inverted lists' if index.centroids is not None else 'exact only'})"
+            )
+            backend.queries = normalize(
+                base[rng.choice(n, options["rounds"])]
+                + 0.3
+                * rng.standard_normal((options["rounds"], options["dim"]))
+                / options["dim"] ** 0.5
+            )
+            exact, exact_latencies = self.time_search(scope, backend, k, 0)
+            self.stdout.write(summarize("exact", exact_latencies))
+            if index.centroids is not None:
+                approx, latencies = self.time_search(scope, backend, k, None)
+                recall = np.mean([len(a & e) / k for a, e in zip(approx, exact)])
+                self.stdout.write(
+                    f"{summarize('ann', latencies)}   recall@{k} {recall:.3f}"
+                )
+        finally:
+            shutil.rmtree(scope_dir(scope), ignore_errors=True)
+
+    def time_search(self, scope, backend, k, probes):
+        """search_similar end to end, as a chat turn calls it."""
+        results, latencies = [], []
+        for j in range(len(backend.queries)):
+            started = time.perf_counter()
+            hits = search_similar(scope, f"q{j}", k, probes, backend=backend)
+            latencies.append(time.perf_counter() - started)
+            results.append({hit["id"] for hit in hits})
+        return results, latencies
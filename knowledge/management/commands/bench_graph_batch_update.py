@@ -0,0 +1,96 @@
+import time
+from typing import Any, Callable, Dict, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from knowledge.management.bench import count_scope, delete_scope, summarize
+from knowledge.services import graph
+from knowledge.services.driver import get_driver
+from knowledge.services.schema import BASE_LABEL
+
+POPULATE = f"""
+UNWIND range(0, $count - 1) AS i
+CREATE (:{BASE_LABEL}:Concept {{scope: $scope, id: 'N' + i, name: 'Concept ' + i}})
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Times a bulk review (marking N nodes) done as N update_node calls "
+        "versus one batched update_nodes transaction, on a synthetic --scope "
+        "populated first and deleted afterwards (or with --stand-in-ms, "
+        "without Neo4j)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--nodes", type=int, default=50)
+        parser.add_argument("--rounds", type=int, default=20)
+        parser.add_argument(
+            "--scope",
+            default="bench-batch-update",
+            help="Throwaway scope to write the nodes to; must not exist yet",
+        )
+        parser.add_argument(
+            "--stand-in-ms",
+            type=float,
+            default=None,
+            help="Skip Neo4j and simulate each transaction with this much latency",
+        )
+
+    def handle(self, *args, **options):
+        scope = options["scope"]
+        ids = [f"N{i}" for i in range(options["nodes"])]
+        if options["stand_in_ms"] is not None:
+            delay = options["stand_in_ms"] / 1000
+
+            def update_node(node_id, props, scope):
+                time.sleep(delay)
+
+            def update_nodes(patches, scope, atomic=False):
+                time.sleep(delay)
+                return [{"id": p["id"], "status": graph.UPDATED} for p in patches]
+
+            self.compare(update_node, update_nodes, ids, scope, options["rounds"])
+            return
+
+        if count_scope(scope):
+            raise CommandError(f"Scope {scope} already has nodes; pick another --scope")
+        with get_driver().session() as session:
+            session.run(POPULATE, scope=scope, count=len(ids)).consume()
+        try:
+            self.compare(
+                graph.update_node, graph.update_nodes, ids, scope, options["rounds"]
+            )
+        finally:
+            delete_scope(scope)
+
+    def compare(
+        self,
+        update_node: Callable,
+        update_nodes: Callable,
+        ids: List[str],
+        scope: str,
+        rounds: int,
+    ) -> None:
+        def single(props: Dict[str, Any]) -> None:
+            for node_id in ids:
+                update_node(node_id, props, scope)
+
+        def batch(props: Dict[str, Any]) -> None:
+            update_nodes([{"id": i, "props": props} for i in ids], scope)
+
+        self.stdout.write(f"{len(ids)} nodes per review, {rounds} rounds")
+        for name, run in (("single", single), ("batch", batch)):
+            latencies = self.time_rounds(run, rounds)
+            self.stdout.write(summarize(name, latencies))
+
+    def time_rounds(
+        self, run: Callable[[Dict[str, Any]], None], rounds: int
+    ) -> List[float]:
+        latencies = []
+        for i in range(rounds):
+            status = "verified" if i % 2 else "rejected"
+            started = time.perf_counter()
+            run({"review_status": status})
+            latencies.append(time.perf_counter() - started)
+        return latencies
@@ -0,0 +1,97 @@
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+
+from knowledge.services import graph
+from knowledge.services.driver import aclose_driver
+
+
+def summarize(name: str, latencies: List[float], elapsed: float) -> str:
+    ms = sorted(latency * 1000 for latency in latencies)
+    p50 = statistics.median(ms)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    return (
+        f"{name:<6} {len(ms) / elapsed:>10.1f} req/s"
+        f"   p50 {p50:>8.2f} ms   p99 {p99:>8.2f} ms"
+    )
+
+
+async def drive(
+    call: Callable[[], Awaitable], requests: int, concurrency: int
+) -> tuple[List[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares throughput and tail latency of the sync and async expand_node "
+        "paths under concurrent load, against Neo4j or a latency stand-in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--node-id", default="C01")
+        parser.add_argument("--scope", default=None)
+        parser.add_argument(
+            "--stand-in-ms",
+            type=float,
+            default=None,
+            help="Skip Neo4j and simulate each query with this much latency",
+        )
+
+    def handle(self, *args, **options):
+        if options["stand_in_ms"] is not None:
+            delay = options["stand_in_ms"] / 1000
+
+            def fetch_children(node_id, scope=None):
+                time.sleep(delay)
+                return []
+
+            async def afetch_children(node_id, scope=None):
+                await asyncio.sleep(delay)
+                return []
+
+        else:
+            fetch_children, afetch_children = (
+                graph.fetch_children,
+                graph.afetch_children,
+            )
+
+        node_id, scope = options["node_id"], options["scope"]
+        # How Django runs a sync view under ASGI: on the one thread-sensitive executor
+        sync_call = sync_to_async(fetch_children, thread_sensitive=True)
+
+        async def run():
+            try:
+                for name, call in (
+                    ("sync", lambda: sync_call(node_id, scope)),
+                    ("async", lambda: afetch_children(node_id, scope)),
+                ):
+                    await call()  # warm up pools
+                    latencies, elapsed = await drive(
+                        call, options["requests"], options["concurrency"]
+                    )
+                    self.stdout.write(summarize(name, latencies, elapsed))
+            finally:
+                await aclose_driver()
+
+        self.stdout.write(
+            f"{options['requests']} requests, concurrency {options['concurrency']}"
+        )
+        asyncio.run(run())
@@ -0,0 +1,117 @@
+import time
+from typing import List, Optional
+
+from django.core.management.base import BaseCommand, CommandError
+
+from knowledge.management.bench import delete_scope, summarize
+from knowledge.services.driver import get_driver
+from knowledge.services.schema import BASE_LABEL
+from knowledge.services.search import search_nodes
+
+VOCABULARY = (
+    "symbolic state execution angr project binary solver constraint memory "
+    "register stack heap buffer overflow exploit shellcode payload address "
+    "function call return pointer loop branch path explore find avoid entry "
+    "simulation manager hook input stdin argument string compare check flag"
+).split()
+
+# Every `fanout`-th node is a concept; the nodes after it are a chain of
+# procedure steps, each a child of the previous one, as the parser nests them
+POPULATE = f"""
+UNWIND range($start, $end) AS i
+CALL {{
+    WITH i
+    WITH i, [j IN range(1, 12) | $vocabulary[toInteger(rand() * size($vocabulary))]] AS words
+    CREATE (n:{BASE_LABEL} {{scope: $scope, id: 'B' + i}})
+    SET n.name = reduce(s = words[0], w IN words[1..3] | s + ' ' + w)
+    WITH n, i, reduce(s = words[3], w IN words[4..] | s + ' ' + w) AS text
+    FOREACH (_ IN CASE WHEN i % $fanout = 0 THEN [1] ELSE [] END |
+        SET n:Concept, n.definition = text)
+    FOREACH (_ IN CASE WHEN i % $fanout = 0 THEN [] ELSE [1] END |
+        SET n:Procedure, n.hint = text)
+}} IN TRANSACTIONS OF 10000 ROWS
+"""
+
+LINK_STEPS = f"""
+MATCH (c:Procedure {{scope: $scope}})
+CALL {{
+    WITH c
+    MATCH (p:{BASE_LABEL} {{scope: $scope, id: 'B' + (toInteger(substring(c.id, 1)) - 1)}})
+    CREATE (p)-[:HAS_CHILD {{scope: $scope}}]->(c)
+}} IN TRANSACTIONS OF 10000 ROWS
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Times /knowledge/search/ queries (p50/p99). With --populate N it "
+        "first writes N synthetic nodes into --scope, so latency can be "
+        "measured on graphs of millions of nodes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scope", default="bench-search")
+        parser.add_argument("--populate", type=int, default=0)
+        parser.add_argument("--fanout", type=int, default=10)
+        parser.add_argument("--rounds", type=int, default=50)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument(
+            "--queries",
+            default="symbolic state,angr proj,buffer overflow exploit,stdin",
+            help="Comma-separated search texts",
+        )
+        parser.add_argument(
+            "--unscoped", action="store_true", help="Also time searches without scope"
+        )
+        parser.add_argument(
+            "--cleanup", action="store_true", help="Delete --scope's nodes afterwards"
+        )
+
+    def handle(self, *args, **options):
+        scope = options["scope"]
+        if options["populate"]:
+            self.populate(scope, options["populate"], options["fanout"])
+
+        queries = [q for q in options["queries"].split(",") if q.strip()]
+        if not queries:
+            raise CommandError("No queries given")
+
+        targets = [("scoped", scope)]
+        if options["unscoped"]:
+            targets.append(("unscoped", None))
+        for name, target in targets:
+            latencies = self.time_rounds(
+                queries, target, options["rounds"], options["page_size"]
+            )
+            self.stdout.write(summarize(name, latencies))
+
+        if options["cleanup"]:
+            delete_scope(scope)
+
+    def populate(self, scope: str, count: int, fanout: int) -> None:
+        started = time.perf_counter()
+        with get_driver().session() as session:
+            # CALL ... IN TRANSACTIONS must run in an implicit transaction
+            session.run(
+                POPULATE,
+                scope=scope,
+                start=0,
+                end=count - 1,
+                fanout=fanout,
+                vocabulary=VOCABULARY,
+            ).consume()
+            session.run(LINK_STEPS, scope=scope).consume()
+            session.run("CALL db.awaitIndexes(3600)").consume()
+        self.stdout.write(
+            f"Populated {count} nodes in {time.perf_counter() - started:.1f}s"
+        )
+
+    def time_rounds(
+        self, queries: List[str], scope: Optional[str], rounds: int, page_size: int
+    ) -> List[float]:
+        latencies = []
+        for i in range(rounds):
+            started = time.perf_counter()
+            search_nodes(queries[i % len(queries)], scope, page_size=page_size)
+            latencies.append(time.perf_counter() - started)
+        return latencies
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from knowledge.services.driver import get_driver
+from knowledge.services.schema import ensure_schema, missing_constraints
+
+
+class Command(BaseCommand):
+    help = "Creates the Neo4j uniqueness constraints and indexes used by the KG."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report missing constraints, do not create them.",
+        )
+        parser.add_argument(
+            "--no-backfill",
+            action="store_true",
+            help="Skip adding the base label to nodes created before it existed.",
+        )
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            missing = missing_constraints(get_driver())
+            if missing:
+                self.stdout.write(self.style.WARNING(f"Missing: {', '.join(missing)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS("All constraints present."))
+            return
+
+        ensure_schema(get_driver(), backfill=not options["no_backfill"])
+        self.stdout.write(self.style.SUCCESS("Neo4j schema bootstrapped."))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from knowledge.services.graph import fetch_scopes
+from knowledge.services.vectors import refresh_embeddings
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the embedding index of every scope (or --scope), embedding "
+        "only nodes that are new or whose text changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scope", action="append", default=None)
+
+    def handle(self, *args, **options):
+        for scope in options["scope"] or fetch_scopes():
+            started = time.perf_counter()
+            stats = refresh_embeddings(scope)
+            self.stdout.write(
+                f"{scope}: {stats['rows']} rows, {stats['embedded']} embedded, "
+                f"{stats['removed']} removed in {time.perf_counter() - started:.2f}s"
+            )
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from knowledge.services.graph import fetch_scopes
+from knowledge.services.layout import refresh_layout
+
+
+class Command(BaseCommand):
+    help = (
+        "Precomputes the layout of every scope (or --scope), recomputing only "
+        "scopes whose nodes or edges changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scope", action="append", default=None)
+
+    def handle(self, *args, **options):
+        for scope in options["scope"] or fetch_scopes():
+            started = time.perf_counter()
+            layout = refresh_layout(scope)
+            self.stdout.write(
+                f"{scope}: {layout.node_count} nodes "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
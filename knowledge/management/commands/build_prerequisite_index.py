@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from knowledge.services.graph import fetch_scopes
+from knowledge.services.prerequisites import refresh_prerequisites
+
+
+class Command(BaseCommand):
+    help = (
+        "Precomputes the prerequisite closure of every scope (or --scope), "
+        "rebuilding only scopes whose concepts or relations changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scope", action="append", default=None)
+
+    def handle(self, *args, **options):
+        for scope in options["scope"] or fetch_scopes():
+            started = time.perf_counter()
+            index = refresh_prerequisites(scope)
+            self.stdout.write(
+                f"{scope}: {index.node_count} concepts, {len(index.cycles)} cycles "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
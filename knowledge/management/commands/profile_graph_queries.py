@@ -0,0 +1,91 @@
+import json
+from typing import Any, Dict, List
+
+from django.core.management.base import BaseCommand
+
+from knowledge.services.driver import get_driver
+from knowledge.services.schema import BASE_LABEL
+
+# (name, query as originally written, label- and scope-qualified query)
+QUERIES = [
+    (
+        "node_lookup",
+        "MATCH (n {id:$id}) RETURN n",
+        f"MATCH (n:{BASE_LABEL} {{scope:$scope, id:$id}}) RETURN n",
+    ),
+    (
+        "expand_node",
+        "MATCH (n {id:$id})-[:HAS_CHILD|PROCEDURAL_FOR|ASSESSES]->(child) RETURN child",
+        f"MATCH (n:{BASE_LABEL} {{scope:$scope, id:$id}})-[:HAS_CHILD|PROCEDURAL_FOR|ASSESSES]->(child) RETURN child",
+    ),
+    (
+        "edge_endpoints",
+        "MATCH (p {id:$id}), (c {id:$other}) RETURN p, c",
+        f"MATCH (p:{BASE_LABEL} {{scope:$scope, id:$id}}), (c:{BASE_LABEL} {{scope:$scope, id:$other}}) RETURN p, c",
+    ),
+    (
+        "graph_root",
+        "MATCH (c:Concept) WHERE NOT (()-[:HAS_CHILD]->(c)) RETURN c",
+        "MATCH (c:Concept {scope:$scope}) WHERE NOT (()-[:HAS_CHILD]->(c)) RETURN c",
+    ),
+]
+
+
+def total_db_hits(plan: Dict[str, Any]) -> int:
+    return plan.get("dbHits", 0) + sum(
+        total_db_hits(child) for child in plan.get("children", [])
+    )
+
+
+class Command(BaseCommand):
+    help = "PROFILEs KG lookups with and without label/scope-qualified matches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scope", help="Scope to look up in (default: any)")
+        parser.add_argument("--id", help="Node id to look up (default: any node)")
+        parser.add_argument("--other", help="Second node id for edge lookups")
+        parser.add_argument("--json", help="Also write the results to this file")
+
+    def handle(self, *args, **options):
+        with get_driver().session() as session:
+            sample: List[Dict[str, Any]] = [
+                r.data()
+                for r in session.run(
+                    f"""
+                    MATCH (n:{BASE_LABEL})
+                    WHERE $scope IS NULL OR n.scope = $scope
+                    RETURN n.scope AS scope, n.id AS id LIMIT 2
+                    """,
+                    scope=options["scope"],
+                )
+            ]
+            params = {
+                "scope": options["scope"] or (sample[0]["scope"] if sample else ""),
+                "id": options["id"] or (sample[0]["id"] if sample else "C01"),
+                "other": options["other"] or (sample[-1]["id"] if sample else "C02"),
+            }
+            node_count = session.run("MATCH (n) RETURN count(n) AS c").single()["c"]
+
+            results = []
+            for name, before, after in QUERIES:
+                row = {"query": name}
+                for key, query in (("before", before), ("after", after)):
+                    summary = session.run(f"PROFILE {query}", **params).consume()
+                    row[f"{key}_db_hits"] = total_db_hits(summary.profile)
+                    row[f"{key}_ms"] = summary.result_available_after
+                results.append(row)
+
+        self.stdout.write(f"Graph size: {node_count} nodes, params: {params}")
+        self.stdout.write(
+            f"{'query':<16}{'db hits before':>16}{'db hits after':>16}"
+            f"{'ms before':>12}{'ms after':>12}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['query']:<16}{row['before_db_hits']:>16}"
+                f"{row['after_db_hits']:>16}{row['before_ms']:>12}{row['after_ms']:>12}"
+            )
+
+        if options["json"]:
+            with open(options["json"], "w", encoding="utf-8") as f:
+                json.dump({"nodes": node_count, "results": results}, f, indent=2)
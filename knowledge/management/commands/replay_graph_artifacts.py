@@ -0,0 +1,79 @@
+import shlex
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from knowledge.services.replay import (
+    Checkpoint,
+    discover_artifacts,
+    export_admin_csv,
+    replay_artifacts,
+)
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the Neo4j knowledge graph from stored KG JSON artifacts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir",
+            default=str(settings.KG_ARTIFACT_DIR),
+            help="Artifact directory (default: KG_ARTIFACT_DIR)",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=4, help="Parallel writer threads"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Items per transaction (default: NEO4J_UPLOAD_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint and replay every artifact again",
+        )
+        parser.add_argument(
+            "--csv",
+            metavar="OUT_DIR",
+            help="Write neo4j-admin import CSVs instead of loading through Bolt",
+        )
+
+    def handle(self, *args, **options):
+        artifacts = discover_artifacts(options["dir"])
+        self.stdout.write(f"Found {len(artifacts)} artifacts in {options['dir']}")
+
+        if options["csv"]:
+            command = export_admin_csv(artifacts, options["csv"])
+            self.stdout.write(self.style.SUCCESS(f"CSVs written to {options['csv']}"))
+            self.stdout.write("Stop Neo4j, then run:")
+            self.stdout.write(f"  {shlex.join(command)}")
+            self.stdout.write(
+                "and `python manage.py bootstrap_graph_schema` after, then "
+                "build_graph_layouts, build_prerequisite_index and "
+                "build_embedding_index."
+            )
+            return
+
+        checkpoint = Checkpoint(f"{options['dir'].rstrip('/')}/.replay_checkpoint.json")
+        if options["restart"]:
+            checkpoint.clear()
+
+        def report(artifact, stats):
+            self.stdout.write(f"  {artifact.scope} ({artifact.path.name}): {stats}")
+
+        started = time.perf_counter()
+        loaded = replay_artifacts(
+            artifacts,
+            checkpoint,
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            on_done=report,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Replayed {loaded} artifacts in {elapsed:.1f}s")
+        )
@@ -0,0 +1,32 @@
+# Generated by Django 6.1.2 on 2026-10-19 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("knowledge", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GraphLayout",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=255, unique=True)),
+                ("structure_hash", models.CharField(max_length=32)),
+                ("positions", models.JSONField(default=dict)),
+                ("node_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
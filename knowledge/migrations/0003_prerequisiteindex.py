@@ -0,0 +1,34 @@
+# Generated by Django 6.1.2 on 2026-10-19 05:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("knowledge", "0002_graphlayout"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PrerequisiteIndex",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=255, unique=True)),
+                ("structure_hash", models.CharField(max_length=32)),
+                ("order", models.JSONField(default=list)),
+                ("closure", models.BinaryField(default=b"")),
+                ("cycles", models.JSONField(default=list)),
+                ("node_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
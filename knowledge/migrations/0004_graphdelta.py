@@ -0,0 +1,43 @@
+# Generated by Django 6.1.2 on 2026-10-19 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("knowledge", "0003_prerequisiteindex"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GraphDelta",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=255)),
+                ("version", models.PositiveBigIntegerField()),
+                ("global_version", models.PositiveBigIntegerField()),
+                ("delta", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["scope", "version"], name="graph_delta_scope_version"
+                    ),
+                    models.Index(
+                        fields=["global_version"], name="graph_delta_global_version"
+                    ),
+                    models.Index(fields=["created_at"], name="graph_delta_created_at"),
+                ],
+            },
+        ),
+    ]
@@ -1,3 +1,107 @@
 from django.db import models
+from django.db.models import F
 
-# Create your models here.
+# Scope row bumped on every write, so unscoped reads see all changes
+GLOBAL_SCOPE = ""
+
+
+class GraphVersion(models.Model):
+    """Write counter per graph scope; cached graph reads are keyed by it."""
+
+    scope = models.CharField(max_length=255, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.scope or '(global)'} v{self.version}"
+
+    @classmethod
+    def current(cls, scope: str | None) -> int:
+        row = cls.objects.filter(scope=scope or GLOBAL_SCOPE).first()
+        return row.version if row else 0
+
+    @classmethod
+    async def acurrent(cls, scope: str | None) -> int:
+        row = await cls.objects.filter(scope=scope or GLOBAL_SCOPE).afirst()
+        return row.version if row else 0
+
+    @classmethod
+    def bump(cls, scope: str | None) -> dict[str, int]:
+        """
+        Invalidates cached reads of ``scope`` and of the whole graph.
+        Returns the new versions keyed by scope ("" for the global one).
+        """
+        scopes = {scope or GLOBAL_SCOPE, GLOBAL_SCOPE}
+        for name in scopes:
+            cls.objects.get_or_create(scope=name)
+        # Atomic increment, safe across the web and huey processes
+        rows = cls.objects.filter(scope__in=scopes)
+        rows.update(version=F("version") + 1)
+        return dict(rows.values_list("scope", "version"))
+
+    @classmethod
+    async def abump(cls, scope: str | None) -> dict[str, int]:
+        scopes = {scope or GLOBAL_SCOPE, GLOBAL_SCOPE}
+        for name in scopes:
+            await cls.objects.aget_or_create(scope=name)
+        rows = cls.objects.filter(scope__in=scopes)
+        await rows.aupdate(version=F("version") + 1)
+        return {
+            name: version
+            async for name, version in rows.values_list("scope", "version")
+        }
+
+
+class GraphDelta(models.Model):
+    """
+    A delta published to open graph views, kept for KG_DELTA_RETENTION_SECONDS
+    so streams in other processes can replay the versions they missed.
+    """
+
+    scope = models.CharField(max_length=255)
+    version = models.PositiveBigIntegerField()  # of the scope, after the write
+    global_version = models.PositiveBigIntegerField()  # of the whole graph
+    delta = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["scope", "version"], name="graph_delta_scope_version"),
+            models.Index(fields=["global_version"], name="graph_delta_global_version"),
+            models.Index(fields=["created_at"], name="graph_delta_created_at"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} v{self.version} ({self.delta.get('type')})"
+
+
+class GraphLayout(models.Model):
+    """Precomputed node positions of a scope, normalized to the unit square."""
+
+    scope = models.CharField(max_length=255, unique=True)
+    structure_hash = models.CharField(max_length=32)  # nodes + edges laid out
+    positions = models.JSONField(default=dict)  # {node id: [x, y]}
+    node_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.scope} ({self.node_count} nodes)"
+
+
+class PrerequisiteIndex(models.Model):
+    """
+    Transitive prerequisites of a scope's concepts. ``closure`` is the
+    bit-packed ancestor matrix (np.packbits rows), with rows and columns
+    in the topological ``order``.
+    """
+
+    scope = models.CharField(max_length=255, unique=True)
+    structure_hash = models.CharField(max_length=32)  # concepts + relations indexed
+    order = models.JSONField(default=list)  # concept ids, prerequisites first
+    closure = models.BinaryField(default=b"")
+    cycles = models.JSONField(default=list)  # [[ids...]] that depend on each other
+    node_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.scope} ({self.node_count} concepts)"
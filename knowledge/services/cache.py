@@ -0,0 +1,95 @@
+"""
+Versioned cache for graph read responses.
+
+Entries are keyed by request path and parameters plus the current
+GraphVersion of the scope being read. Writes bump the version instead of
+deleting keys, so stale entries are never served and age out through the
+cache's own TIMEOUT/MAX_ENTRIES.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from knowledge.models import GraphVersion
+
+_stats = {"hits": 0, "misses": 0, "saved": 0.0, "computed": 0.0}
+_stats_lock = threading.Lock()
+
+
+def graph_cache():
+    return caches[settings.KG_CACHE_ALIAS]
+
+
+def cache_key(scope: Optional[str], version: int, path: str, params: str) -> str:
+    digest = hashlib.md5(f"{path}?{params}".encode(), usedforsecurity=False)
+    return f"kg:{scope or '*'}:{version}:{digest.hexdigest()}"
+
+
+def etag_for(body: bytes) -> str:
+    # Strong validator: identical bytes, identical tag
+    return f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"'
+
+
+def record(hit: bool, cost: float) -> None:
+    with _stats_lock:
+        if hit:
+            _stats["hits"] += 1
+            _stats["saved"] += cost
+        else:
+            _stats["misses"] += 1
+            _stats["computed"] += cost
+
+
+async def aget_or_compute(
+    scope: Optional[str],
+    path: str,
+    params: str,
+    compute: Callable[[], Awaitable[bytes]],
+) -> Dict[str, Any]:
+    """
+    Returns {"body", "etag"} for a graph read, running ``compute`` (which
+    renders the response body) only on a miss. A hit credits the time the
+    original computation took as latency saved.
+    """
+    version = await GraphVersion.acurrent(scope)
+    key = cache_key(scope, version, path, params)
+    cache = graph_cache()
+
+    entry = await cache.aget(key)
+    if entry is not None:
+        record(True, entry["cost"])
+        return entry
+
+    started = time.perf_counter()
+    body = await compute()
+    entry = {
+        "body": body,
+        "etag": etag_for(body),
+        "cost": time.perf_counter() - started,
+    }
+    await cache.aset(key, entry)
+    record(False, entry["cost"])
+    return entry
+
+
+def cache_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "hit_ratio": _stats["hits"] / lookups if lookups else 0.0,
+            "latency_saved_ms": _stats["saved"] * 1000,
+            "avg_miss_ms": (
+                _stats["computed"] / _stats["misses"] * 1000
+                if _stats["misses"]
+                else 0.0
+            ),
+            "max_entries": settings.KG_CACHE_MAX_ENTRIES,
+            "timeout": settings.KG_CACHE_TIMEOUT,
+        }
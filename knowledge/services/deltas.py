@@ -0,0 +1,154 @@
+"""
+Graph deltas pushed to open graph views.
+
+Writers (the loader and the update paths) publish small deltas after
+bumping the scope's GraphVersion. Each delta is stored as a GraphDelta row
+keyed by the versions it produced, and handed to the in-process hub, where
+every SSE connection of this process subscribes with its own bounded
+queue. Writes made in other processes (uploads in the huey worker, edits
+in other web workers) never reach the hub, so subscribers also watch the
+GraphVersion and replay the stored deltas of the versions they missed;
+only when those are gone (older than KG_DELTA_RETENTION_SECONDS, or a
+write that published none) do they get a "scope_changed" refetch hint.
+"""
+
+import asyncio
+import logging
+import threading
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from django.conf import settings
+from django.utils import timezone
+
+from knowledge.models import GLOBAL_SCOPE, GraphDelta
+
+logger = logging.getLogger(__name__)
+
+# Delta types
+UPSERT = "upsert"  # nodes/edges written or removed by an upload
+UPDATE = "update"  # properties edited on existing nodes
+SCOPE_CHANGED = "scope_changed"  # refetch: too big to describe, or missed
+
+
+class Subscriber:
+    def __init__(self, scope: Optional[str]):
+        self.scope = scope
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.KG_DELTA_QUEUE_SIZE)
+
+    def wants(self, delta: Dict[str, Any]) -> bool:
+        return self.scope is None or self.scope == delta["scope"]
+
+    def offer(self, delta: Dict[str, Any]) -> None:
+        # Runs on the subscriber's loop. A client this far behind gets one
+        # refetch hint instead of an ever-growing backlog.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            delta = {"type": SCOPE_CHANGED, "scope": delta["scope"]}
+        self.queue.put_nowait(delta)
+
+
+class DeltaHub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers: Set[Subscriber] = set()
+
+    def subscribe(self, scope: Optional[str] = None) -> Subscriber:
+        subscriber = Subscriber(scope)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, delta: Dict[str, Any]) -> None:
+        """Thread-safe; callable from any thread or event loop."""
+        with self.lock:
+            targets = [s for s in self.subscribers if s.wants(delta)]
+        for subscriber in targets:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, delta)
+            except RuntimeError:  # loop already closed
+                self.unsubscribe(subscriber)
+
+
+hub = DeltaHub()
+
+
+def stored_delta(delta: Dict[str, Any]) -> GraphDelta:
+    versions = delta["versions"]
+    return GraphDelta(
+        scope=delta["scope"],
+        version=versions[delta["scope"]],
+        global_version=versions[GLOBAL_SCOPE],
+        delta=delta,
+    )
+
+
+def expired() -> Any:
+    cutoff = timezone.now() - timedelta(seconds=settings.KG_DELTA_RETENTION_SECONDS)
+    return GraphDelta.objects.filter(created_at__lt=cutoff)
+
+
+def publish(delta: Dict[str, Any]) -> None:
+    """Stores the delta for other processes and pushes it to this one's views."""
+    stored_delta(delta).save()
+    expired().delete()
+    hub.publish(delta)
+
+
+async def apublish(delta: Dict[str, Any]) -> None:
+    await stored_delta(delta).asave()
+    await expired().adelete()
+    hub.publish(delta)
+
+
+async def amissed(
+    scope: Optional[str], after: int, through: int
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    The stored deltas of versions after..through of ``scope`` (or of the
+    whole graph), oldest first; None when any of them is gone.
+    """
+    field = "version" if scope else "global_version"
+    rows = GraphDelta.objects.filter(
+        **{f"{field}__gt": after, f"{field}__lte": through}
+    )
+    if scope:
+        rows = rows.filter(scope=scope)
+    found = [
+        (version, delta)
+        async for version, delta in rows.order_by(field).values_list(field, "delta")
+    ]
+    if [version for version, _ in found] != list(range(after + 1, through + 1)):
+        return None
+    return [delta for _, delta in found]
+
+
+def upsert_delta(
+    scope: str,
+    versions: Dict[str, int],
+    nodes: List[Dict[str, Any]],
+    edges: List[Dict[str, str]],
+    removed: List[str],
+) -> Dict[str, Any]:
+    if len(nodes) + len(edges) + len(removed) > settings.KG_DELTA_MAX_ITEMS:
+        return {"type": SCOPE_CHANGED, "scope": scope, "versions": versions}
+    return {
+        "type": UPSERT,
+        "scope": scope,
+        "versions": versions,
+        "nodes": nodes,
+        "edges": edges,
+        "removed": removed,
+    }
+
+
+def update_delta(
+    scope: str, versions: Dict[str, int], nodes: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    return {"type": UPDATE, "scope": scope, "versions": versions, "nodes": nodes}
@@ -0,0 +1,181 @@
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from neo4j import AsyncDriver, AsyncGraphDatabase, Driver, GraphDatabase
+
+logger = logging.getLogger(__name__)
+
+_driver: Optional[Driver] = None
+_lock = threading.Lock()
+
+# Async drivers are bound to the event loop they were created on. Under ASGI
+# there is one loop per worker process, so this holds a single driver.
+_async_drivers: Dict[asyncio.AbstractEventLoop, AsyncDriver] = {}
+
+# Acquisition timings, updated by the wrappers installed on the pools
+_acquisitions = {"count": 0, "wait_total": 0.0, "wait_max": 0.0}
+_stats_lock = threading.Lock()
+
+
+def driver_config() -> Dict[str, Any]:
+    return {
+        "auth": (settings.NEO4J_USERNAME, settings.NEO4J_PASSWORD),
+        "max_connection_pool_size": settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+        "connection_acquisition_timeout": settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+        "max_connection_lifetime": settings.NEO4J_MAX_CONNECTION_LIFETIME,
+        "liveness_check_timeout": settings.NEO4J_LIVENESS_CHECK_TIMEOUT,
+    }
+
+
+def record_acquisition(wait: float) -> None:
+    with _stats_lock:
+        _acquisitions["count"] += 1
+        _acquisitions["wait_total"] += wait
+        _acquisitions["wait_max"] = max(_acquisitions["wait_max"], wait)
+
+
+def instrument_pool(driver: Driver | AsyncDriver) -> None:
+    """Times every connection checkout. Relies on driver internals, so it
+    degrades to no acquisition metrics if they change."""
+    pool = getattr(driver, "_pool", None)
+    acquire = getattr(pool, "acquire", None)
+    if acquire is None:
+        return
+
+    if asyncio.iscoroutinefunction(acquire):
+
+        async def timed_acquire(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await acquire(*args, **kwargs)
+            finally:
+                record_acquisition(time.perf_counter() - started)
+
+    else:
+
+        def timed_acquire(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return acquire(*args, **kwargs)
+            finally:
+                record_acquisition(time.perf_counter() - started)
+
+    pool.acquire = timed_acquire
+
+
+def get_driver() -> Driver:
+    """
+    Returns the process-wide Neo4j driver, creating it on first use.
+    The driver owns the connection pool and is safe to share across threads.
+    """
+    global _driver
+    if _driver is None:
+        with _lock:
+            if _driver is None:
+                driver = GraphDatabase.driver(settings.NEO4J_URI, **driver_config())
+                instrument_pool(driver)
+                _driver = driver
+                logger.info(f"Neo4j driver created for {settings.NEO4J_URI}")
+    return _driver
+
+
+def discard_async_driver(driver: AsyncDriver) -> None:
+    """
+    Drops the driver of an event loop that has been closed. It cannot be
+    closed any more (that needs its loop), so its sockets are left to the
+    garbage collector; close drivers with aclose_driver before their loop
+    ends to avoid this.
+    """
+    pool = getattr(driver, "_pool", None)
+    servers = pool_servers(pool) if pool is not None else []
+    connections = sum(s["in_use"] + s["idle"] for s in servers)
+    logger.warning(
+        f"Discarded the Neo4j async driver of a closed event loop "
+        f"({connections} connections left unclosed)"
+    )
+
+
+def get_async_driver() -> AsyncDriver:
+    """Returns the async driver for the running event loop, creating it lazily."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        driver = _async_drivers.get(loop)
+        if driver is None:
+            # Forget drivers whose loop has gone away (e.g. one-off loops)
+            for stale in [lp for lp in _async_drivers if lp.is_closed()]:
+                discard_async_driver(_async_drivers.pop(stale))
+            driver = AsyncGraphDatabase.driver(settings.NEO4J_URI, **driver_config())
+            instrument_pool(driver)
+            _async_drivers[loop] = driver
+            logger.info(f"Neo4j async driver created for {settings.NEO4J_URI}")
+    return driver
+
+
+def close_driver() -> None:
+    global _driver
+    with _lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
+            logger.info("Neo4j driver closed")
+
+
+async def aclose_driver() -> None:
+    """Closes the running loop's async driver."""
+    with _lock:
+        driver = _async_drivers.pop(asyncio.get_running_loop(), None)
+    if driver is not None:
+        await driver.close()
+        logger.info("Neo4j async driver closed")
+
+
+atexit.register(close_driver)
+
+
+def pool_servers(pool: Any) -> List[Dict[str, Any]]:
+    servers = []
+    # Snapshot without the pool lock; the async pool's lock is loop-bound
+    for address, connections in list(pool.connections.items()):
+        in_use = sum(1 for c in list(connections) if c.in_use)
+        servers.append(
+            {
+                "address": str(address),
+                "in_use": in_use,
+                "idle": len(connections) - in_use,
+            }
+        )
+    return servers
+
+
+def pool_metrics() -> Dict[str, Any]:
+    """Connection counts per pool and server plus checkout wait times."""
+    pools = []
+    with _lock:
+        drivers = [("sync", _driver)] + [
+            ("async", driver) for driver in _async_drivers.values()
+        ]
+    for kind, driver in drivers:
+        pool = getattr(driver, "_pool", None)
+        if pool is not None:
+            pools.append({"kind": kind, "servers": pool_servers(pool)})
+
+    servers = [server for pool in pools for server in pool["servers"]]
+    with _stats_lock:
+        count = _acquisitions["count"]
+        return {
+            "connected": bool(pools),
+            "max_pool_size": settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+            "in_use": sum(s["in_use"] for s in servers),
+            "idle": sum(s["idle"] for s in servers),
+            "pools": pools,
+            "acquisitions": count,
+            "acquisition_wait_avg_ms": (
+                _acquisitions["wait_total"] / count * 1000 if count else 0.0
+            ),
+            "acquisition_wait_max_ms": _acquisitions["wait_max"] * 1000,
+        }
@@ -0,0 +1,139 @@
+"""
+Text embedding backends behind one interface.
+
+A backend turns texts into L2-normalized float32 vectors, so a dot product
+is their cosine similarity. ``hashing`` needs no model or network (hashed
+words, word pairs and character trigrams; it matches wording, not meaning)
+and is the default for tests and offline development. ``local`` runs a
+sentence-transformers model on this machine (install sentence-transformers;
+it works offline once the model is downloaded), and ``gemini`` calls the
+Google GenAI embedding API. Pick one with EMBEDDING_BACKEND.
+"""
+
+import logging
+import math
+import re
+import zlib
+from abc import ABC, abstractmethod
+from collections import Counter
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingBackend(ABC):
+    name = "base"
+    dim = 0
+    model = ""
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dim) float32 matrix of unit vectors."""
+
+
+class HashingBackend(EmbeddingBackend):
+    """Signed feature hashing; deterministic across processes and machines."""
+
+    name = "hashing"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.model = f"hashing-{dim}"
+
+    def features(self, text: str) -> Counter:
+        words = []
+        for word in WORD_PATTERN.findall(text.lower()):
+            parts = [p for p in word.split("_") if p]
+            words += [word, *parts] if len(parts) > 1 else [word]
+        features = Counter(f"w:{w}" for w in words)
+        features.update(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f"<{word}>"
+            features.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self.features(text).items():
+                h = zlib.crc32(feature.encode())
+                sign = 1.0 if h & 0x80000000 else -1.0
+                vectors[row, h % self.dim] += sign * (1 + math.log(count))
+        return normalize(vectors)
+
+
+class LocalBackend(EmbeddingBackend):
+    name = "local"
+
+    def __init__(self, model: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = model
+        self.encoder = SentenceTransformer(model)
+        self.dim = self.encoder.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self.encoder.encode(
+            texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True
+        )
+        return vectors.astype(np.float32, copy=False)
+
+
+class GeminiBackend(EmbeddingBackend):
+    name = "gemini"
+
+    def __init__(self, model: str, api_key: Optional[str], dim: int):
+        from google import genai
+
+        self.model = model
+        self.dim = dim
+        self.client = genai.Client(api_key=api_key)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        response = self.client.models.embed_content(
+            model=self.model,
+            contents=texts,
+            config={"output_dimensionality": self.dim},
+        )
+        return normalize([e.values for e in response.embeddings])
+
+
+@lru_cache(maxsize=None)
+def get_embedder(name: Optional[str] = None) -> EmbeddingBackend:
+    name = name or settings.EMBEDDING_BACKEND
+    if name == HashingBackend.name:
+        return HashingBackend(settings.EMBEDDING_DIM)
+    if name == LocalBackend.name:
+        return LocalBackend(settings.EMBEDDING_LOCAL_MODEL)
+    if name == GeminiBackend.name:
+        return GeminiBackend(
+            settings.EMBEDDING_GEMINI_MODEL,
+            settings.GOOGLE_API_KEY,
+            settings.EMBEDDING_DIM,
+        )
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {name}")
+
+
+@lru_cache(maxsize=1024)
+def embed_query(text: str) -> np.ndarray:
+    """
+    One text's vector with the configured backend. Cached, since a chat
+    turn looks the same message up in more than one index.
+    """
+    vector = get_embedder().embed([text])[0]
+    vector.setflags(write=False)
+    return vector
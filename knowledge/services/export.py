@@ -0,0 +1,162 @@
+"""
+Encoding and compression for streamed graph exports.
+
+Items from graph.iter_export/aiter_export are encoded as NDJSON lines or
+as one JSON document ({"scope", "nodes": [...], "edges": [...]}) written
+piece by piece, then compressed incrementally, so memory stays bounded by
+one chunk however large the scope is.
+"""
+
+import json
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+Item = Tuple[str, Dict[str, Any]]
+
+
+def dumps(data: Any) -> str:
+    # default=str covers Neo4j temporal values
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if params and float(q) == 0:
+                continue  # explicitly refused
+        except ValueError:
+            pass
+        accepted.add(coding.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class Encoder:
+    """Renders export items as text for one format."""
+
+    def __init__(self, fmt: str, scope: str):
+        self.fmt = fmt
+        self.scope = scope
+        self.section: Optional[str] = None
+
+    def start(self) -> str:
+        if self.fmt == "ndjson":
+            return ""
+        return f'{{"scope":{dumps(self.scope)},"nodes":['
+
+    def item(self, kind: str, data: Dict[str, Any]) -> str:
+        if self.fmt == "ndjson":
+            return dumps({"type": kind, **data}) + "\n"
+        if self.section == kind:
+            prefix = ","
+        elif kind == "edge":
+            prefix = '],"edges":['  # edges follow all the nodes
+        else:
+            prefix = ""
+        self.section = kind
+        return prefix + dumps(data)
+
+    def end(self) -> str:
+        if self.fmt == "ndjson":
+            return ""
+        if self.section == "edge":
+            return "]}"
+        return '],"edges":[]}'
+
+
+class Compressor:
+    """Incremental gzip/brotli (or pass-through) that flushes every chunk."""
+
+    def __init__(self, encoding: Optional[str]):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self.stream = zlib.compressobj(6, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self.stream = brotli.Compressor(quality=5)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "gzip":
+            return self.stream.compress(data) + self.stream.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self.stream.process(data) + self.stream.flush()
+        return data
+
+    def finish(self) -> bytes:
+        if self.encoding == "gzip":
+            return self.stream.flush()
+        if self.encoding == "br":
+            return self.stream.finish()
+        return b""
+
+
+class ExportStream:
+    """Buffers encoded items into compressed chunks of about CHUNK_SIZE."""
+
+    def __init__(self, fmt: str, scope: str, encoding: Optional[str]):
+        self.encoder = Encoder(fmt, scope)
+        self.compressor = Compressor(encoding)
+        self.buffer: list = []
+        self.size = 0
+        self.sent_first = False
+
+    def head(self) -> bytes:
+        return self.compressor.compress(self.encoder.start().encode())
+
+    def feed(self, kind: str, data: Dict[str, Any]) -> bytes:
+        text = self.encoder.item(kind, data).encode()
+        self.buffer.append(text)
+        self.size += len(text)
+        # The first item goes out at once so clients see data immediately
+        if self.size >= CHUNK_SIZE or not self.sent_first:
+            self.sent_first = True
+            return self.drain()
+        return b""
+
+    def drain(self) -> bytes:
+        data = b"".join(self.buffer)
+        self.buffer, self.size = [], 0
+        return self.compressor.compress(data) if data else b""
+
+    def tail(self) -> bytes:
+        end = self.encoder.end().encode()
+        self.buffer.append(end)
+        return self.drain() + self.compressor.finish()
+
+
+def stream_export(
+    items: Iterator[Item], fmt: str, scope: str, encoding: Optional[str]
+) -> Iterator[bytes]:
+    stream = ExportStream(fmt, scope, encoding)
+    yield stream.head()
+    for kind, data in items:
+        chunk = stream.feed(kind, data)
+        if chunk:
+            yield chunk
+    yield stream.tail()
+
+
+async def astream_export(
+    items: AsyncIterator[Item], fmt: str, scope: str, encoding: Optional[str]
+) -> AsyncIterator[bytes]:
+    stream = ExportStream(fmt, scope, encoding)
+    yield stream.head()
+    async for kind, data in items:
+        chunk = stream.feed(kind, data)
+        if chunk:
+            yield chunk
+    yield stream.tail()
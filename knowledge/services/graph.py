@@ -0,0 +1,409 @@
+"""
+Read/write access to the KG used by the knowledge views.
+
+Every operation comes as a sync function and an ``a``-prefixed coroutine
+(Django's get/aget convention) sharing the same Cypher, so sync callers use
+the pooled sync driver and ASGI views use the async one.
+"""
+
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from knowledge.models import GraphVersion
+
+from .deltas import apublish, publish, update_delta
+from .driver import get_async_driver, get_driver
+from .schema import BASE_LABEL
+
+EXPAND_RELATIONS = "HAS_CHILD|PROCEDURAL_FOR|ASSESSES"
+
+# Per-patch outcomes of a batch update
+UPDATED, CONFLICT, MISSING, ROLLED_BACK = (
+    "updated",
+    "conflict",
+    "missing",
+    "rolled_back",
+)
+
+# What tree navigation needs; everything else is fetched when a node is opened
+SUMMARY_FIELDS = ["id", "name", "scope"]
+
+
+def projection(var: str, summary: bool) -> str:
+    """Whole node, or a map of the summary fields plus its specific label."""
+    if not summary:
+        return var
+    fields = ", ".join(f".{field}" for field in SUMMARY_FIELDS)
+    label = f"[l IN labels({var}) WHERE l <> '{BASE_LABEL}'][0]"
+    return f"{var} {{{fields}, label: {label}}}"
+
+
+def node_match(var: str, scope: Optional[str], id_expr: str = "$id") -> str:
+    """(var:KGNode {scope, id}) seek, or an id-only lookup without a scope."""
+    scope_filter = "scope: $scope, " if scope else ""
+    return f"({var}:{BASE_LABEL} {{{scope_filter}id: {id_expr}}})"
+
+
+def roots_query(scope: Optional[str], summary: bool = False) -> str:
+    # Top-level Concept nodes (no incoming HAS_CHILD)
+    scope_filter = " {scope: $scope}" if scope else ""
+    return f"""
+    MATCH (c:Concept{scope_filter})
+    WHERE NOT (()-[:HAS_CHILD]->(c))
+    RETURN {projection("c", summary)} AS c
+    """
+
+
+def children_query(scope: Optional[str], summary: bool = False) -> str:
+    return f"""
+    MATCH {node_match("n", scope)}-[:{EXPAND_RELATIONS}]->(child)
+    RETURN {projection("child", summary)} AS child
+    """
+
+
+def details_query(scope: Optional[str]) -> str:
+    return f"""
+    UNWIND $ids AS node_id
+    MATCH {node_match("n", scope, id_expr="node_id")}
+    RETURN n
+    """
+
+
+def subtree_query(scope: Optional[str], depth: int, summary: bool = False) -> str:
+    # Path lengths cannot be parameterized; depth is an int clamped by callers.
+    # Each reachable edge comes back once, with the shallowest depth it sits at.
+    return f"""
+    UNWIND $ids AS node_id
+    MATCH {node_match("n", scope, id_expr="node_id")}
+    MATCH p = (n)-[:{EXPAND_RELATIONS}*1..{int(depth)}]->(child)
+    WITH last(relationships(p)) AS r, child, length(p) AS level
+    RETURN startNode(r).id AS parent, type(r) AS relation,
+           {projection("child", summary)} AS child, min(level) AS level
+    """
+
+
+def subtree_payload(
+    node_ids: List[str], depth: int, rows: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Nodes and edges below ``node_ids`` plus the ids whose children are all
+    included (anything above the last level), so clients know what is left
+    to expand.
+    """
+    nodes: Dict[str, Dict[str, Any]] = {}
+    edges = []
+    expanded = set(node_ids)
+    for row in rows:
+        child = dict(row["child"])
+        nodes[child["id"]] = child
+        edges.append(
+            {
+                "source": row["parent"],
+                "target": child["id"],
+                "relation": row["relation"],
+            }
+        )
+        if row["level"] < depth:
+            expanded.add(child["id"])
+    return {"nodes": list(nodes.values()), "edges": edges, "expanded": sorted(expanded)}
+
+
+def export_queries(summary: bool = False) -> List[Tuple[str, str]]:
+    # Nodes first so consumers can build the graph in one pass
+    return [
+        (
+            "node",
+            f"""
+            MATCH (n:{BASE_LABEL} {{scope: $scope}})
+            RETURN {projection("n", summary)} AS item,
+                   [l IN labels(n) WHERE l <> '{BASE_LABEL}'][0] AS label
+            """,
+        ),
+        (
+            "edge",
+            f"""
+            MATCH (a:{BASE_LABEL} {{scope: $scope}})-[r]->(b:{BASE_LABEL})
+            RETURN {{source: a.id, target: b.id, relation: type(r)}} AS item,
+                   null AS label
+            """,
+        ),
+    ]
+
+
+def export_item(kind: str, record: Any) -> Tuple[str, Dict[str, Any]]:
+    item = dict(record["item"])
+    if record["label"]:
+        item["label"] = record["label"]
+    return kind, item
+
+
+def adjacency_query(relations: str, label: str = BASE_LABEL) -> str:
+    return f"""
+    MATCH (n:{label} {{scope: $scope}})
+    OPTIONAL MATCH (n)-[:{relations}]->(m:{label} {{scope: $scope}})
+    RETURN n.id AS id, collect(m.id) AS targets
+    """
+
+
+def require_scope(scope: Optional[str]) -> str:
+    """
+    Writes always seek (scope, id): ids repeat across scopes, so an unscoped
+    edit could land on another course's node. Only reads may match by id.
+    """
+    if not scope:
+        raise ValueError("scope is required to edit nodes")
+    return scope
+
+
+def update_query(scope: str) -> str:
+    return f"""
+    MATCH {node_match("n", require_scope(scope))}
+    SET n += $props, n.revision = coalesce(n.revision, 0) + 1
+    RETURN n.id AS id, n.scope AS scope, n.revision AS revision
+    """
+
+
+def batch_update_query(scope: str) -> str:
+    # A patch carrying a revision only applies if the node is still at it;
+    # FOREACH is the conditional SET, so every patch still returns a row.
+    return f"""
+    UNWIND $patches AS patch
+    OPTIONAL MATCH {node_match("n", require_scope(scope), id_expr="patch.id")}
+    WITH patch, n,
+         CASE
+           WHEN n IS NULL THEN '{MISSING}'
+           WHEN patch.revision IS NOT NULL
+                AND coalesce(n.revision, 0) <> patch.revision THEN '{CONFLICT}'
+           ELSE '{UPDATED}'
+         END AS status
+    FOREACH (_ IN CASE WHEN status = '{UPDATED}' THEN [1] ELSE [] END |
+      SET n += patch.props, n.revision = coalesce(n.revision, 0) + 1
+    )
+    RETURN patch.id AS id, status, n.revision AS revision, n.scope AS scope
+    """
+
+
+def fetch_roots(
+    scope: Optional[str] = None, summary: bool = False
+) -> List[Dict[str, Any]]:
+    with get_driver().session() as session:
+        result = session.run(roots_query(scope, summary), scope=scope)
+        return [dict(r["c"]) for r in result]
+
+
+async def afetch_roots(
+    scope: Optional[str] = None, summary: bool = False
+) -> List[Dict[str, Any]]:
+    async with get_async_driver().session() as session:
+        result = await session.run(roots_query(scope, summary), scope=scope)
+        return [dict(r["c"]) async for r in result]
+
+
+def fetch_children(
+    node_id: str, scope: Optional[str] = None, summary: bool = False
+) -> List[Dict[str, Any]]:
+    with get_driver().session() as session:
+        result = session.run(children_query(scope, summary), scope=scope, id=node_id)
+        return [dict(r["child"]) for r in result]
+
+
+async def afetch_children(
+    node_id: str, scope: Optional[str] = None, summary: bool = False
+) -> List[Dict[str, Any]]:
+    async with get_async_driver().session() as session:
+        result = await session.run(
+            children_query(scope, summary), scope=scope, id=node_id
+        )
+        return [dict(r["child"]) async for r in result]
+
+
+def fetch_details(
+    node_ids: List[str], scope: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Full properties of several nodes in one round-trip, keyed by id."""
+    with get_driver().session() as session:
+        result = session.run(details_query(scope), scope=scope, ids=node_ids)
+        return {r["n"]["id"]: dict(r["n"]) for r in result}
+
+
+async def afetch_details(
+    node_ids: List[str], scope: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    async with get_async_driver().session() as session:
+        result = await session.run(details_query(scope), scope=scope, ids=node_ids)
+        return {r["n"]["id"]: dict(r["n"]) async for r in result}
+
+
+def fetch_subtrees(
+    node_ids: List[str],
+    depth: int,
+    scope: Optional[str] = None,
+    summary: bool = False,
+) -> Dict[str, Any]:
+    """Everything up to ``depth`` levels below several nodes in one query."""
+    with get_driver().session() as session:
+        result = session.run(
+            subtree_query(scope, depth, summary), scope=scope, ids=node_ids
+        )
+        return subtree_payload(node_ids, depth, [r.data() for r in result])
+
+
+async def afetch_subtrees(
+    node_ids: List[str],
+    depth: int,
+    scope: Optional[str] = None,
+    summary: bool = False,
+) -> Dict[str, Any]:
+    async with get_async_driver().session() as session:
+        result = await session.run(
+            subtree_query(scope, depth, summary), scope=scope, ids=node_ids
+        )
+        return subtree_payload(node_ids, depth, [r.data() async for r in result])
+
+
+def fetch_scopes() -> List[str]:
+    with get_driver().session() as session:
+        result = session.run(
+            f"MATCH (n:{BASE_LABEL}) WHERE n.scope IS NOT NULL "
+            "RETURN DISTINCT n.scope AS scope ORDER BY scope"
+        )
+        return [r["scope"] for r in result]
+
+
+def fetch_adjacency(
+    scope: str, relations: str = EXPAND_RELATIONS, label: str = BASE_LABEL
+) -> Dict[str, List[str]]:
+    """Every node of a scope mapped to its targets over ``relations``, in one read."""
+    with get_driver().session() as session:
+        result = session.run(adjacency_query(relations, label), scope=scope)
+        return {r["id"]: r["targets"] for r in result}
+
+
+def iter_export(
+    scope: str, summary: bool = False
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streams a scope's ("node", props) then ("edge", {...}) items straight off
+    the result cursor; the driver only holds one fetch batch at a time.
+    """
+    with get_driver().session() as session:
+        for kind, query in export_queries(summary):
+            for record in session.run(query, scope=scope):
+                yield export_item(kind, record)
+
+
+async def aiter_export(
+    scope: str, summary: bool = False
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    async with get_async_driver().session() as session:
+        for kind, query in export_queries(summary):
+            result = await session.run(query, scope=scope)
+            async for record in result:
+                yield export_item(kind, record)
+
+
+def edited_nodes(
+    rows: List[Dict[str, Any]], props: List[Dict[str, Any]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Applied edits grouped by the scope of the node they landed on."""
+    changed: Dict[str, List[Dict[str, Any]]] = {}
+    for row, node_props in zip(rows, props):
+        if row.get("status", UPDATED) == UPDATED:
+            changed.setdefault(row["scope"], []).append(
+                {**node_props, "id": row["id"], "revision": row["revision"]}
+            )
+    return changed
+
+
+def announce(changed: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Bumps each edited scope's version and pushes the edits to open views."""
+    for scope, nodes in changed.items():
+        publish(update_delta(scope, GraphVersion.bump(scope), nodes))
+
+
+async def aannounce(changed: Dict[str, List[Dict[str, Any]]]) -> None:
+    for scope, nodes in changed.items():
+        await apublish(update_delta(scope, await GraphVersion.abump(scope), nodes))
+
+
+def update_node(node_id: str, props: Dict[str, Any], scope: str) -> None:
+    with get_driver().session() as session:
+        result = session.run(update_query(scope), scope=scope, id=node_id, props=props)
+        rows = result.data()
+    announce(edited_nodes(rows, [props] * len(rows)))
+
+
+async def aupdate_node(node_id: str, props: Dict[str, Any], scope: str) -> None:
+    async with get_async_driver().session() as session:
+        result = await session.run(
+            update_query(scope), scope=scope, id=node_id, props=props
+        )
+        rows = await result.data()
+    await aannounce(edited_nodes(rows, [props] * len(rows)))
+
+
+class BatchRejected(Exception):
+    """Raised inside an atomic batch transaction to roll it back."""
+
+    def __init__(self, results: List[Dict[str, Any]]):
+        super().__init__("batch update rolled back")
+        self.results = results
+
+
+def patch_results(rows: List[Dict[str, Any]], atomic: bool) -> List[Dict[str, Any]]:
+    results = [
+        {"id": r["id"], "status": r["status"], "revision": r["revision"]} for r in rows
+    ]
+    if atomic and any(r["status"] != UPDATED for r in results):
+        for r in results:
+            if r["status"] == UPDATED:
+                r["status"], r["revision"] = ROLLED_BACK, None
+        raise BatchRejected(results)
+    return results
+
+
+def update_nodes(
+    patches: List[Dict[str, Any]], scope: str, atomic: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Applies many {"id", "props", "revision"?} patches to nodes of the scope
+    in one transaction and returns a status per patch. With ``atomic`` any
+    conflict or missing node rolls the whole batch back.
+    """
+    props = [patch["props"] for patch in patches]
+    changed: Dict[str, List[Dict[str, Any]]] = {}
+
+    def apply(tx) -> List[Dict[str, Any]]:
+        rows = tx.run(batch_update_query(scope), scope=scope, patches=patches).data()
+        changed.clear()  # execute_write may retry
+        changed.update(edited_nodes(rows, props))
+        return patch_results(rows, atomic)
+
+    try:
+        with get_driver().session() as session:
+            results = session.execute_write(apply)
+    except BatchRejected as rejected:
+        return rejected.results
+    announce(changed)
+    return results
+
+
+async def aupdate_nodes(
+    patches: List[Dict[str, Any]], scope: str, atomic: bool = False
+) -> List[Dict[str, Any]]:
+    props = [patch["props"] for patch in patches]
+    changed: Dict[str, List[Dict[str, Any]]] = {}
+
+    async def apply(tx) -> List[Dict[str, Any]]:
+        result = await tx.run(batch_update_query(scope), scope=scope, patches=patches)
+        rows = await result.data()
+        changed.clear()
+        changed.update(edited_nodes(rows, props))
+        return patch_results(rows, atomic)
+
+    try:
+        async with get_async_driver().session() as session:
+            results = await session.execute_write(apply)
+    except BatchRejected as rejected:
+        return rejected.results
+    await aannounce(changed)
+    return results
@@ -0,0 +1,233 @@
+"""
+Server-side force-directed layout of each scope's graph.
+
+A vectorized Fruchterman-Reingold pass runs over the whole scope once;
+later refreshes keep every known node where it was and only place the
+new ones, so the picture stays stable between visits.
+"""
+
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from knowledge.models import GraphLayout
+
+from .graph import fetch_adjacency
+
+logger = logging.getLogger(__name__)
+
+ITERATIONS = 80
+INCREMENTAL_ITERATIONS = 30
+# Pairwise repulsion is exact up to this many nodes, sampled above it
+EXACT_LIMIT = 1500
+# Rows of the pairwise distance block computed at once (bounds memory)
+CHUNK = 1024
+# Free border left around a full layout
+MARGIN = 0.02
+# Below this share of known nodes a refresh starts over
+INCREMENTAL_MIN_SHARE = 0.5
+
+
+def structure_hash(adjacency: Dict[str, List[str]]) -> str:
+    digest = hashlib.md5(usedforsecurity=False)
+    for node_id in sorted(adjacency):
+        digest.update(f"{node_id}>{','.join(sorted(adjacency[node_id]))};".encode())
+    return digest.hexdigest()
+
+
+def force_layout(
+    n: int,
+    src: np.ndarray,
+    dst: np.ndarray,
+    positions: Optional[np.ndarray] = None,
+    movable: Optional[np.ndarray] = None,
+    iterations: int = ITERATIONS,
+    k: Optional[float] = None,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Fruchterman-Reingold over n nodes with ideal edge length ``k``. Only
+    ``movable`` nodes are displaced, and repulsion is only computed for
+    them. A full layout is rescaled into the unit square at the end; a
+    partial one only feels repulsion within 2k (the grid variant), since
+    the frozen nodes around it are not in equilibrium with distant ones,
+    and is clipped to the square.
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n, 2)) if positions is None else positions.copy()
+    pos = pos.astype(np.float32)
+    movable = np.ones(n, dtype=bool) if movable is None else movable
+    moving = np.flatnonzero(movable)
+    if n < 2 or not len(moving):
+        return pos
+
+    k = np.float32(k or np.sqrt(1.0 / n))
+    k2 = k * k
+    partial = len(moving) < n
+    temperature = 2 * k if partial else 0.1
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        disp = np.zeros((n, 2), dtype=np.float32)
+
+        # Repulsion k^2/d between every moving node and all (or a sample of) nodes
+        others, scale = pos, np.float32(1.0)
+        if n > EXACT_LIMIT:
+            others = pos[rng.choice(n, EXACT_LIMIT, replace=False)]
+            scale = np.float32(n / EXACT_LIMIT)
+        ox, oy = others[:, 0], others[:, 1]
+        for start in range(0, len(moving), CHUNK):
+            rows = moving[start : start + CHUNK]
+            dx = pos[rows, 0, None] - ox
+            dy = pos[rows, 1, None] - oy
+            weight = dx * dx + dy * dy
+            far = weight > 4 * k2 if partial else None
+            np.maximum(weight, 1e-9, out=weight)
+            np.divide(k2 * scale, weight, out=weight)
+            if partial:
+                weight[far] = 0
+            disp[rows, 0] += (dx * weight).sum(axis=1)
+            disp[rows, 1] += (dy * weight).sum(axis=1)
+
+        # Attraction d^2/k along edges
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.linalg.norm(delta, axis=1)
+            force = delta * (dist / k)[:, None]
+            np.subtract.at(disp, src, force)
+            np.add.at(disp, dst, force)
+
+        # Move at most `temperature`
+        length = np.linalg.norm(disp[moving], axis=1)
+        np.maximum(length, 1e-9, out=length)
+        pos[moving] += (
+            disp[moving] * (np.minimum(length, temperature) / length)[:, None]
+        )
+        temperature -= cooling
+
+    if partial:
+        return np.clip(pos, 0.0, 1.0)
+    low, high = pos.min(axis=0), pos.max(axis=0)
+    span = max(float((high - low).max()), 1e-9)
+    return (pos - low) / span * (1 - 2 * MARGIN) + MARGIN
+
+
+def layout_positions(
+    adjacency: Dict[str, List[str]], previous: Dict[str, List[float]]
+) -> Dict[str, List[float]]:
+    """Positions for every node, reusing ``previous`` ones where possible."""
+    ids = sorted(adjacency)
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    pairs = [
+        (index[a], index[b])
+        for a, targets in adjacency.items()
+        for b in targets
+        if b in index and a != b
+    ]
+    edges = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+    src, dst = edges[:, 0], edges[:, 1]
+    n = len(ids)
+
+    known = np.array([node_id in previous for node_id in ids], dtype=bool)
+    if n and known.sum() >= INCREMENTAL_MIN_SHARE * n:
+        rng = np.random.default_rng(n)
+        pos = rng.random((n, 2))
+        pos[known] = [previous[node_id] for node_id, k in zip(ids, known) if k]
+
+        # New nodes start next to the known nodes they connect to
+        total = np.zeros((n, 2))
+        count = np.zeros(n)
+        for a, b in ((src, dst), (dst, src)):
+            placed = known[b] & ~known[a]
+            np.add.at(total, a[placed], pos[b[placed]])
+            np.add.at(count, a[placed], 1)
+        near = count > 0
+        jitter = (rng.random((near.sum(), 2)) - 0.5) * 0.02
+        pos[near] = np.clip(total[near] / count[near, None] + jitter, 0.0, 1.0)
+
+        # Forces must match the scale the stored layout was rescaled to
+        settled = known[src] & known[dst]
+        lengths = np.linalg.norm(pos[src[settled]] - pos[dst[settled]], axis=1)
+        k = float(np.median(lengths)) if len(lengths) else None
+
+        pos = force_layout(
+            n, src, dst, pos, ~known, iterations=INCREMENTAL_ITERATIONS, k=k
+        )
+    else:
+        pos = force_layout(n, src, dst)
+
+    return {
+        node_id: [round(float(x), 4), round(float(y), 4)]
+        for node_id, (x, y) in zip(ids, pos)
+    }
+
+
+def refresh_layout(scope: str) -> GraphLayout:
+    """Recomputes a scope's layout if its nodes or edges changed."""
+    adjacency = fetch_adjacency(scope)
+    digest = structure_hash(adjacency)
+    layout = GraphLayout.objects.filter(scope=scope).first()
+    if layout and layout.structure_hash == digest:
+        return layout
+
+    previous = layout.positions if layout else {}
+    positions = layout_positions(adjacency, previous)
+    layout, _ = GraphLayout.objects.update_or_create(
+        scope=scope,
+        defaults={
+            "structure_hash": digest,
+            "positions": positions,
+            "node_count": len(positions),
+        },
+    )
+    logger.info(f"Layout for {scope}: {len(positions)} nodes")
+    return layout
+
+
+async def alayout_stamp(scope: Optional[str]) -> str:
+    """Changes whenever the positions a read would attach change."""
+    layouts = GraphLayout.objects.order_by("-updated_at")
+    if scope:
+        layouts = layouts.filter(scope=scope)
+    latest = await layouts.values_list("updated_at", flat=True).afirst()
+    return latest.isoformat() if latest else ""
+
+
+# scope -> (updated_at of the loaded layout, positions); reloaded when it moves
+_positions: Dict[str, Tuple[Any, Dict[str, List[float]]]] = {}
+
+
+async def apositions(scopes: Set[str]) -> Dict[str, Dict[str, List[float]]]:
+    """The layouts of the scopes, parsed again only after a refresh."""
+    layouts = GraphLayout.objects.filter(scope__in=scopes)
+    stamps = {
+        scope: stamp
+        async for scope, stamp in layouts.values_list("scope", "updated_at")
+    }
+    stale = [
+        scope
+        for scope in scopes
+        if scope not in _positions or _positions[scope][0] != stamps.get(scope)
+    ]
+    if stale:
+        loaded = {
+            scope: (stamp, positions)
+            async for scope, stamp, positions in layouts.filter(
+                scope__in=stale
+            ).values_list("scope", "updated_at", "positions")
+        }
+        for scope in stale:
+            _positions[scope] = loaded.get(scope, (None, {}))
+    return {scope: _positions[scope][1] for scope in scopes}
+
+
+async def aattach_positions(nodes: List[Dict[str, Any]]) -> None:
+    """Sets "position": [x, y] on nodes whose scope has a layout."""
+    scopes = {node.get("scope") for node in nodes if node.get("scope")}
+    layouts = await apositions(scopes) if scopes else {}
+    for node in nodes:
+        position = layouts.get(node.get("scope"), {}).get(node.get("id"))
+        if position:
+            node["position"] = position
@@ -1,13 +1,25 @@
+import hashlib
 import json
-from typing import Any, Dict, List, Union
+import logging
+import re
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
 
 from django.conf import settings
-from neo4j import GraphDatabase
 
-# Initialize driver
-driver = GraphDatabase.driver(
-    settings.NEO4J_URI, auth=(settings.NEO4J_USERNAME, settings.NEO4J_PASSWORD)
-)
+from knowledge.models import GraphVersion
+
+from .deltas import publish, upsert_delta
+from .driver import get_driver
+from .graph import EXPAND_RELATIONS
+from .schema import BASE_LABEL
+
+logger = logging.getLogger(__name__)
+
+# Relationship types are interpolated into Cypher, so only accept plain names
+RELATION_PATTERN = re.compile(r"^[A-Z][A-Z0-9_]*$")
+
+ProgressCallback = Callable[[int, int], None]
 
 
 def flatten_props(props: Dict[str, Any]) -> Dict[str, Any]:
@@ -29,87 +41,326 @@ def flatten_props(props: Dict[str, Any]) -> Dict[str, Any]:
     return flat
 
 
-def create_nodes_and_relationships(
-    tx, node: Dict[str, Any], parent_id: str = None
-) -> None:
-    node_id = node.get("id")
-    if not node_id:
-        return
-
-    node_label = "Concept"
+def node_label(node_id: str) -> str:
     if node_id.startswith("P"):
-        node_label = "Procedure"
-    elif node_id.startswith("A"):
-        node_label = "Assessment"
-
-    # Props to set on the node (exclude structural keys)
-    props = flatten_props(
-        {
-            k: v
-            for k, v in node.items()
-            if k not in ["children", "connections", "question_prompts"]
-        }
+        return "Procedure"
+    if node_id.startswith("A"):
+        return "Assessment"
+    return "Concept"
+
+
+def content_hash(label: str, props: Dict[str, Any], edges: List[Dict[str, str]]) -> str:
+    """Hash of everything a node owns: its flattened props and outgoing edges."""
+    payload = json.dumps(
+        {"label": label, "props": props, "edges": edges},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
     )
+    return hashlib.md5(payload.encode(), usedforsecurity=False).hexdigest()
 
-    # Create/Merge the node
-    tx.run(
+
+def walk_graph(graph_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Iterative depth-first walk over the KG tree.
+    Nodes without an id are skipped together with their subtree.
+    """
+    stack: List[Any] = [graph_data]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict) or not node.get("id"):
+            continue
+        yield node
+        # Reversed so siblings come out in document order
+        stack.extend(reversed(node.get("children", [])))
+
+
+def invalid_connections(graph_data: Dict[str, Any]) -> Iterator[tuple[str, Any]]:
+    for node in walk_graph(graph_data):
+        for conn in node.get("connections", []):
+            if not is_valid_connection(conn):
+                yield node["id"], conn
+
+
+def is_valid_connection(conn: Any) -> bool:
+    return (
+        isinstance(conn, dict)
+        and bool(conn.get("to"))
+        and bool(RELATION_PATTERN.match(conn.get("relation", "")))
+    )
+
+
+def make_record(
+    node_id: str, label: str, props: Dict[str, Any], edges: List[Dict[str, str]]
+) -> Dict[str, Any]:
+    return {
+        "id": node_id,
+        "label": label,
+        "props": props,
+        "edges": edges,
+        "content_hash": content_hash(label, props, edges),
+    }
+
+
+def iter_records(graph_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Yields one record per node: {"id", "label", "props", "edges", "content_hash"}.
+    A node owns its outgoing edges (HAS_CHILD to its children, HAS_QUESTION
+    to its questions and its semantic connections), so any change to them
+    changes the node's hash.
+    """
+    for node in walk_graph(graph_data):
+        node_id = node["id"]
+        label = node_label(node_id)
+        # Props to set on the node (exclude structural keys)
+        props = flatten_props(
+            {
+                k: v
+                for k, v in node.items()
+                if k not in ["children", "connections", "question_prompts"]
+            }
+        )
+
+        edges: List[Dict[str, str]] = []
+        questions: List[Dict[str, Any]] = []
+
+        # Create Question nodes for Assessments
+        if label == "Assessment":
+            for idx, q in enumerate(node.get("question_prompts", []), start=1):
+                q_text = q.get("question", "") if isinstance(q, dict) else str(q)
+                q_id = f"{node_id}-Q{idx}"
+                questions.append(make_record(q_id, "Question", {"text": q_text}, []))
+                edges.append({"to": q_id, "type": "HAS_QUESTION"})
+
+        # Generic HAS_CHILD is enough for the hierarchy
+        for child in node.get("children", []):
+            if isinstance(child, dict) and child.get("id"):
+                edges.append({"to": child["id"], "type": "HAS_CHILD"})
+
+        # Semantic Connections
+        for conn in node.get("connections", []):
+            if is_valid_connection(conn):
+                edges.append({"to": conn["to"], "type": conn["relation"]})
+
+        yield make_record(node_id, label, props, edges)
+        yield from questions
+
+
+def batched(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def group_by(rows: List[Dict[str, Any]], key: str) -> Dict[str, List[Dict[str, Any]]]:
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(row[key], []).append(row)
+    return groups
+
+
+def fetch_stored_nodes(session, scope: str) -> Dict[str, Dict[str, Any]]:
+    """Per node id of the scope: its content hash and the keys ingest wrote."""
+    result = session.run(
         f"""
-        MERGE (n:{node_label} {{id:$id}})
-        SET n += $props
+        MATCH (n:{BASE_LABEL} {{scope: $scope}})
+        RETURN n.id AS id, n.content_hash AS hash, n.ingest_keys AS keys
         """,
-        id=node_id,
-        props=props,
+        scope=scope,
     )
+    return {r["id"]: {"hash": r["hash"], "keys": r["keys"] or []} for r in result}
 
-    # Create Question nodes for Assessments
-    if node_label == "Assessment" and "question_prompts" in node:
-        for idx, q in enumerate(node["question_prompts"], start=1):
-            q_text = q.get("question", "") if isinstance(q, dict) else str(q)
-            q_id = f"{node_id}-Q{idx}"
-            tx.run(
-                """
-                MERGE (q:Question {id:$qid})
-                SET q.text = $text
-                WITH q
-                MATCH (a {id:$aid})
-                MERGE (a)-[:HAS_QUESTION]->(q)
-                """,
-                qid=q_id,
-                text=q_text,
-                aid=node_id,
-            )
 
-    # Relationship to Parent
-    if parent_id:
-        # Determine relationship type based on node types if needed,
-        # but generic HAS_CHILD is often enough for hierarchy.
-        # Original code used: HAS_CHILD
+def delete_nodes(tx, scope: str, ids: List[str]) -> None:
+    tx.run(
+        f"""
+        UNWIND $ids AS id
+        MATCH (n:{BASE_LABEL} {{scope: $scope, id: id}})
+        DETACH DELETE n
+        """,
+        scope=scope,
+        ids=ids,
+    ).consume()
+
+
+def write_nodes(tx, scope: str, rows: List[Dict[str, Any]]) -> None:
+    """
+    Merges the document's props into the nodes, leaving properties ingest
+    does not own (instructor additions, revision, analytics) in place; keys
+    a previous upload wrote but this one no longer has arrive as nulls and
+    are removed. The content hash is cleared until mark_written, so a run
+    that stops before the node's edges are rewritten is redone next time.
+    """
+    # Drop the outgoing edges these nodes own; write_edges recreates them
+    tx.run(
+        f"""
+        UNWIND $ids AS id
+        MATCH (:{BASE_LABEL} {{scope: $scope, id: id}})-[r]->()
+        DELETE r
+        """,
+        scope=scope,
+        ids=[row["id"] for row in rows],
+    ).consume()
+
+    # Labels cannot be parameterized, so issue one UNWIND per label
+    for label, group in group_by(rows, "label").items():
         tx.run(
-            """
-            MATCH (p {id:$parent_id}), (c {id:$child_id})
-            MERGE (p)-[:HAS_CHILD]->(c)
+            f"""
+            UNWIND $rows AS row
+            MERGE (n:{label} {{scope: $scope, id: row.id}})
+            SET n += row.props, n:{BASE_LABEL},
+                n.revision = coalesce(n.revision, 0) + 1
+            REMOVE n.content_hash
             """,
-            parent_id=parent_id,
-            child_id=node_id,
-        )
+            scope=scope,
+            rows=group,
+        ).consume()
 
-    # Semantic Connections
-    for conn in node.get("connections", []):
+
+def write_edges(tx, scope: str, rows: List[Dict[str, str]]) -> None:
+    for rel_type, group in group_by(rows, "type").items():
         tx.run(
             f"""
-            MATCH (a {{id:$from_id}}), (b {{id:$to_id}})
-            MERGE (a)-[:{conn["relation"]}]->(b)
+            UNWIND $rows AS row
+            MATCH (a:{BASE_LABEL} {{scope: $scope, id: row.from}})
+            MATCH (b:{BASE_LABEL} {{scope: $scope, id: row.to}})
+            MERGE (a)-[r:{rel_type}]->(b)
+            SET r.scope = $scope
             """,
-            from_id=node_id,
-            to_id=conn["to"],
-        )
+            scope=scope,
+            rows=group,
+        ).consume()
+
+
+def mark_written(tx, scope: str, rows: List[Dict[str, str]]) -> None:
+    """Stores the hashes of nodes whose props and edges are all written."""
+    tx.run(
+        f"""
+        UNWIND $rows AS row
+        MATCH (n:{BASE_LABEL} {{scope: $scope, id: row.id}})
+        SET n.content_hash = row.hash
+        """,
+        scope=scope,
+        rows=rows,
+    ).consume()
+
+
+def graph_delta(
+    graph_data: Dict[str, Any],
+    scope: str,
+    versions: Dict[str, int],
+    changed: Set[str],
+    removed: List[str],
+) -> Dict[str, Any]:
+    """What an upload changed, in the lean shape the graph view renders."""
+    nodes, edges = [], []
+    for record in iter_records(graph_data):
+        if record["id"] in changed:
+            nodes.append(
+                {
+                    "id": record["id"],
+                    "name": record["props"].get("name"),
+                    "scope": scope,
+                    "label": record["label"],
+                }
+            )
+            # Only the relations the view navigates by
+            edges.extend(
+                {"source": record["id"], "target": e["to"], "relation": e["type"]}
+                for e in record["edges"]
+                if e["type"] in EXPAND_RELATIONS.split("|")
+            )
+    return upsert_delta(scope, versions, nodes, edges, removed)
+
+
+def upload_graph(
+    graph_data: Dict[str, Any],
+    scope: str,
+    batch_size: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, int]:
+    """
+    Upserts a document's graph into its Neo4j scope, writing only what changed.
+
+    Nodes are keyed by (scope, id) and every node and edge is tagged with the
+    scope, so documents reusing the LLM's ids (C01, P01...) never collide.
+    Each node also stores a content hash; the hashes already stored for the
+    scope are diffed against the new graph:
+    removed nodes are deleted, added or changed nodes are rewritten along
+    with the edges they own, and unchanged nodes are not touched. A node's
+    hash is only stored once its edges are written too.
+
+    Writes go out in bounded batches, each its own managed transaction that
+    execute_write retries on transient errors; all of them are idempotent.
+    ``progress(done, total)`` is called after every batch.
+    """
+    batch_size = batch_size or settings.NEO4J_UPLOAD_BATCH_SIZE
+
+    for node_id, conn in invalid_connections(graph_data):
+        logger.warning(f"Skipping invalid connection on {node_id}: {conn}")
+
+    with get_driver().session() as session:
+        stored = fetch_stored_nodes(session, scope)
+
+        seen: Set[str] = set()
+        changed: Set[str] = set()
+        edge_count = 0
+        for record in iter_records(graph_data):
+            seen.add(record["id"])
+            if stored.get(record["id"], {}).get("hash") != record["content_hash"]:
+                changed.add(record["id"])
+                edge_count += len(record["edges"])
+        removed = [node_id for node_id in stored if node_id not in seen]
+
+        stats = {
+            "added": sum(1 for node_id in changed if node_id not in stored),
+            "changed": sum(1 for node_id in changed if node_id in stored),
+            "removed": len(removed),
+            "unchanged": len(seen) - len(changed),
+        }
+        total = len(removed) + 2 * len(changed) + edge_count
+        done = 0
+
+        def node_rows() -> Iterator[Dict[str, Any]]:
+            for record in iter_records(graph_data):
+                if record["id"] in changed:
+                    keys = sorted(record["props"])
+                    gone = set(stored.get(record["id"], {}).get("keys", [])) - set(keys)
+                    props = {
+                        **dict.fromkeys(gone),  # null removes the property
+                        **record["props"],
+                        "scope": scope,
+                        "ingest_keys": keys,
+                    }
+                    yield {"id": record["id"], "label": record["label"], "props": props}
+
+        def edge_rows() -> Iterator[Dict[str, str]]:
+            for record in iter_records(graph_data):
+                if record["id"] in changed:
+                    for edge in record["edges"]:
+                        yield {"from": record["id"], **edge}
 
-    # Recurse
-    for child in node.get("children", []):
-        create_nodes_and_relationships(tx, child, parent_id=node_id)
+        def hash_rows() -> Iterator[Dict[str, str]]:
+            for record in iter_records(graph_data):
+                if record["id"] in changed:
+                    yield {"id": record["id"], "hash": record["content_hash"]}
 
+        for writer, rows in (
+            (delete_nodes, batched(removed, batch_size)),
+            (write_nodes, batched(node_rows(), batch_size)),
+            (write_edges, batched(edge_rows(), batch_size)),
+            (mark_written, batched(hash_rows(), batch_size)),
+        ):
+            for batch in rows:
+                session.execute_write(writer, scope, batch)
+                done += len(batch)
+                logger.info(f"Uploaded {done}/{total} graph changes for {scope}")
+                if progress:
+                    progress(done, total)
 
-def upload_graph(graph_data: Dict[str, Any]) -> None:
-    """Uploads the full graph dictionary to Neo4j."""
-    with driver.session() as session:
-        session.execute_write(create_nodes_and_relationships, graph_data)
+    if stats["added"] or stats["changed"] or stats["removed"]:
+        versions = GraphVersion.bump(scope)  # invalidates cached reads of this scope
+        # Stored, so views served by the web processes replay it too
+        publish(graph_delta(graph_data, scope, versions, changed, removed))
+    logger.info(f"Graph diff for {scope}: {stats}")
+    return stats
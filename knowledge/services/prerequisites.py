@@ -0,0 +1,256 @@
+"""
+Precomputed prerequisite closure of each scope's concepts.
+
+PREREQUISITE_FOR/EXTENDS_TO point from the earlier concept to the later
+one and DEPENDS_ON the other way round. A rebuild orders the concepts
+topologically (concepts in a cycle are kept together and reported) and
+stores every concept's transitive prerequisites as a bit-packed matrix,
+so learning paths are answered from memory instead of variable-length
+Cypher.
+"""
+
+import heapq
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from knowledge.models import PrerequisiteIndex
+
+from .graph import fetch_adjacency
+from .layout import structure_hash
+
+logger = logging.getLogger(__name__)
+
+CONCEPT_LABEL = "Concept"
+FORWARD_RELATIONS = "PREREQUISITE_FOR|EXTENDS_TO"  # source comes first
+BACKWARD_RELATIONS = "DEPENDS_ON"  # target comes first
+
+
+def fetch_prerequisites(scope: str) -> Dict[str, List[str]]:
+    """Every concept of a scope mapped to the concepts that build on it."""
+    before = fetch_adjacency(scope, FORWARD_RELATIONS, CONCEPT_LABEL)
+    for node_id, targets in fetch_adjacency(
+        scope, BACKWARD_RELATIONS, CONCEPT_LABEL
+    ).items():
+        for target in targets:
+            before.setdefault(target, []).append(node_id)
+    return before
+
+
+def strongly_connected(successors: List[List[int]]) -> List[List[int]]:
+    """Tarjan's algorithm without recursion (chains can be thousands deep)."""
+    index = [-1] * len(successors)
+    low = [0] * len(successors)
+    on_stack = [False] * len(successors)
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+
+    for root in range(len(successors)):
+        if index[root] >= 0:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, edge = work.pop()
+            if edge == 0:
+                index[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            if edge < len(successors[node]):
+                work.append((node, edge + 1))
+                nxt = successors[node][edge]
+                if index[nxt] < 0:
+                    work.append((nxt, 0))
+                elif on_stack[nxt]:
+                    low[node] = min(low[node], index[nxt])
+                continue
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+def build_closure(
+    before: Dict[str, List[str]],
+) -> Tuple[List[str], np.ndarray, List[List[str]]]:
+    """
+    Returns (order, packed ancestor matrix, cycles). Ties in the order are
+    broken by id so paths read naturally (C01 before C02).
+    """
+    ids = sorted(before)
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    successors = [
+        sorted({index[t] for t in before[node_id] if t in index and t != node_id})
+        for node_id in ids
+    ]
+
+    components = strongly_connected(successors)
+    component_of = [0] * len(ids)
+    for c, members in enumerate(components):
+        members.sort()
+        for member in members:
+            component_of[member] = c
+
+    # Kahn over the condensation, smallest id first
+    parents: List[Set[int]] = [set() for _ in components]
+    children: List[Set[int]] = [set() for _ in components]
+    for node, targets in enumerate(successors):
+        for target in targets:
+            a, b = component_of[node], component_of[target]
+            if a != b:
+                children[a].add(b)
+                parents[b].add(a)
+    waiting = [len(p) for p in parents]
+    ready = [(components[c][0], c) for c in range(len(components)) if not waiting[c]]
+    heapq.heapify(ready)
+    component_order = []
+    while ready:
+        _, c = heapq.heappop(ready)
+        component_order.append(c)
+        for child in children[c]:
+            waiting[child] -= 1
+            if not waiting[child]:
+                heapq.heappush(ready, (components[child][0], child))
+
+    order = [member for c in component_order for member in components[c]]
+    position = np.empty(len(ids), dtype=np.int64)
+    position[order] = np.arange(len(ids))
+
+    n = len(ids)
+    matrix = np.zeros((n, (n + 7) // 8), dtype=np.uint8)
+    for c in component_order:
+        members = position[components[c]]
+        row = np.zeros(matrix.shape[1], dtype=np.uint8)
+        direct = np.array(
+            [position[components[p][0]] for p in parents[c]], dtype=np.int64
+        )
+        if len(direct):
+            # Ancestors of a parent component are shared by all its members
+            row |= np.bitwise_or.reduce(matrix[direct], axis=0)
+            preds = position[[m for p in parents[c] for m in components[p]]]
+            set_bits(row, preds)
+        for member in members:
+            matrix[member] = row
+            set_bits(matrix[member], members[members != member])
+
+    cycles = [
+        [ids[m] for m in components[c]]
+        for c in component_order
+        if len(components[c]) > 1
+    ]
+    return [ids[i] for i in order], matrix, cycles
+
+
+def set_bits(row: np.ndarray, positions: np.ndarray) -> None:
+    np.bitwise_or.at(row, positions >> 3, (0x80 >> (positions & 7)).astype(np.uint8))
+
+
+def refresh_prerequisites(scope: str) -> PrerequisiteIndex:
+    """
+    Rebuilds a scope's index if its concepts or their relations changed.
+    Changed scopes are rebuilt whole: the relations must be read in full to
+    tell whether anything changed, and a removed edge or a reordering can
+    reach any descendant's row, while the closure itself takes well under a
+    second for 10,000 concepts.
+    """
+    before = fetch_prerequisites(scope)
+    digest = structure_hash(before)
+    index = PrerequisiteIndex.objects.filter(scope=scope).first()
+    if index and index.structure_hash == digest:
+        return index
+
+    order, matrix, cycles = build_closure(before)
+    if cycles:
+        logger.warning(f"Prerequisite cycles in {scope}: {cycles}")
+    index, _ = PrerequisiteIndex.objects.update_or_create(
+        scope=scope,
+        defaults={
+            "structure_hash": digest,
+            "order": order,
+            "closure": matrix.tobytes(),
+            "cycles": cycles,
+            "node_count": len(order),
+        },
+    )
+    logger.info(f"Prerequisite index for {scope}: {len(order)} concepts")
+    return index
+
+
+class PrerequisiteClosure:
+    """In-memory view of one PrerequisiteIndex; all lookups are bit ops."""
+
+    def __init__(self, order: List[str], closure: bytes, cycles: List[List[str]]):
+        self.order = order
+        self.cycles = cycles
+        self.position = {node_id: i for i, node_id in enumerate(order)}
+        n = len(order)
+        self.matrix = np.frombuffer(closure, dtype=np.uint8).reshape(n, (n + 7) // 8)
+
+    def positions(self, ids: List[str]) -> np.ndarray:
+        return np.array([self.position[i] for i in ids], dtype=np.int64)
+
+    def ancestors(self, positions: np.ndarray) -> np.ndarray:
+        packed = np.bitwise_or.reduce(self.matrix[positions], axis=0)
+        return np.unpackbits(packed, count=len(self.order)).astype(bool)
+
+    def descendants(self, positions: np.ndarray) -> np.ndarray:
+        bits = (0x80 >> (positions & 7)).astype(np.uint8)
+        return (self.matrix[:, positions >> 3] & bits).any(axis=1)
+
+    def ids(self, mask: np.ndarray) -> List[str]:
+        return [self.order[i] for i in np.flatnonzero(mask)]
+
+    def learning_path(
+        self, targets: List[str], known: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Ordered concepts to study to reach ``targets``: their prerequisites
+        and themselves, minus ``known`` concepts and what those build on.
+        """
+        wanted = self.positions(targets)
+        ancestors = self.ancestors(wanted)
+        path = ancestors.copy()
+        path[wanted] = True
+        if known:
+            learned = self.positions(known)
+            path &= ~self.ancestors(learned)
+            path[learned] = False
+        steps = self.ids(path)
+        on_path = set(steps)
+        return {
+            "path": steps,
+            "ancestors": self.ids(ancestors),
+            "descendants": self.ids(self.descendants(wanted)),
+            "cycles": [c for c in self.cycles if on_path.intersection(c)],
+        }
+
+
+# scope -> (updated_at of the loaded index, closure); refreshed when it moves
+_loaded: Dict[str, Tuple[Any, PrerequisiteClosure]] = {}
+
+
+async def aload_closure(scope: str) -> Optional[PrerequisiteClosure]:
+    """The scope's closure, reloaded only after the huey worker rebuilt it."""
+    rows = PrerequisiteIndex.objects.filter(scope=scope)
+    stamp = await rows.values_list("updated_at", flat=True).afirst()
+    if stamp is None:
+        _loaded.pop(scope, None)
+        return None
+    cached = _loaded.get(scope)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    index = await rows.afirst()
+    closure = PrerequisiteClosure(index.order, bytes(index.closure), index.cycles)
+    _loaded[scope] = (index.updated_at, closure)
+    return closure
@@ -0,0 +1,253 @@
+import csv
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from ingest.models import IngestionTask
+from knowledge.tasks import refresh_scope
+
+from .loader import iter_records, upload_graph
+from .schema import BASE_LABEL
+
+logger = logging.getLogger(__name__)
+
+# Splits array values on import. Free text (misconceptions, steps) contains
+# ";" and ",", so arrays are joined with the ASCII unit separator instead,
+# which neo4j-admin takes as U+001F.
+ARRAY_DELIMITER = "\x1f"
+
+
+@dataclass
+class Artifact:
+    path: Path
+    scope: str
+
+
+def discover_artifacts(artifact_dir: Path) -> List[Artifact]:
+    """
+    Maps every stored KG artifact to the scope it was ingested into.
+    Only the newest artifact per scope is kept, since older ones are earlier
+    versions of the same document; artifacts no task points at (uploaded
+    before tasks recorded them) become their own scope.
+    """
+    paths = {
+        p.name: p
+        for p in sorted(Path(artifact_dir).glob("*.json"))
+        if not p.name.startswith(".")  # the replay checkpoint lives here too
+    }
+
+    latest: Dict[str, Artifact] = {}
+    claimed: Set[str] = set()
+    tasks = (
+        IngestionTask.objects.exclude(artifact="")
+        .exclude(scope="")
+        .order_by("updated_at")
+    )
+    for task in tasks:
+        claimed.add(task.artifact)
+        if task.artifact in paths:
+            latest[task.scope] = Artifact(paths[task.artifact], task.scope)
+
+    orphans = [
+        Artifact(path, path.stem) for name, path in paths.items() if name not in claimed
+    ]
+    return sorted(latest.values(), key=lambda a: a.scope) + orphans
+
+
+def load_artifact(artifact: Artifact) -> Dict[str, Any]:
+    with open(artifact.path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Checkpoint:
+    """Names of artifacts already replayed, persisted after each one."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.done: Set[str] = set()
+        if self.path.exists():
+            self.done = set(json.loads(self.path.read_text(encoding="utf-8")))
+
+    def mark(self, name: str) -> None:
+        with self.lock:
+            self.done.add(name)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(sorted(self.done)), encoding="utf-8")
+            tmp.replace(self.path)
+
+    def clear(self) -> None:
+        self.done = set()
+        self.path.unlink(missing_ok=True)
+
+
+def replay_artifacts(
+    artifacts: List[Artifact],
+    checkpoint: Checkpoint,
+    workers: int = 4,
+    batch_size: Optional[int] = None,
+    on_done: Optional[Callable[[Artifact, Dict[str, int]], None]] = None,
+) -> int:
+    """
+    Loads artifacts into Neo4j with ``workers`` parallel writers.
+    Each scope is written by exactly one worker, in batched transactions, so
+    writers never contend on the same nodes. Scopes that changed get their
+    layout, prerequisite and embedding refreshes queued, as after an
+    upload. Returns how many were loaded.
+    """
+    pending = [a for a in artifacts if a.path.name not in checkpoint.done]
+    logger.info(
+        f"Replaying {len(pending)} artifacts "
+        f"({len(artifacts) - len(pending)} already checkpointed)"
+    )
+
+    def replay(artifact: Artifact) -> Dict[str, int]:
+        stats = upload_graph(
+            load_artifact(artifact), scope=artifact.scope, batch_size=batch_size
+        )
+        if stats["added"] or stats["changed"] or stats["removed"]:
+            refresh_scope(artifact.scope)
+        checkpoint.mark(artifact.path.name)
+        return stats
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(replay, artifact): artifact for artifact in pending}
+        for future in as_completed(futures):
+            stats = future.result()
+            if on_done:
+                on_done(futures[future], stats)
+    return len(pending)
+
+
+# === neo4j-admin import export ===
+
+
+def csv_type(value: Any) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "long"
+    if isinstance(value, float):
+        return "double"
+    if isinstance(value, list):
+        return "string[]"
+    return "string"
+
+
+def merge_types(current: Optional[str], new: str) -> str:
+    if current is None or current == new:
+        return new
+    if {current, new} == {"long", "double"}:
+        return "double"
+    return "string"
+
+
+def csv_array(values: List[Any]) -> str:
+    items = [str(v) for v in values]
+    for item in items:
+        if ARRAY_DELIMITER in item:
+            # It would come back as several elements
+            raise ValueError(f"Array element contains the array delimiter: {item!r}")
+    return ARRAY_DELIMITER.join(items)
+
+
+def csv_value(value: Any, type_: str) -> str:
+    if value is None:
+        return ""
+    if type_ == "string[]":
+        return csv_array(value)
+    if type_ == "boolean":
+        return "true" if value else "false"
+    if type_ == "string" and isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def iter_artifact_records(artifacts: List[Artifact]) -> Iterator[tuple[str, Dict]]:
+    # One artifact in memory at a time
+    for artifact in artifacts:
+        for record in iter_records(load_artifact(artifact)):
+            yield artifact.scope, record
+
+
+def export_admin_csv(artifacts: List[Artifact], out_dir: Path) -> List[str]:
+    """
+    Writes node and relationship CSVs for ``neo4j-admin database import``
+    and returns the command line to run. Headers need every property up
+    front, so a first pass collects property types per label and a second
+    streams the rows out.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    types: Dict[str, Dict[str, str]] = {}
+    for _, record in iter_artifact_records(artifacts):
+        label_types = types.setdefault(record["label"], {})
+        for key, value in record["props"].items():
+            if key not in ("id", "scope") and value is not None:
+                label_types[key] = merge_types(label_types.get(key), csv_type(value))
+
+    node_files = {}
+    writers = {}
+    for label, label_types in types.items():
+        keys = sorted(label_types)
+        path = out_dir / f"nodes_{label}.csv"
+        f = open(path, "w", newline="", encoding="utf-8")
+        node_files[label] = (f, keys)
+        writers[label] = csv.writer(f)
+        writers[label].writerow(
+            [
+                f":ID({BASE_LABEL})",
+                "scope",
+                "id",
+                "content_hash",
+                "ingest_keys:string[]",
+            ]
+            + [f"{key}:{label_types[key]}" for key in keys]
+            + [":LABEL"]
+        )
+
+    rels_path = out_dir / "relationships.csv"
+    with open(rels_path, "w", newline="", encoding="utf-8") as rels_file:
+        rels = csv.writer(rels_file)
+        rels.writerow(
+            [f":START_ID({BASE_LABEL})", f":END_ID({BASE_LABEL})", ":TYPE", "scope"]
+        )
+        try:
+            for scope, record in iter_artifact_records(artifacts):
+                label = record["label"]
+                _, keys = node_files[label]
+                props = record["props"]
+                label_types = types[label]
+                writers[label].writerow(
+                    [f"{scope}/{record['id']}", scope, record["id"]]
+                    + [record["content_hash"], csv_array(sorted(props))]
+                    + [csv_value(props.get(key), label_types[key]) for key in keys]
+                    + [f"{label}{ARRAY_DELIMITER}{BASE_LABEL}"]
+                )
+                for edge in record["edges"]:
+                    rels.writerow(
+                        [f"{scope}/{record['id']}", f"{scope}/{edge['to']}"]
+                        + [edge["type"], scope]
+                    )
+        finally:
+            for f, _ in node_files.values():
+                f.close()
+
+    return [
+        "neo4j-admin",
+        "database",
+        "import",
+        "full",
+        *[f"--nodes={f.name}" for f, _ in node_files.values()],
+        f"--relationships={rels_path}",
+        f"--array-delimiter=U+{ord(ARRAY_DELIMITER):04X}",
+        "--multiline-fields=true",
+        "--skip-bad-relationships=true",
+        "--overwrite-destination=true",
+        "neo4j",
+    ]
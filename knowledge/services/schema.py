@@ -0,0 +1,70 @@
+import logging
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Every KG node carries this shared label on top of its specific one, so
+# lookups that only know the id can still hit a single index.
+BASE_LABEL = "KGNode"
+NODE_LABELS = ["Concept", "Procedure", "Assessment", "Question"]
+
+# Full-text search over the text instructors look for. One index spans the
+# labels, so a search is a single Lucene query; scope is indexed too so the
+# scope filter runs inside Lucene instead of after it.
+FULLTEXT_INDEX = "kgnode_text"
+FULLTEXT_LABELS = ["Concept", "Procedure", "Question"]
+FULLTEXT_FIELDS = [
+    "name",
+    "definition",  # Concept
+    "learning_objective",  # Concept
+    "hint",  # Procedure steps
+    "code_snippet",  # Procedure steps
+    "text",  # Question
+]
+
+# Ids are only unique inside a scope (one ingested document), so identity is
+# the (scope, id) pair and every scoped lookup is a composite index seek.
+SCHEMA_STATEMENTS: List[str] = [
+    f"CREATE CONSTRAINT {label.lower()}_scope_id IF NOT EXISTS "
+    f"FOR (n:{label}) REQUIRE (n.scope, n.id) IS UNIQUE"
+    for label in [BASE_LABEL, *NODE_LABELS]
+] + [
+    # Whole-scope reads (diffs, root listing) and legacy unscoped id lookups
+    f"CREATE INDEX {BASE_LABEL.lower()}_scope IF NOT EXISTS "
+    f"FOR (n:{BASE_LABEL}) ON (n.scope)",
+    f"CREATE INDEX {BASE_LABEL.lower()}_id IF NOT EXISTS "
+    f"FOR (n:{BASE_LABEL}) ON (n.id)",
+    f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} IF NOT EXISTS "
+    f"FOR (n:{'|'.join(FULLTEXT_LABELS)}) "
+    f"ON EACH [{', '.join(f'n.{field}' for field in [*FULLTEXT_FIELDS, 'scope'])}]",
+]
+
+# Nodes written before the base label existed only carry their specific label.
+BACKFILL_BASE_LABEL = f"""
+MATCH (n)
+WHERE ({" OR ".join(f"n:{label}" for label in NODE_LABELS)}) AND NOT n:{BASE_LABEL}
+CALL {{ WITH n SET n:{BASE_LABEL} }} IN TRANSACTIONS OF 10000 ROWS
+"""
+
+
+def constraint_names() -> List[str]:
+    return [f"{label.lower()}_scope_id" for label in [BASE_LABEL, *NODE_LABELS]]
+
+
+def missing_constraints(driver) -> List[str]:
+    """Returns the names of expected constraints that do not exist yet."""
+    with driver.session() as session:
+        existing = {r["name"] for r in session.run("SHOW CONSTRAINTS YIELD name")}
+    return [name for name in constraint_names() if name not in existing]
+
+
+def ensure_schema(driver, backfill: bool = True) -> None:
+    """Creates constraints (and their backing indexes) idempotently."""
+    with driver.session() as session:
+        for statement in SCHEMA_STATEMENTS:
+            session.run(statement).consume()
+        if backfill:
+            # CALL ... IN TRANSACTIONS must run in an implicit transaction
+            session.run(BACKFILL_BASE_LABEL).consume()
+        session.run("CALL db.awaitIndexes(300)").consume()
+    logger.info("Neo4j schema is up to date.")
@@ -0,0 +1,110 @@
+"""
+Full-text search over the KG, backed by the kgnode_text Lucene index.
+
+User input is reduced to plain terms (every term must match, the last one
+also as a prefix, for search-as-you-type) and combined with an indexed
+scope clause, so ranking, filtering and paging all happen inside Lucene.
+Each hit comes back with its ancestor path from the top-level concept, so
+the graph view can open the tree down to it.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from .driver import get_async_driver, get_driver
+from .graph import EXPAND_RELATIONS, projection
+from .schema import FULLTEXT_FIELDS, FULLTEXT_INDEX
+
+# Questions hang off their assessment through HAS_QUESTION
+PATH_RELATIONS = f"{EXPAND_RELATIONS}|HAS_QUESTION"
+# Deepest ancestor chain followed (procedure steps nest one per step)
+MAX_PATH_DEPTH = 32
+MAX_TERMS = 8
+
+TERM_PATTERN = re.compile(r"\w+")
+
+
+def lucene_query(text: str, scope: Optional[str]) -> Optional[str]:
+    """Lucene query for ``text``, or None when it has no searchable terms."""
+    # Lowercase word characters only: nothing Lucene treats as syntax
+    terms = TERM_PATTERN.findall(text.lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    clauses = []
+    for i, term in enumerate(terms):
+        variants = [term, f"{term}*"] if i == len(terms) - 1 else [term]
+        fields = " ".join(f"{f}:{v}" for f in FULLTEXT_FIELDS for v in variants)
+        clauses.append(f"+({fields})")
+    if scope:
+        escaped = scope.replace("\\", "\\\\").replace('"', '\\"')
+        clauses.insert(0, f'+scope:"{escaped}"')
+    return " ".join(clauses)
+
+
+def search_query(scope: Optional[str]) -> str:
+    # The scope clause in Lucene is a phrase over the analyzed scope, so the
+    # exact match is still checked here; at worst a page comes back short.
+    scope_filter = "WHERE node.scope = $scope" if scope else ""
+    return f"""
+    CALL db.index.fulltext.queryNodes($index, $lucene, {{limit: $window}})
+    YIELD node, score
+    {scope_filter}
+    WITH node, score ORDER BY score DESC, node.id SKIP $skip LIMIT $limit
+    OPTIONAL MATCH p = (node)<-[:{PATH_RELATIONS}*1..{MAX_PATH_DEPTH}]-(top:Concept)
+    WHERE NOT ()-[:HAS_CHILD]->(top)
+    WITH node, score, p ORDER BY length(p)
+    WITH node, score, head(collect(p)) AS p
+    RETURN {projection("node", True)} AS node, score,
+           [n IN reverse(tail(coalesce(nodes(p), [node]))) |
+            {projection("n", True)}] AS path
+    ORDER BY score DESC, node.id
+    """
+
+
+def search_params(
+    lucene: str, scope: Optional[str], page: int, page_size: int
+) -> Dict[str, Any]:
+    skip = (page - 1) * page_size
+    return {
+        "index": FULLTEXT_INDEX,
+        "lucene": lucene,
+        "scope": scope,
+        "skip": skip,
+        "limit": page_size + 1,  # one extra row tells whether a next page exists
+        "window": skip + page_size + 1,
+    }
+
+
+def search_payload(rows: List[Dict[str, Any]], page_size: int) -> Dict[str, Any]:
+    hits = [
+        {**dict(r["node"]), "score": r["score"], "path": [dict(n) for n in r["path"]]}
+        for r in rows[:page_size]
+    ]
+    return {"hits": hits, "has_more": len(rows) > page_size}
+
+
+def search_nodes(
+    text: str, scope: Optional[str] = None, page: int = 1, page_size: int = 20
+) -> Dict[str, Any]:
+    """Ranked hits for ``text``: {"hits": [...], "has_more"}."""
+    lucene = lucene_query(text, scope)
+    if lucene is None:
+        return {"hits": [], "has_more": False}
+    with get_driver().session() as session:
+        result = session.run(
+            search_query(scope), search_params(lucene, scope, page, page_size)
+        )
+        return search_payload(list(result), page_size)
+
+
+async def asearch_nodes(
+    text: str, scope: Optional[str] = None, page: int = 1, page_size: int = 20
+) -> Dict[str, Any]:
+    lucene = lucene_query(text, scope)
+    if lucene is None:
+        return {"hits": [], "has_more": False}
+    async with get_async_driver().session() as session:
+        result = await session.run(
+            search_query(scope), search_params(lucene, scope, page, page_size)
+        )
+        return search_payload([r async for r in result], page_size)
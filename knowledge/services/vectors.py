@@ -0,0 +1,409 @@
+"""
+Per-scope embedding index of Concepts, Procedure steps and Questions.
+
+Each scope is a directory in KG_EMBEDDING_DIR holding one float32 .npy
+matrix (a row per node), a .npy table with the id, label and owning
+concept of each row and a hash of the text embedded, and a small meta.json
+naming the current generation's files. Workers open both arrays with
+np.load(mmap_mode="r"), so every process shares the OS page cache instead
+of a private copy, and only re-read meta.json when its inode or mtime
+changed. A refresh only embeds nodes whose text changed and swaps the
+files in by rewriting meta.json atomically.
+
+Search is an exact dot product over the matrix. Scopes with at least
+EMBEDDING_ANN_MIN_ROWS rows also get an inverted-file index: rows are
+stored grouped by their nearest k-means centroid, and a query only scans
+the EMBEDDING_ANN_PROBES closest groups.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .driver import get_driver
+from .embeddings import EmbeddingBackend, embed_query, get_embedder, normalize
+from .schema import BASE_LABEL
+from .search import PATH_RELATIONS
+
+logger = logging.getLogger(__name__)
+
+EMBEDDED_LABELS = ["Concept", "Procedure", "Question"]
+KMEANS_ITERATIONS = 10
+# Training rows sampled per centroid
+KMEANS_SAMPLE = 64
+# Rows scored at once when assigning or copying (bounds memory)
+CHUNK = 65536
+
+META_FILE = "meta.json"
+
+
+def embedding_query() -> str:
+    # A step or question belongs to the nearest concept above it
+    return f"""
+    MATCH (n:{BASE_LABEL} {{scope: $scope}})
+    WHERE any(l IN labels(n) WHERE l IN $labels)
+    OPTIONAL MATCH p = (n)<-[:{PATH_RELATIONS}*1..32]-(c:Concept)
+    WHERE NOT n:Concept
+    WITH n, c ORDER BY length(p)
+    WITH n, head(collect(c.id)) AS concept
+    RETURN n.id AS id,
+           [l IN labels(n) WHERE l IN $labels][0] AS label,
+           CASE WHEN n:Concept THEN n.id ELSE coalesce(concept, n.id) END AS concept,
+           n.name AS name, n.definition AS definition,
+           n.learning_objective AS learning_objective,
+           n.misconceptions AS misconceptions, n.hint AS hint,
+           n.code_snippet AS code_snippet, n.text AS text
+    ORDER BY n.id
+    """
+
+
+def node_text(row: Dict[str, Any]) -> str:
+    """The text a node is embedded as."""
+    parts = []
+    for field in (
+        "name",
+        "definition",
+        "learning_objective",
+        "misconceptions",
+        "hint",
+        "code_snippet",
+        "text",
+    ):
+        value = row.get(field)
+        if isinstance(value, (list, tuple)):
+            value = "; ".join(str(v) for v in value if v)
+        if value:
+            parts.append(str(value))
+    return "\n".join(parts)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.md5(text.encode(), usedforsecurity=False).hexdigest()
+
+
+def fetch_embedding_rows(scope: str) -> List[Dict[str, Any]]:
+    with get_driver().session() as session:
+        result = session.run(embedding_query(), scope=scope, labels=EMBEDDED_LABELS)
+        return [dict(r) for r in result]
+
+
+def scope_dir(scope: str) -> Path:
+    """Filesystem-safe directory of a scope (scopes are free text)."""
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "-", scope).strip("-.")[:60] or "scope"
+    digest = hashlib.md5(scope.encode(), usedforsecurity=False).hexdigest()[:8]
+    return Path(settings.KG_EMBEDDING_DIR) / f"{slug}-{digest}"
+
+
+def row_table(columns: Dict[str, List[str]]) -> np.ndarray:
+    """Fixed-width string columns as one structured array, mmap-able once saved."""
+    n = len(next(iter(columns.values())))
+    table = np.empty(
+        n,
+        dtype=[
+            (name, f"<U{max((len(v) for v in values), default=1) or 1}")
+            for name, values in columns.items()
+        ],
+    )
+    for name, values in columns.items():
+        table[name] = values
+    return table
+
+
+def meta_stamp(directory: Path) -> Optional[Tuple[int, int]]:
+    """(inode, mtime) of meta.json; a refresh replaces the file, changing both."""
+    try:
+        stat = os.stat(directory / META_FILE)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def read_meta(directory: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads((directory / META_FILE).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, seed: int = 0) -> np.ndarray:
+    """Unit-norm centroids of a sample of ``vectors``."""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    sample = np.sort(rng.choice(n, min(n, k * KMEANS_SAMPLE), replace=False))
+    data = np.asarray(vectors[sample], dtype=np.float32)
+    centroids = data[rng.choice(len(data), k, replace=False)]
+    for _ in range(KMEANS_ITERATIONS):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        empty = ~sums.any(axis=1)
+        sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+        centroids = sums / np.maximum(
+            np.linalg.norm(sums, axis=1, keepdims=True), 1e-12
+        )
+    return centroids.astype(np.float32)
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    lists = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), CHUNK):
+        block = np.asarray(vectors[start : start + CHUNK])
+        lists[start : start + CHUNK] = np.argmax(block @ centroids.T, axis=1)
+    return lists
+
+
+def refresh_embeddings(
+    scope: str,
+    rows: Optional[List[Dict[str, Any]]] = None,
+    backend: Optional[EmbeddingBackend] = None,
+) -> Dict[str, int]:
+    """
+    Brings a scope's index in line with the graph, embedding only nodes
+    that are new or whose text changed. Returns row counts:
+    {"rows", "embedded", "reused", "removed"}.
+    """
+    started = time.perf_counter()
+    backend = backend or get_embedder()
+    rows = fetch_embedding_rows(scope) if rows is None else rows
+    directory = scope_dir(scope)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    old_meta = read_meta(directory)
+    old_vectors = None
+    old_rows: Dict[str, int] = {}
+    model = (backend.name, backend.model, backend.dim)
+    if old_meta and (old_meta["backend"], old_meta["model"], old_meta["dim"]) == model:
+        old_vectors = np.load(directory / old_meta["vectors"], mmap_mode="r")
+        old_table = np.load(directory / old_meta["rows"], mmap_mode="r")
+        old_rows = {
+            (str(node_id), str(digest)): i
+            for i, (node_id, digest) in enumerate(
+                zip(old_table["id"], old_table["hash"])
+            )
+        }
+
+    texts = [node_text(row) for row in rows]
+    hashes = [text_hash(text) for text in texts]
+    n = len(rows)
+    generation = (old_meta["generation"] + 1) if old_meta else 1
+    staging_path = directory / f"staging-{generation}.npy"
+    staging = np.lib.format.open_memmap(
+        staging_path, mode="w+", dtype=np.float32, shape=(n, backend.dim)
+    )
+
+    # Unchanged rows are copied over, the rest embedded in batches
+    reused = [
+        (i, old_rows[(row["id"], digest)])
+        for i, (row, digest) in enumerate(zip(rows, hashes))
+        if (row["id"], digest) in old_rows
+    ]
+    if reused:
+        new_index, old_index = map(np.array, zip(*reused))
+        for start in range(0, len(reused), CHUNK):
+            staging[new_index[start : start + CHUNK]] = old_vectors[
+                old_index[start : start + CHUNK]
+            ]
+    copied = {i for i, _ in reused}
+    missing = [i for i in range(n) if i not in copied]
+    for start in range(0, len(missing), settings.EMBEDDING_BATCH_SIZE):
+        batch = missing[start : start + settings.EMBEDDING_BATCH_SIZE]
+        staging[batch] = backend.embed([texts[i] for i in batch])
+    staging.flush()
+
+    # Large scopes are stored grouped by inverted list; centroids are
+    # reused until the scope has doubled since they were trained
+    order = np.arange(n)
+    offsets = centroids_file = trained_rows = None
+    if n and n >= settings.EMBEDDING_ANN_MIN_ROWS:
+        centroids = None
+        if old_vectors is not None and old_meta["centroids"]:
+            if n <= 2 * old_meta["trained_rows"]:
+                centroids = np.load(directory / old_meta["centroids"])
+                trained_rows = old_meta["trained_rows"]
+        if centroids is None:
+            centroids = spherical_kmeans(staging, int(math.sqrt(n)))
+            trained_rows = n
+        lists = assign_lists(staging, centroids)
+        order = np.argsort(lists, kind="stable")
+        offsets = np.searchsorted(lists[order], np.arange(len(centroids) + 1)).tolist()
+        centroids_file = f"centroids-{generation}.npy"
+        np.save(directory / centroids_file, centroids)
+
+    vectors_file = f"vectors-{generation}.npy"
+    if offsets is None:
+        del staging
+        os.replace(staging_path, directory / vectors_file)
+    else:
+        final = np.lib.format.open_memmap(
+            directory / vectors_file,
+            mode="w+",
+            dtype=np.float32,
+            shape=(n, backend.dim),
+        )
+        for start in range(0, n, CHUNK):
+            final[start : start + CHUNK] = staging[order[start : start + CHUNK]]
+        final.flush()
+        del final, staging
+        staging_path.unlink()
+
+    rows_file = f"rows-{generation}.npy"
+    np.save(
+        directory / rows_file,
+        row_table(
+            {
+                "id": [rows[i]["id"] for i in order],
+                "label": [rows[i]["label"] for i in order],
+                "concept": [rows[i]["concept"] for i in order],
+                "hash": [hashes[i] for i in order],
+            }
+        ),
+    )
+
+    meta = {
+        "scope": scope,
+        "backend": backend.name,
+        "model": backend.model,
+        "dim": backend.dim,
+        "generation": generation,
+        "vectors": vectors_file,
+        "rows": rows_file,
+        "centroids": centroids_file,
+        "trained_rows": trained_rows,
+        "offsets": offsets,
+    }
+    # Readers see either the old generation or the new one, never a mix
+    tmp = directory / f"{META_FILE}.tmp"
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, directory / META_FILE)
+    for path in directory.glob("*.npy"):
+        if path.name not in (vectors_file, rows_file, centroids_file):
+            path.unlink()  # open mmaps of old generations stay valid
+
+    stats = {
+        "rows": n,
+        "embedded": len(missing),
+        "reused": len(reused),
+        "removed": len(old_rows) - len(reused),
+    }
+    logger.info(
+        f"Embedding index for {scope}: {stats} in {time.perf_counter() - started:.2f}s"
+    )
+    return stats
+
+
+class VectorIndex:
+    """Read-only view of one generation of a scope's index."""
+
+    def __init__(self, directory: Path, meta: Dict[str, Any]):
+        self.meta = meta
+        self.rows = np.load(directory / meta["rows"], mmap_mode="r")
+        self.vectors = np.load(directory / meta["vectors"], mmap_mode="r")
+        self.centroids = None
+        if meta["centroids"]:
+            self.centroids = np.load(directory / meta["centroids"])
+            self.offsets = np.array(meta["offsets"], dtype=np.int64)
+
+    def nearest_lists(self, query: np.ndarray, probes: int) -> Optional[np.ndarray]:
+        """The ``probes`` lists closest to ``query``; None means scan everything."""
+        if self.centroids is None or probes <= 0 or probes >= len(self.centroids):
+            return None
+        return np.sort(np.argpartition(-(self.centroids @ query), probes - 1)[:probes])
+
+    def search(
+        self, query: np.ndarray, k: int = 10, probes: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        The ``k`` rows most similar to the unit vector ``query``, best first.
+        ``probes`` defaults to EMBEDDING_ANN_PROBES; 0 forces an exact scan.
+        """
+        if probes is None:
+            probes = settings.EMBEDDING_ANN_PROBES
+        lists = self.nearest_lists(query, probes)
+        if lists is None:
+            rows = np.arange(len(self.rows))
+            scores = np.asarray(self.vectors @ query)
+        else:
+            # Each list is a contiguous slice, so only its pages are read
+            slices = [slice(self.offsets[c], self.offsets[c + 1]) for c in lists]
+            rows = np.concatenate([np.arange(s.start, s.stop) for s in slices])
+            scores = np.concatenate([self.vectors[s] @ query for s in slices])
+        k = min(k, len(scores))
+        if not k:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        hits = []
+        for i, score in zip(rows[best], scores[best]):
+            row = self.rows[i]
+            hits.append(
+                {
+                    "id": str(row["id"]),
+                    "label": str(row["label"]),
+                    "concept": str(row["concept"]),
+                    "score": float(score),
+                }
+            )
+        return hits
+
+
+# scope -> (meta.json stamp, index); a worker maps each generation once
+_loaded: Dict[str, Tuple[Tuple[int, int], VectorIndex]] = {}
+
+
+def load_index(scope: str) -> Optional[VectorIndex]:
+    """
+    The scope's current index. A call costs one stat of meta.json; the
+    files are only read again after a refresh replaced it.
+    """
+    directory = scope_dir(scope)
+    for _ in range(2):
+        stamp = meta_stamp(directory)
+        if stamp is None:
+            _loaded.pop(scope, None)
+            return None
+        cached = _loaded.get(scope)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        meta = read_meta(directory)
+        if meta is None:
+            continue
+        try:
+            index = VectorIndex(directory, meta)
+        except FileNotFoundError:
+            continue  # a refresh swapped generations under us; read meta again
+        _loaded[scope] = (stamp, index)
+        return index
+    return None
+
+
+def search_similar(
+    scope: str,
+    text: str,
+    k: int = 10,
+    probes: Optional[int] = None,
+    backend: Optional[EmbeddingBackend] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Nodes of ``scope`` closest in meaning to ``text`` (empty if unindexed).
+    ``backend`` defaults to the configured embedder and its query cache.
+    """
+    index = load_index(scope)
+    if index is None or not len(index.rows):
+        return []
+    embedder = backend or get_embedder()
+    if (embedder.name, embedder.model) != (index.meta["backend"], index.meta["model"]):
+        logger.warning(f"Embedding index for {scope} was built with another model")
+        return []
+    query = (
+        embed_query(text) if backend is None else normalize(backend.embed([text]))[0]
+    )
+    return index.search(query, k, probes)
@@ -0,0 +1,37 @@
+from django_huey import on_shutdown, task
+
+from knowledge.services.driver import close_driver
+from knowledge.services.layout import refresh_layout
+from knowledge.services.prerequisites import refresh_prerequisites
+from knowledge.services.vectors import refresh_embeddings
+
+
+@task()
+def refresh_scope_layout(scope: str):
+    """Recomputes a scope's precomputed layout after an upload changed it."""
+    refresh_layout(scope)
+
+
+@task()
+def refresh_scope_prerequisites(scope: str):
+    """Rebuilds a scope's prerequisite index after an upload changed it."""
+    refresh_prerequisites(scope)
+
+
+@task()
+def refresh_scope_embeddings(scope: str):
+    """Re-embeds the nodes of a scope whose text an upload changed."""
+    refresh_embeddings(scope)
+
+
+def refresh_scope(scope: str) -> None:
+    """Queues the refreshes of everything derived from a scope's graph."""
+    refresh_scope_layout(scope)
+    refresh_scope_prerequisites(scope)
+    refresh_scope_embeddings(scope)
+
+
+@on_shutdown()
+def close_neo4j_driver():
+    """Release pooled Neo4j connections when the consumer stops."""
+    close_driver()
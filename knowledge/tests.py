@@ -1,3 +1,265 @@
-from django.test import TestCase
+import csv
+import json
+import random
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+
+from knowledge.models import GraphDelta, GraphVersion
+from knowledge.services import loader
+from knowledge.services.prerequisites import PrerequisiteClosure, build_closure
+from knowledge.services.replay import (
+    ARRAY_DELIMITER,
+    Artifact,
+    csv_array,
+    export_admin_csv,
+)
+
+
+class AdminCsvTests(SimpleTestCase):
+    def export(self, graph):
+        directory = Path(tempfile.mkdtemp())
+        artifact = directory / "course.json"
+        artifact.write_text(json.dumps(graph), encoding="utf-8")
+        command = export_admin_csv([Artifact(artifact, "course")], directory / "out")
+        with open(directory / "out" / "nodes_Concept.csv", newline="") as f:
+            header, *rows = list(csv.reader(f))
+        return command, [dict(zip(header, row)) for row in rows]
+
+    def test_array_elements_round_trip(self):
+        misconceptions = ["state; not memory", "a, b", "plain"]
+        command, rows = self.export(
+            {"id": "C01", "name": "Symbolic state", "misconceptions": misconceptions}
+        )
+        (row,) = rows
+        # Split the way neo4j-admin does with the delimiter the command passes
+        (option,) = [a for a in command if a.startswith("--array-delimiter=U+")]
+        delimiter = chr(int(option.split("U+")[1], 16))
+        self.assertEqual(delimiter, ARRAY_DELIMITER)
+        self.assertEqual(
+            row["misconceptions:string[]"].split(delimiter), misconceptions
+        )
+        self.assertEqual(
+            row["ingest_keys:string[]"].split(delimiter),
+            ["id", "misconceptions", "name"],
+        )
+        self.assertEqual(row[":LABEL"].split(delimiter), ["Concept", "KGNode"])
+
+    def test_element_containing_the_delimiter_is_rejected(self):
+        with self.assertRaises(ValueError):
+            csv_array(["one", f"two{ARRAY_DELIMITER}three"])
+
+
+class FakeSession:
+    """
+    Stands in for a Neo4j session: keeps the hashes and ingest keys the
+    loader stores per node id and records every write batch.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.writes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, scope):
+        return [{"id": i, **node} for i, node in self.nodes.items()]
+
+    def execute_write(self, writer, scope, batch):
+        self.writes.append((writer.__name__, batch))
+        if writer is loader.delete_nodes:
+            for node_id in batch:
+                del self.nodes[node_id]
+        elif writer is loader.write_nodes:
+            for row in batch:
+                self.nodes[row["id"]] = {
+                    "hash": None,
+                    "keys": row["props"]["ingest_keys"],
+                }
+        elif writer is loader.mark_written:
+            for row in batch:
+                self.nodes[row["id"]]["hash"] = row["hash"]
+
+
+class UploadDiffTests(TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+        driver = mock.Mock()
+        driver.session.return_value = self.session
+        patcher = mock.patch.object(loader, "get_driver", return_value=driver)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def graph(self, definition="The state of a program."):
+        return {
+            "id": "C01",
+            "name": "Variables",
+            "children": [
+                {"id": "C02", "name": "State", "definition": definition},
+                {
+                    "id": "A01",
+                    "name": "Check",
+                    "question_prompts": [{"question": "What is state?"}],
+                    "connections": [{"to": "C02", "relation": "ASSESSES"}],
+                },
+            ],
+        }
+
+    def upload(self, graph):
+        self.session.writes.clear()
+        return loader.upload_graph(graph, "course", batch_size=2)
+
+    def written_ids(self, writer):
+        return sorted(
+            row["id"]
+            for name, batch in self.session.writes
+            if name == writer
+            for row in batch
+        )
+
+    def test_first_upload_adds_every_node(self):
+        stats = self.upload(self.graph())
+        self.assertEqual(
+            stats, {"added": 4, "changed": 0, "removed": 0, "unchanged": 0}
+        )
+        self.assertEqual(
+            self.written_ids("write_nodes"), ["A01", "A01-Q1", "C01", "C02"]
+        )
+        self.assertEqual(GraphVersion.current("course"), 1)
+
+    def test_unchanged_reingest_writes_nothing(self):
+        self.upload(self.graph())
+        stats = self.upload(self.graph())
+        self.assertEqual(
+            stats, {"added": 0, "changed": 0, "removed": 0, "unchanged": 4}
+        )
+        self.assertEqual(self.session.writes, [])
+        self.assertEqual(GraphVersion.current("course"), 1)
+
+    def test_reingest_with_one_node_edited_changes_exactly_that_node(self):
+        self.upload(self.graph())
+        stats = self.upload(self.graph(definition="What the program remembers."))
+        self.assertEqual(
+            stats, {"added": 0, "changed": 1, "removed": 0, "unchanged": 3}
+        )
+        self.assertEqual(self.written_ids("write_nodes"), ["C02"])
+        self.assertEqual(self.written_ids("mark_written"), ["C02"])
+        self.assertEqual(GraphVersion.current("course"), 2)
+        delta = GraphDelta.objects.get(scope="course", version=2).delta
+        self.assertEqual([n["id"] for n in delta["nodes"]], ["C02"])
+
+    def test_removed_child_deletes_it_and_rewrites_its_parent(self):
+        self.upload(self.graph())
+        graph = self.graph()
+        graph["children"].pop()  # A01 and its question
+        stats = self.upload(graph)
+        self.assertEqual(
+            stats, {"added": 0, "changed": 1, "removed": 2, "unchanged": 1}
+        )
+        self.assertEqual(sorted(self.session.nodes), ["C01", "C02"])
+        self.assertEqual(self.written_ids("write_nodes"), ["C01"])
+
+    def test_dropped_key_is_written_as_null(self):
+        self.upload(self.graph())
+        graph = self.graph()
+        del graph["children"][0]["definition"]
+        self.upload(graph)
+        (props,) = [
+            row["props"]
+            for name, batch in self.session.writes
+            if name == "write_nodes"
+            for row in batch
+        ]
+        self.assertIsNone(props["definition"])
+        self.assertNotIn("definition", props["ingest_keys"])
+
+
+def reachable(before, start):
+    """Every concept reachable from ``start`` by following ``before``."""
+    seen, stack = set(), [start]
+    while stack:
+        for target in before[stack.pop()]:
+            if target in before and target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return seen
+
+
+def random_prerequisites(rng, n, edges):
+    ids = [f"C{i:02d}" for i in range(n)]
+    before = {node_id: [] for node_id in ids}
+    for _ in range(edges):
+        before[rng.choice(ids)].append(rng.choice(ids))
+    return before
+
+
+class PrerequisiteClosureTests(SimpleTestCase):
+    def check(self, before):
+        order, matrix, cycles = build_closure(before)
+        closure = PrerequisiteClosure(order, matrix.tobytes(), cycles)
+        reach = {node_id: reachable(before, node_id) for node_id in before}
+        self.assertEqual(sorted(order), sorted(before))
+
+        for node_id in before:
+            ancestors = {a for a in before if node_id in reach[a] and a != node_id}
+            got = closure.ancestors(closure.positions([node_id]))
+            self.assertEqual(set(closure.ids(got)), ancestors, node_id)
+            got = closure.descendants(closure.positions([node_id]))
+            self.assertEqual(set(closure.ids(got)), reach[node_id] - {node_id})
+
+        # Strongly connected components by mutual reachability
+        components = {
+            frozenset({b for b in reach[a] if a in reach[b]} | {a}) for a in before
+        }
+        expected = sorted(sorted(c) for c in components if len(c) > 1)
+        self.assertEqual(sorted(sorted(c) for c in cycles), expected)
+
+        position = {node_id: i for i, node_id in enumerate(order)}
+        for cycle in cycles:
+            spots = sorted(position[m] for m in cycle)
+            self.assertEqual(spots, list(range(spots[0], spots[0] + len(cycle))))
+        for a, targets in before.items():
+            for b in targets:
+                if b in before and a not in reach[b]:
+                    self.assertLess(position[a], position[b], (a, b))
+
+    def test_matches_brute_force_on_random_graphs(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            n = rng.randint(1, 12)
+            self.check(random_prerequisites(rng, n, rng.randint(0, 2 * n)))
+
+    def test_cycle_members_are_each_others_ancestors(self):
+        before = {"C01": ["C02"], "C02": ["C03"], "C03": ["C02", "C04"], "C04": []}
+        self.check(before)
+        order, matrix, cycles = build_closure(before)
+        self.assertEqual(order, ["C01", "C02", "C03", "C04"])
+        self.assertEqual(cycles, [["C02", "C03"]])
+
+    def test_ties_are_broken_by_id(self):
+        order, _, cycles = build_closure(
+            {"C03": [], "C01": ["C04"], "C02": [], "C04": []}
+        )
+        self.assertEqual(order, ["C01", "C02", "C03", "C04"])
+        self.assertEqual(cycles, [])
+
+    def test_self_loops_and_unknown_targets_are_ignored(self):
+        before = {"C01": ["C01", "C09"], "C02": ["C01"]}
+        self.check(before)
+        order, _, cycles = build_closure(before)
+        self.assertEqual(order, ["C02", "C01"])
+        self.assertEqual(cycles, [])
+
+    def test_learning_path_skips_known_concepts(self):
+        before = {"C01": ["C02"], "C02": ["C03"], "C03": [], "C04": ["C03"]}
+        order, matrix, cycles = build_closure(before)
+        closure = PrerequisiteClosure(order, matrix.tobytes(), cycles)
+        result = closure.learning_path(["C03"], known=["C02"])
+        self.assertEqual(result["path"], ["C04", "C03"])
+        self.assertEqual(result["ancestors"], ["C01", "C02", "C04"])
@@ -6,5 +6,14 @@ urlpatterns = [
     path("graph/", views.graph_view, name="graph_view"),
     path("graph-root/", views.graph_root, name="graph_root"),
     path("expand-node/<str:node_id>", views.expand_node, name="expand_node"),
+    path("expand-subtree/", views.expand_subtree, name="expand_subtree"),
+    path("node-details/", views.node_details, name="node_details"),
+    path("search/", views.search, name="search"),
+    path("learning-path/", views.learning_path, name="learning_path"),
+    path("graph-events/", views.graph_events, name="graph_events"),
+    path("export/", views.export_graph, name="export_graph"),
     path("update_node/", views.update_node, name="update_node"),
+    path("update-nodes/", views.update_nodes, name="update_nodes"),
+    path("cache-stats/", views.graph_cache_stats, name="graph_cache_stats"),
+    path("pool-metrics/", views.neo4j_pool_metrics, name="neo4j_pool_metrics"),
 ]
@@ -1,95 +1,463 @@
+import asyncio
 import json
+import logging
 import re
-from typing import Any, Dict, List, Union
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Union
+from urllib.parse import urlencode
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
 from django.views.decorators.csrf import csrf_exempt
-from neo4j import GraphDatabase
 
-# === Neo4j setup ===
-# Ideally this should be in settings.py, but for the speed run we stick to direct config or simple env vars
-
-# Initialize driver (simple singleton pattern for this view file)
-driver = GraphDatabase.driver(
-    settings.NEO4J_URI, auth=(settings.NEO4J_USERNAME, settings.NEO4J_PASSWORD)
+from knowledge.models import GLOBAL_SCOPE, GraphVersion
+from knowledge.services import graph
+from knowledge.services.cache import aget_or_compute, cache_stats
+from knowledge.services.deltas import SCOPE_CHANGED, amissed, hub
+from knowledge.services.driver import pool_metrics
+from knowledge.services.export import (
+    FORMATS,
+    astream_export,
+    negotiate_encoding,
+    stream_export,
 )
+from knowledge.services.layout import aattach_positions, alayout_stamp
+from knowledge.services.prerequisites import aload_closure
+from knowledge.services.search import asearch_nodes, search_nodes
+
+logger = logging.getLogger(__name__)
+
+
+async def run_graph_call(
+    request: HttpRequest, sync_fn: Callable, async_fn: Callable, *args: Any
+) -> Any:
+    """
+    Runs a graph call on the async driver when served over ASGI. Under WSGI
+    each async view gets a throwaway event loop, so the pooled sync driver is
+    used from a worker thread instead.
+    """
+    if isinstance(request, ASGIRequest):
+        return await async_fn(*args)
+    return await sync_to_async(sync_fn, thread_sensitive=False)(*args)
+
+
+async def cached_graph_response(
+    request: HttpRequest, scope: Union[str, None], load: Callable[[], Awaitable[Any]]
+) -> HttpResponse:
+    """
+    Serves a graph read from the versioned cache, running ``load`` only on a
+    miss. Responses carry a strong ETag and must be revalidated, so browsers
+    get a 304 until a write bumps the scope's version.
+    """
+
+    async def render_body() -> bytes:
+        return JsonResponse(await load(), safe=False).content
+
+    params = urlencode(sorted(request.GET.lists()), doseq=True)
+    if wants_layout(request):
+        # Layouts are refreshed separately from graph writes
+        params += f"#layout={await alayout_stamp(scope)}"
+    entry = await aget_or_compute(scope, request.path, params, render_body)
+
+    response = HttpResponse(entry["body"], content_type="application/json")
+    response["ETag"] = entry["etag"]
+    patch_cache_control(response, private=True, no_cache=True)
+    return get_conditional_response(request, etag=entry["etag"], response=response)
+
+
+def wants_summary(request: HttpRequest) -> bool:
+    """?fields=summary trims nodes to what tree navigation needs."""
+    return request.GET.get("fields") == "summary"
+
+
+def wants_layout(request: HttpRequest) -> bool:
+    """?layout=1 adds each node's precomputed "position" ([x, y] in 0..1)."""
+    return request.GET.get("layout") == "1"
 
 
 def graph_view(request: HttpRequest) -> HttpResponse:
-    """Renders the main graph page."""
-    return render(request, "knowledge/graph.html")
+    """Renders the main graph page, optionally limited to one scope."""
+    return render(
+        request, "knowledge/graph.html", {"scope": request.GET.get("scope", "")}
+    )
 
 
-def graph_root(request: HttpRequest) -> JsonResponse:
+async def graph_root(request: HttpRequest) -> HttpResponse:
     """
     Returns a root node ("Central node") with top-level Concept nodes as children.
     This mimics the previous hierarchical structure for expandable D3 behavior.
+    With ?scope=... only that scope's subgraph is read.
     """
-    with driver.session() as session:
-        # Get top-level Concept nodes (no incoming HAS_CHILD)
-        result = session.run(
-            """
-            MATCH (c:Concept)
-            WHERE NOT (()-[:HAS_CHILD]->(c))
-            RETURN c
-        """
+    scope = request.GET.get("scope")
+
+    async def load() -> Dict[str, Any]:
+        concept_nodes: List[Dict[str, Any]] = await run_graph_call(
+            request,
+            graph.fetch_roots,
+            graph.afetch_roots,
+            scope,
+            wants_summary(request),
         )
-        concept_nodes: List[Dict[str, Any]] = [dict(r["c"]) for r in result]
+        if wants_layout(request):
+            await aattach_positions(concept_nodes)
 
-    # Build a pseudo-root node just like your previous JSON
-    root: Dict[str, Any] = {
-        "id": "root",
-        "name": "Central node",
-        "children": concept_nodes,
-    }
-    return JsonResponse(root)
+        # Build a pseudo-root node just like your previous JSON
+        return {
+            "id": "root",
+            "name": "Central node",
+            "children": concept_nodes,
+        }
+
+    return await cached_graph_response(request, scope, load)
 
 
-def expand_node(request: HttpRequest, node_id: str) -> JsonResponse:
+async def expand_node(request: HttpRequest, node_id: str) -> HttpResponse:
     """
     Expands a single node (Concept/Procedure/Assessment) by fetching its immediate children.
     This lets the D3 graph dynamically add new layers on click.
+    Pass ?scope=... to seek the node by (scope, id) instead of id alone.
+    """
+    scope = request.GET.get("scope")
+
+    async def load() -> List[Dict[str, Any]]:
+        children: List[Dict[str, Any]] = await run_graph_call(
+            request,
+            graph.fetch_children,
+            graph.afetch_children,
+            node_id,
+            scope,
+            wants_summary(request),
+        )
+        if wants_layout(request):
+            await aattach_positions(children)
+        return children
+
+    return await cached_graph_response(request, scope, load)
+
+
+async def expand_subtree(request: HttpRequest) -> HttpResponse:
+    """
+    Expands several nodes ?depth=k levels deep (?ids=a,b&depth=2) with one
+    variable-length query, so deep chains open in a single round-trip.
+    Returns {"nodes", "edges", "expanded"}; accepts ?scope=, ?fields=summary
+    and ?layout=1.
+    """
+    ids = [i for i in request.GET.get("ids", "").split(",") if i]
+    if not ids:
+        return JsonResponse({"error": "ids required"}, status=400)
+    try:
+        depth = int(request.GET.get("depth", 1))
+    except ValueError:
+        return JsonResponse({"error": "depth must be an integer"}, status=400)
+    depth = max(1, min(depth, settings.KG_EXPAND_MAX_DEPTH))
+    scope = request.GET.get("scope")
+
+    async def load() -> Dict[str, Any]:
+        subtrees: Dict[str, Any] = await run_graph_call(
+            request,
+            graph.fetch_subtrees,
+            graph.afetch_subtrees,
+            ids,
+            depth,
+            scope,
+            wants_summary(request),
+        )
+        if wants_layout(request):
+            await aattach_positions(subtrees["nodes"])
+        return subtrees
+
+    return await cached_graph_response(request, scope, load)
+
+
+async def node_details(request: HttpRequest) -> HttpResponse:
+    """
+    Full properties for ?ids=a,b,c (optionally within ?scope=...), keyed by id.
+    Pairs with ?fields=summary so heavy text is only loaded for opened nodes.
+    """
+    ids = [i for i in request.GET.get("ids", "").split(",") if i]
+    if not ids:
+        return JsonResponse({"error": "ids required"}, status=400)
+    scope = request.GET.get("scope")
+
+    async def load() -> Dict[str, Dict[str, Any]]:
+        return await run_graph_call(
+            request, graph.fetch_details, graph.afetch_details, ids, scope
+        )
+
+    return await cached_graph_response(request, scope, load)
+
+
+async def search(request: HttpRequest) -> HttpResponse:
+    """
+    Ranked full-text hits for ?q=... (optionally within ?scope=...), paged
+    with ?page= and ?page_size=. Each hit carries its ancestor "path" from
+    the top-level concept so the graph view can open the tree down to it.
+    """
+    text = request.GET.get("q", "").strip()
+    if not text:
+        return JsonResponse({"error": "q required"}, status=400)
+    try:
+        page = max(1, int(request.GET.get("page", 1)))
+        page_size = int(request.GET.get("page_size", settings.KG_SEARCH_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse(
+            {"error": "page and page_size must be integers"}, status=400
+        )
+    page_size = max(1, min(page_size, settings.KG_SEARCH_MAX_PAGE_SIZE))
+    scope = request.GET.get("scope")
+
+    async def load() -> Dict[str, Any]:
+        results: Dict[str, Any] = await run_graph_call(
+            request, search_nodes, asearch_nodes, text, scope, page, page_size
+        )
+        return {"query": text, "page": page, "page_size": page_size, **results}
+
+    return await cached_graph_response(request, scope, load)
+
+
+async def learning_path(request: HttpRequest) -> JsonResponse:
+    """
+    Ordered study path to ?targets=a,b within ?scope=..., skipping ?known=
+    concepts and their prerequisites. Also returns the targets' ancestor and
+    descendant sets. Served from the precomputed prerequisite index.
     """
-    with driver.session() as session:
-        results = session.run(
-            """
-            MATCH (n {id:$node_id})-[:HAS_CHILD|PROCEDURAL_FOR|ASSESSES]->(child)
-            RETURN child
-        """,
-            node_id=node_id,
+    scope = request.GET.get("scope")
+    targets = [i for i in request.GET.get("targets", "").split(",") if i]
+    known = [i for i in request.GET.get("known", "").split(",") if i]
+    if not scope or not targets:
+        return JsonResponse({"error": "scope and targets required"}, status=400)
+
+    closure = await aload_closure(scope)
+    if closure is None:
+        return JsonResponse(
+            {"error": f"No prerequisite index for scope {scope}"}, status=404
         )
-        children: List[Dict[str, Any]] = [dict(r["child"]) for r in results]
-    return JsonResponse(children, safe=False)
+    unknown = [i for i in targets + known if i not in closure.position]
+    if unknown:
+        return JsonResponse({"error": f"Unknown concepts: {unknown}"}, status=404)
+
+    return JsonResponse(
+        {"scope": scope, "targets": targets, **closure.learning_path(targets, known)}
+    )
+
+
+def export_graph(request: HttpRequest) -> HttpResponse:
+    """
+    Streams a whole scope (?scope=...) as NDJSON (default) or one JSON
+    document (?format=json), straight from the Neo4j cursor. Compressed with
+    brotli or gzip per Accept-Encoding; ?fields=summary keeps nodes compact.
+    """
+    scope = request.GET.get("scope")
+    fmt = request.GET.get("format", "ndjson")
+    if not scope:
+        return JsonResponse({"error": "scope required"}, status=400)
+    if fmt not in FORMATS:
+        return JsonResponse(
+            {"error": f"format must be one of {list(FORMATS)}"}, status=400
+        )
+
+    summary = wants_summary(request)
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+    # Async cursor under ASGI; under WSGI an async stream would be buffered whole
+    if isinstance(request, ASGIRequest):
+        chunks = astream_export(
+            graph.aiter_export(scope, summary), fmt, scope, encoding
+        )
+    else:
+        chunks = stream_export(graph.iter_export(scope, summary), fmt, scope, encoding)
+
+    response = StreamingHttpResponse(chunks, content_type=FORMATS[fmt])
+    if encoding:
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ["Accept-Encoding"])
+    response["Content-Disposition"] = f'attachment; filename="{scope}.{fmt}"'
+    return response
+
+
+async def graph_events(request: HttpRequest) -> StreamingHttpResponse:
+    """
+    Server-Sent Events (SSE) stream of graph deltas for ?scope=... (or every
+    scope), so open graph views patch themselves instead of reloading.
+    Needs ASGI, like the other SSE streams.
+    """
+    scope = request.GET.get("scope") or None
+    version_key = scope or GLOBAL_SCOPE
+
+    async def event_stream() -> AsyncGenerator[str, None]:
+        subscriber = hub.subscribe(scope)
+        version = await GraphVersion.acurrent(scope)
+
+        async def catch_up(through: int) -> List[Dict[str, Any]]:
+            # Writes of other processes only reach this stream through the store
+            missed = await amissed(scope, version, through)
+            return (
+                missed
+                if missed is not None
+                else [{"type": SCOPE_CHANGED, "scope": scope}]
+            )
+
+        try:
+            while True:
+                try:
+                    delta = await asyncio.wait_for(
+                        subscriber.queue.get(), settings.KG_DELTA_POLL_SECONDS
+                    )
+                except TimeoutError:
+                    current = await GraphVersion.acurrent(scope)
+                    if current == version:
+                        yield ": keep-alive\n\n"
+                        continue
+                    for missed in await catch_up(current):
+                        yield f"data: {json.dumps(missed, default=str)}\n\n"
+                    version = current
+                    continue
+
+                if delta["type"] == SCOPE_CHANGED and "versions" not in delta:
+                    # This stream fell behind and its queue was dropped
+                    yield f"data: {json.dumps(delta)}\n\n"
+                    version = await GraphVersion.acurrent(scope)
+                    continue
+                new_version = delta["versions"].get(version_key, version)
+                if new_version <= version:
+                    continue  # already replayed from the store
+                if new_version > version + 1:
+                    for missed in await catch_up(new_version - 1):
+                        yield f"data: {json.dumps(missed, default=str)}\n\n"
+                yield f"data: {json.dumps(delta, default=str)}\n\n"
+                version = new_version
+        except Exception as e:
+            logger.error(f"SSE Error for graph events ({scope}): {e}")
+        finally:
+            hub.unsubscribe(subscriber)
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+# Keys clients send back that are not editable node properties
+READONLY_PROPS = [
+    "id",
+    "scope",
+    "label",
+    "children",
+    "revision",
+    # Written by ingest to diff re-uploads
+    "content_hash",
+    "ingest_keys",
+    # Written by the nightly analytics job
+    "betweenness",
+    "chain_depth",
+    "orphan",
+]
+
+# "<file> [page N]" as written by the parser
+SOURCE_PATTERN = re.compile(r"([A-Za-z0-9_\-]+)\s*\[page")
+
+
+def editable_props(node: Dict[str, Any]) -> Dict[str, Any]:
+    props: Dict[str, Any] = {k: v for k, v in node.items() if k not in READONLY_PROPS}
+
+    # 🔧 Automatically fix "source" to link to the real uploaded file
+    if "source" in props and isinstance(props["source"], str):
+        match = SOURCE_PATTERN.search(props["source"])
+        if match:
+            base_name = match.group(1).strip()
+            props["source"] = f"{settings.STATIC_URL}uploads/{base_name}.pdf"
+    return props
 
 
 @csrf_exempt
-def update_node(request: HttpRequest) -> JsonResponse:
+async def update_node(request: HttpRequest) -> JsonResponse:
     if request.method != "POST":
         return JsonResponse({"error": "POST required"}, status=405)
 
     try:
         node: Dict[str, Any] = json.loads(request.body)
-        props: Dict[str, Any] = {
-            k: v for k, v in node.items() if k not in ["id", "children"]
-        }
+        scope = node.get("scope")
+        props = editable_props(node)
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    if not scope or "id" not in node:
+        return JsonResponse(
+            {"status": "error", "message": "id and scope are required"}, status=400
+        )
 
-        # 🔧 Automatically fix "source" to link to the real uploaded file
-        if "source" in props and isinstance(props["source"], str):
-            match = re.search(r"([A-Za-z0-9_\-]+)\s*\[page", props["source"])
-            if match:
-                base_name = match.group(1).strip()
-                props["source"] = f"{settings.STATIC_URL}uploads/{base_name}.pdf"
-
-        with driver.session() as session:
-            query = """
-            MATCH (n {id: $id})
-            SET n += $props
-            RETURN n
-            """
-            session.run(query, id=node["id"], props=props)
+    try:
+        await run_graph_call(
+            request, graph.update_node, graph.aupdate_node, node["id"], props, scope
+        )
 
         return JsonResponse({"status": "updated"})
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=500)
+
+
+@csrf_exempt
+async def update_nodes(request: HttpRequest) -> JsonResponse:
+    """
+    Applies many node edits in one transaction. Body:
+    {"scope", "atomic": false, "patches": [{"id", "props", "revision"?}]}
+    A patch with "revision" is skipped as a conflict if the node has been
+    edited since. Returns a status per patch; with "atomic" any failed patch
+    rolls back the whole batch (409).
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=405)
+
+    try:
+        body: Dict[str, Any] = json.loads(request.body)
+        patches = [
+            {
+                "id": str(patch["id"]),
+                "props": editable_props(patch.get("props", {})),
+                "revision": patch.get("revision"),
+            }
+            for patch in body["patches"]
+        ]
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    if not body.get("scope"):
+        return JsonResponse(
+            {"status": "error", "message": "scope is required"}, status=400
+        )
+
+    try:
+        results: List[Dict[str, Any]] = await run_graph_call(
+            request,
+            graph.update_nodes,
+            graph.aupdate_nodes,
+            patches,
+            body.get("scope"),
+            bool(body.get("atomic", False)),
+        )
+    except Exception as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=500)
+
+    updated = sum(1 for r in results if r["status"] == graph.UPDATED)
+    rolled_back = any(r["status"] == graph.ROLLED_BACK for r in results)
+    return JsonResponse(
+        {"updated": updated, "results": results}, status=409 if rolled_back else 200
+    )
+
+
+def neo4j_pool_metrics(request: HttpRequest) -> JsonResponse:
+    """Connection pool usage of this process's shared Neo4j drivers."""
+    return JsonResponse(pool_metrics())
+
+
+def graph_cache_stats(request: HttpRequest) -> JsonResponse:
+    """Hit ratio and latency saved by this process's graph response cache."""
+    return JsonResponse(cache_stats())
@@ -15,4 +15,24 @@ os.environ.setdefault(
     "DJANGO_SETTINGS_MODULE", "multi_agent_for_education_app.settings"
 )
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    """Django app plus ASGI lifespan handling, which Django itself ignores."""
+    if scope["type"] != "lifespan":
+        return await django_application(scope, receive, send)
+
+    from asgiref.sync import sync_to_async
+
+    from knowledge.services.driver import aclose_driver, close_driver
+
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await aclose_driver()
+            await sync_to_async(close_driver)()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
@@ -91,6 +91,10 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # WAL lets requests keep reading while learning events are written
+        "OPTIONS": {
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL"
+        },
     }
 }
 
@@ -176,10 +180,141 @@ AUTH_USER_MODEL = "accounts.User"
 # Google Gemini API Key
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
 
+# Chat agent model (agents/services/providers.py): "stub" or "gemini"
+AGENT_PROVIDER = os.environ.get("AGENT_PROVIDER", "stub")
+AGENT_MODEL = os.environ.get("AGENT_MODEL", "gemini-2.5-flash")
+AGENT_STUB_TOKEN_DELAY = float(os.environ.get("AGENT_STUB_TOKEN_DELAY", 0.02))
+# Recent replies kept for the time-to-first-token percentiles
+AGENT_METRICS_WINDOW = int(os.environ.get("AGENT_METRICS_WINDOW", 1000))
+# KG context per chat turn (agents/services/retrieval.py): concepts matched,
+# hops followed below each one, and the token budget of the rendered context
+AGENT_RETRIEVAL_CONCEPTS = int(os.environ.get("AGENT_RETRIEVAL_CONCEPTS", 3))
+AGENT_RETRIEVAL_DEPTH = int(os.environ.get("AGENT_RETRIEVAL_DEPTH", 12))
+AGENT_CONTEXT_TOKENS = int(os.environ.get("AGENT_CONTEXT_TOKENS", 2000))
+# Catalogs and concept neighborhoods kept in the in-process LRU
+AGENT_RETRIEVAL_CACHE_SIZE = int(os.environ.get("AGENT_RETRIEVAL_CACHE_SIZE", 2048))
+# Seconds a scope's GraphVersion is trusted before it is read again
+AGENT_RETRIEVAL_VERSION_TTL = float(os.environ.get("AGENT_RETRIEVAL_VERSION_TTL", 2.0))
+# Semantic answer cache (agents/services/answer_cache.py): cosine similarity
+# from which two questions count as the same, answers kept per scope, and
+# their lifetime in seconds
+AGENT_ANSWER_CACHE_THRESHOLD = float(
+    os.environ.get("AGENT_ANSWER_CACHE_THRESHOLD", 0.9)
+)
+AGENT_ANSWER_CACHE_SIZE = int(os.environ.get("AGENT_ANSWER_CACHE_SIZE", 500))
+AGENT_ANSWER_CACHE_TTL = int(os.environ.get("AGENT_ANSWER_CACHE_TTL", 3600))
+# Conversation memory per prompt (agents/services/memory.py): tokens of recent
+# turns kept verbatim, and the length of the rolling summary of older ones
+AGENT_MEMORY_TOKENS = int(os.environ.get("AGENT_MEMORY_TOKENS", 1500))
+AGENT_SUMMARY_TOKENS = int(os.environ.get("AGENT_SUMMARY_TOKENS", 400))
+# Sub-agents the supervisor consults on each turn, with the seconds each may
+# take before it is cancelled (agents/services/supervisor.py)
+AGENT_SUBAGENT_DEADLINES = {
+    name.strip(): float(seconds)
+    for name, seconds in (
+        item.split(":")
+        for item in os.environ.get(
+            "AGENT_SUBAGENT_DEADLINES", "hint:2.0,misconception:1.5,assessment:1.5"
+        ).split(",")
+        if item.strip()
+    )
+}
+
 # Neo4j Configuration
 NEO4J_URI = os.environ.get("NEO4J_URI")
 NEO4J_USERNAME = os.environ.get("NEO4J_USERNAME")
 NEO4J_PASSWORD = os.environ.get("NEO4J_PASSWORD")
+# Shared driver pool (see knowledge/services/driver.py)
+NEO4J_MAX_CONNECTION_POOL_SIZE = int(
+    os.environ.get("NEO4J_MAX_CONNECTION_POOL_SIZE", 50)
+)
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(
+    os.environ.get("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", 30)
+)  # seconds
+NEO4J_MAX_CONNECTION_LIFETIME = float(
+    os.environ.get("NEO4J_MAX_CONNECTION_LIFETIME", 3600)
+)  # seconds
+NEO4J_LIVENESS_CHECK_TIMEOUT = float(
+    os.environ.get("NEO4J_LIVENESS_CHECK_TIMEOUT", 60)
+)  # idle seconds before a pooled connection is pinged
+# Create KG constraints/indexes when the app starts (idempotent)
+NEO4J_AUTO_SCHEMA = os.environ.get("NEO4J_AUTO_SCHEMA", "false").lower() == "true"
+# Nodes/relationships written per transaction when uploading a graph
+NEO4J_UPLOAD_BATCH_SIZE = int(os.environ.get("NEO4J_UPLOAD_BATCH_SIZE", 500))
+
+# Parsed KG JSON artifacts (data/<md5>.json), replayable into Neo4j
+KG_ARTIFACT_DIR = BASE_DIR / "data"
+# Per-scope embedding indexes of the KG (knowledge/services/vectors.py)
+KG_EMBEDDING_DIR = BASE_DIR / "data" / "embeddings"
+# Embedding backend (knowledge/services/embeddings.py): "hashing" (offline,
+# no model), "local" (sentence-transformers) or "gemini"
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "hashing")
+EMBEDDING_DIM = int(os.environ.get("EMBEDDING_DIM", 384))  # hashing and gemini
+EMBEDDING_LOCAL_MODEL = os.environ.get("EMBEDDING_LOCAL_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_GEMINI_MODEL = os.environ.get(
+    "EMBEDDING_GEMINI_MODEL", "gemini-embedding-001"
+)
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 100))
+# Scopes with this many rows also get an approximate (inverted-file) index,
+# searched over its EMBEDDING_ANN_PROBES nearest lists
+EMBEDDING_ANN_MIN_ROWS = int(os.environ.get("EMBEDDING_ANN_MIN_ROWS", 50000))
+EMBEDDING_ANN_PROBES = int(os.environ.get("EMBEDDING_ANN_PROBES", 16))
+# Versioned cache of graph read responses (see knowledge/services/cache.py)
+KG_CACHE_ALIAS = "graph"
+KG_CACHE_MAX_ENTRIES = int(os.environ.get("KG_CACHE_MAX_ENTRIES", 5000))
+KG_CACHE_TIMEOUT = int(os.environ.get("KG_CACHE_TIMEOUT", 600))  # seconds
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    KG_CACHE_ALIAS: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "knowledge-graph",
+        "TIMEOUT": KG_CACHE_TIMEOUT,
+        "OPTIONS": {"MAX_ENTRIES": KG_CACHE_MAX_ENTRIES},
+    },
+}
+
+# Live graph deltas pushed to open graph views (see knowledge/services/deltas.py)
+KG_DELTA_QUEUE_SIZE = int(os.environ.get("KG_DELTA_QUEUE_SIZE", 256))
+KG_DELTA_MAX_ITEMS = int(os.environ.get("KG_DELTA_MAX_ITEMS", 2000))
+KG_DELTA_POLL_SECONDS = float(os.environ.get("KG_DELTA_POLL_SECONDS", 5))
+# Seconds a published delta stays replayable by streams of other processes
+KG_DELTA_RETENTION_SECONDS = int(os.environ.get("KG_DELTA_RETENTION_SECONDS", 3600))
+
+# Deepest subtree /knowledge/expand-subtree/ will return in one query
+KG_EXPAND_MAX_DEPTH = int(os.environ.get("KG_EXPAND_MAX_DEPTH", 6))
+
+# Hits per page of /knowledge/search/ (default and ?page_size= ceiling)
+KG_SEARCH_PAGE_SIZE = int(os.environ.get("KG_SEARCH_PAGE_SIZE", 20))
+KG_SEARCH_MAX_PAGE_SIZE = int(os.environ.get("KG_SEARCH_MAX_PAGE_SIZE", 100))
+
+# Nightly graph analytics (analytics.tasks)
+ANALYTICS_HOUR = int(os.environ.get("ANALYTICS_HOUR", 3))  # UTC
+ANALYTICS_BETWEENNESS_SAMPLES = int(
+    os.environ.get("ANALYTICS_BETWEENNESS_SAMPLES", 256)
+)
+ANALYTICS_WRITE_BATCH_SIZE = int(os.environ.get("ANALYTICS_WRITE_BATCH_SIZE", 5000))
+
+# Learning events (see analytics/services/events.py): rows per bulk_create,
+# seconds between time-triggered flushes, events buffered before new ones are
+# refused, and events accepted per API request
+ANALYTICS_EVENT_BATCH_SIZE = int(os.environ.get("ANALYTICS_EVENT_BATCH_SIZE", 1000))
+ANALYTICS_EVENT_FLUSH_INTERVAL = float(
+    os.environ.get("ANALYTICS_EVENT_FLUSH_INTERVAL", 1.0)
+)
+ANALYTICS_EVENT_MAX_PENDING = int(os.environ.get("ANALYTICS_EVENT_MAX_PENDING", 50000))
+ANALYTICS_EVENTS_PER_REQUEST = int(os.environ.get("ANALYTICS_EVENTS_PER_REQUEST", 500))
+
+# Failed flushes in a row before a batch is written event by event and the
+# events that still fail are dead-lettered (logged) instead of retried
+ANALYTICS_EVENT_MAX_RETRIES = int(os.environ.get("ANALYTICS_EVENT_MAX_RETRIES", 3))
+
+# Lowest assessment attempt score (event value, 0-1) counted as a pass in the
+# rollups, and the longest range one dashboard query may cover
+ANALYTICS_PASS_SCORE = float(os.environ.get("ANALYTICS_PASS_SCORE", 0.5))
+ANALYTICS_DASHBOARD_MAX_DAYS = int(os.environ.get("ANALYTICS_DASHBOARD_MAX_DAYS", 366))
 
 # Django Huey Configuration
 DJANGO_HUEY = {
@@ -8,6 +8,7 @@ urlpatterns = [
     path("ingest/", include("ingest.urls")),
     path("knowledge/", include("knowledge.urls")),
     path("agents/", include("agents.urls")),
+    path("analytics/", include("analytics.urls")),
     path("", include("ingest.urls")),  # Default to ingest for MVP
 ]
 